@@ -0,0 +1 @@
+"""Offline benchmarks for the @vibe call path, cache I/O and materialization."""
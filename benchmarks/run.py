@@ -0,0 +1,452 @@
+"""
+Runs the benchmark suite and prints the results as JSON.
+
+    python -m benchmarks.run [--quick] [--output results.json] [--only NAME ...]
+
+Code generation is replaced by a stub, so the suite runs offline and measures
+vibeflow's own overhead: warm calls, method calls on large classes, cache
+reads and writes, cold-process materialization and concurrent cold starts.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import textwrap
+import threading
+import time
+import timeit
+from contextlib import contextmanager
+from unittest import mock
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from vibeflow import clear_cache  # noqa: E402
+from vibeflow.cache import BACKENDS, VibeCache  # noqa: E402
+
+vibe_module = importlib.import_module("vibeflow.vibe")
+
+
+def stub_code(function_name, signature, *args, is_async=False, **kwargs):
+    """Returns an implementation of any spec that returns its arguments."""
+    prefix = "async def" if is_async else "def"
+    return f"{prefix} {function_name}{signature}:\n    return locals()\n"
+
+
+@contextmanager
+def stub_generation(latency=0.0):
+    """
+    Replaces code generation with `stub_code`, after an optional simulated latency.
+    """
+
+    def get_code(*args, **kwargs):
+        get_code.calls += 1
+        time.sleep(latency)
+        return stub_code(*args, **kwargs)
+
+    async def async_get_code(*args, **kwargs):
+        get_code.calls += 1
+        await asyncio.sleep(latency)
+        return stub_code(*args, **kwargs)
+
+    get_code.calls = 0
+    with (
+        mock.patch.object(vibe_module, "get_code", get_code),
+        mock.patch.object(vibe_module, "async_get_code", async_get_code),
+    ):
+        yield get_code
+
+
+@contextmanager
+def scratch_directory():
+    """A temporary directory for the cache files of one benchmark."""
+    directory = tempfile.mkdtemp(prefix="vibeflow-bench-")
+    try:
+        yield directory
+    finally:
+        clear_cache()
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def summarize(samples):
+    return {
+        "min": min(samples),
+        "median": statistics.median(samples),
+        "mean": statistics.fmean(samples),
+        "max": max(samples),
+        "runs": len(samples),
+    }
+
+
+def per_call(stmt, number, repeat):
+    """Times `stmt` and returns the seconds per call of each repeat."""
+    return [
+        total / number
+        for total in timeit.Timer(stmt).repeat(repeat=repeat, number=number)
+    ]
+
+
+def load_module(directory, name, source):
+    """Writes `source` as a module in `directory` and imports it."""
+    with open(os.path.join(directory, f"{name}.py"), "w") as f:
+        f.write(source)
+    spec = importlib.util.spec_from_file_location(
+        name, os.path.join(directory, f"{name}.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def bench_warm_call(config):
+    """Per-call time of a warm @vibe function next to the same plain function."""
+    source = textwrap.dedent(
+        '''
+        from vibeflow import vibe
+
+        def plain(x: int) -> int:
+            """Returns x."""
+            return x
+
+        @vibe
+        def decorated(x: int) -> int:
+            """Returns x."""
+            pass
+
+        @vibe(hot_swap=True)
+        def swapped(x: int) -> int:
+            """Returns x."""
+            pass
+        '''
+    )
+    results = []
+    with scratch_directory() as directory, stub_generation():
+        module = load_module(directory, "bench_warm", source)
+        module.decorated(1)
+        module.swapped(1)
+        for name in ("plain", "decorated", "swapped"):
+            # Looked up through the module each time, as callers of a hot swap would
+            samples = per_call(
+                lambda: getattr(module, name)(1),
+                config["call_number"],
+                config["repeat"],
+            )
+            results.append(
+                {
+                    "name": "warm_call",
+                    "params": {"function": name},
+                    "unit": "s/call",
+                    "stats": summarize(samples),
+                }
+            )
+    plain = results[0]["stats"]["median"]
+    for result in results[1:]:
+        result["overhead"] = result["stats"]["median"] - plain
+    return results
+
+
+def bench_method_call(config):
+    """Per-call time of a warm @vibe method on classes with many other methods."""
+    results = []
+    for method_count in config["class_sizes"]:
+        methods = "".join(
+            f"\n    def helper_{i}(self, x: int) -> int:\n"
+            f'        """Helper {i}."""\n'
+            "        return x\n"
+            for i in range(method_count)
+        )
+        source = (
+            textwrap.dedent(
+                """
+            from vibeflow import vibe
+
+            class Large:
+                def __init__(self):
+                    self.value = 1
+            """
+            )
+            + methods
+            + textwrap.indent(
+                textwrap.dedent(
+                    '''
+                @vibe
+                def target(self, x: int) -> int:
+                    """Returns x."""
+                    pass
+                '''
+                ),
+                "    ",
+            )
+        )
+        with scratch_directory() as directory, stub_generation():
+            module = load_module(directory, f"bench_large_{method_count}", source)
+            instance = module.Large()
+            start = time.perf_counter()
+            instance.target(1)
+            first_call = time.perf_counter() - start
+            samples = per_call(
+                lambda: instance.target(1), config["call_number"], config["repeat"]
+            )
+        results.append(
+            {
+                "name": "method_call",
+                "params": {"methods": method_count},
+                "unit": "s/call",
+                "stats": summarize(samples),
+                "first_call": first_call,
+            }
+        )
+    return results
+
+
+def bench_cache_io(config):
+    """
+    Throughput of VibeCache.set and get against the number of entries, per backend.
+    """
+    results = []
+    value = stub_code("function", "(x: int) -> int")
+    for backend in BACKENDS:
+        for size in config["cache_sizes"]:
+            with scratch_directory() as directory:
+                func_file_path = os.path.join(directory, "module.py")
+                cache = VibeCache(backend=backend)
+                keys = [f"{i:064x}" for i in range(size)]
+                start = time.perf_counter()
+                for key in keys:
+                    cache.set(key, value, func_file_path)
+                set_seconds = time.perf_counter() - start
+
+                # A fresh instance, as a new process would read the cache
+                cache.clear()
+                cache = VibeCache(backend=backend)
+                start = time.perf_counter()
+                for key in keys:
+                    cache.get(key, func_file_path)
+                get_seconds = time.perf_counter() - start
+                cache.clear()
+            results.append(
+                {
+                    "name": "cache_io",
+                    "params": {"backend": backend, "entries": size},
+                    "unit": "ops/s",
+                    "set_ops_per_second": size / set_seconds,
+                    "get_ops_per_second": size / get_seconds,
+                }
+            )
+    return results
+
+
+COLD_PROCESS_SCRIPT = """
+import time
+start = time.perf_counter()
+import vibeflow
+imported = time.perf_counter()
+import bench_cold
+for i in range({count}):
+    getattr(bench_cold, f"f{{i}}")(i)
+done = time.perf_counter()
+print(imported - start, done - imported)
+"""
+
+
+def bench_cold_process(config):
+    """Time for a new process to import vibeflow and materialize N cached functions."""
+    results = []
+    for count in config["function_counts"]:
+        source = "from vibeflow import vibe\n" + "".join(
+            f"\n\n@vibe\ndef f{i}(x: int) -> int:\n"
+            f'    """Returns x plus {i}."""\n'
+            "    pass\n"
+            for i in range(count)
+        )
+        with scratch_directory() as directory, stub_generation():
+            module = load_module(directory, "bench_cold", source)
+            for i in range(count):
+                getattr(module, f"f{i}")(i)
+            env = dict(os.environ)
+            env["PYTHONPATH"] = os.pathsep.join(
+                [directory, ROOT]
+                + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+            )
+            # Generating would need the network, so a miss here fails the benchmark
+            env["OPENAI_API_KEY"] = "offline"
+            env["OPENAI_BASE_URL"] = "http://127.0.0.1:9"
+            imports, materializations = [], []
+            for _ in range(config["repeat"]):
+                output = subprocess.run(
+                    [sys.executable, "-c", COLD_PROCESS_SCRIPT.format(count=count)],
+                    cwd=directory,
+                    env=env,
+                    check=True,
+                    capture_output=True,
+                    text=True,
+                ).stdout
+                import_seconds, materialize_seconds = map(float, output.split())
+                imports.append(import_seconds)
+                materializations.append(materialize_seconds)
+        results.append(
+            {
+                "name": "cold_process",
+                "params": {"functions": count},
+                "unit": "s",
+                "import": summarize(imports),
+                "materialize": summarize(materializations),
+            }
+        )
+    return results
+
+
+def bench_concurrent_cold_start(config):
+    """
+    Wall time and generation count when many callers hit the same missing function.
+    """
+    source = textwrap.dedent(
+        '''
+        from vibeflow import vibe
+
+        @vibe
+        def sync_target(x: int) -> int:
+            """Returns x."""
+            pass
+
+        @vibe
+        async def async_target(x: int) -> int:
+            """Returns x."""
+            pass
+        '''
+    )
+    callers = config["callers"]
+    latency = config["latency"]
+    results = []
+    with scratch_directory() as directory, stub_generation(latency) as get_code:
+        module = load_module(directory, "bench_concurrent", source)
+
+        barrier = threading.Barrier(callers)
+
+        def call():
+            barrier.wait()
+            module.sync_target(1)
+
+        threads = [threading.Thread(target=call) for _ in range(callers)]
+        start = time.perf_counter()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        results.append(
+            {
+                "name": "concurrent_cold_start",
+                "params": {"mode": "threads", "callers": callers, "latency": latency},
+                "unit": "s",
+                "wall_time": time.perf_counter() - start,
+                "generations": get_code.calls,
+            }
+        )
+
+        get_code.calls = 0
+
+        async def gather():
+            start = time.perf_counter()
+            await asyncio.gather(*(module.async_target(1) for _ in range(callers)))
+            return time.perf_counter() - start
+
+        wall_time = asyncio.run(gather())
+        results.append(
+            {
+                "name": "concurrent_cold_start",
+                "params": {"mode": "asyncio", "callers": callers, "latency": latency},
+                "unit": "s",
+                "wall_time": wall_time,
+                "generations": get_code.calls,
+            }
+        )
+    return results
+
+
+BENCHMARKS = {
+    "warm_call": bench_warm_call,
+    "method_call": bench_method_call,
+    "cache_io": bench_cache_io,
+    "cold_process": bench_cold_process,
+    "concurrent_cold_start": bench_concurrent_cold_start,
+}
+
+CONFIGS = {
+    "full": {
+        "repeat": 5,
+        "call_number": 100_000,
+        "class_sizes": [10, 100, 1000],
+        "cache_sizes": [100, 1000, 3000],
+        "function_counts": [10, 100, 1000],
+        "callers": 32,
+        "latency": 0.1,
+    },
+    "quick": {
+        "repeat": 2,
+        "call_number": 1000,
+        "class_sizes": [10],
+        "cache_sizes": [100],
+        "function_counts": [10],
+        "callers": 4,
+        "latency": 0.01,
+    },
+}
+
+
+def run(names=None, quick=False):
+    """Runs the selected benchmarks (all by default) and returns the results."""
+    config = CONFIGS["quick" if quick else "full"]
+    results = []
+    for name in names or BENCHMARKS:
+        clear_cache()
+        results.extend(BENCHMARKS[name](config))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "cache_backend": os.environ.get("VIBEFLOW_CACHE_BACKEND", "json"),
+            "quick": quick,
+            "timestamp": time.time(),
+        },
+        "config": config,
+        "results": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run",
+        description="Runs the vibeflow benchmark suite.",
+    )
+    parser.add_argument(
+        "--quick", action="store_true", help="smaller sizes, for a smoke test"
+    )
+    parser.add_argument(
+        "--only", nargs="+", choices=list(BENCHMARKS), help="benchmarks to run"
+    )
+    parser.add_argument(
+        "--output", help="file to write the JSON results to, instead of stdout"
+    )
+    args = parser.parse_args(argv)
+
+    report = json.dumps(run(args.only, args.quick), indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
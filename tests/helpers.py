@@ -1,7 +1,54 @@
-from vibeflow import vibe
+import importlib
+import os
+import unittest
+from unittest import mock
+from vibeflow import vibe, clear_cache
+
+vibe_module = importlib.import_module("vibeflow.vibe")
+
+TEST_CACHE_FILE = os.path.join(os.path.dirname(__file__), "vibe.cache.json")
 
 
 @vibe
 def add(a: int, b: int) -> int:
     """Adds two integers and returns their sum."""
     pass
+
+
+def reset_cache():
+    """Clears the caches and removes the cache file of the test functions."""
+    clear_cache()
+    if os.path.exists(TEST_CACHE_FILE):
+        os.remove(TEST_CACHE_FILE)
+
+
+def fake_get_code_for(generated_code):
+    """Returns a stand-in for get_code that serves `generated_code` by function name."""
+
+    def fake_get_code(function_name, *args, **kwargs):
+        return generated_code[function_name]
+
+    return fake_get_code
+
+
+class CacheTestCase(unittest.TestCase):
+    """
+    Starts and ends every test with empty caches. When `generated_code` is set,
+    get_code serves it by function name instead of calling the LLM.
+    """
+
+    generated_code = None
+
+    def setUp(self):
+        reset_cache()
+        if self.generated_code is not None:
+            self.patch_vibe("get_code", fake_get_code_for(self.generated_code))
+
+    def tearDown(self):
+        reset_cache()
+
+    def patch_vibe(self, name, value):
+        """Replaces an attribute of vibeflow.vibe for the duration of the test."""
+        patcher = mock.patch.object(vibe_module, name, value)
+        patcher.start()
+        self.addCleanup(patcher.stop)
@@ -0,0 +1,226 @@
+"""Tests for the VibeCache storage backends."""
+
+import json
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+from vibeflow import VibeCache
+from vibeflow.cache import JSONCacheStore, atomic_write
+from vibeflow import cache as cache_module
+
+WORKERS = 8
+KEYS_PER_WORKER = 25
+
+
+def populate_cache(backend, func_file_path, worker_id):
+    """Writes a batch of entries to the cache, as one worker process would."""
+    cache = VibeCache(backend=backend)
+    for i in range(KEYS_PER_WORKER):
+        cache.set(f"{worker_id}-{i}", f"def f_{worker_id}_{i}(): pass", func_file_path)
+    cache.clear()
+
+
+class TestCacheBackends(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.func_file_path = os.path.join(self.tmp.name, "module.py")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_roundtrip(self):
+        """Every backend persists values across cache instances."""
+        for backend in ("json", "sqlite"):
+            with self.subTest(backend=backend):
+                cache = VibeCache(backend=backend)
+                cache.set("key", "def f(): pass", self.func_file_path)
+                cache.set("other", "def g(): pass", self.func_file_path)
+                cache.delete("other", self.func_file_path)
+                self.assertEqual(cache.stats(), {"total_items": 1, "cached_files": 1})
+                cache.clear()
+
+                reopened = VibeCache(backend=backend)
+                self.assertEqual(
+                    reopened.get("key", self.func_file_path), "def f(): pass"
+                )
+                self.assertIsNone(reopened.get("other", self.func_file_path))
+                reopened.clear()
+
+    def test_value_and_metadata_are_written_together(self):
+        """An owned entry is one write, and metadata merges with what is stored."""
+        owner = {"module": "module", "qualname": "module.f"}
+        for backend in ("json", "sqlite"):
+            with self.subTest(backend=backend):
+                cache = VibeCache(backend=backend)
+                with mock.patch.object(
+                    cache_module, "atomic_write", wraps=atomic_write
+                ) as write:
+                    cache.set("key", "def f(): pass", self.func_file_path, owner=owner)
+                if backend == "json":
+                    self.assertEqual(write.call_count, 1)
+
+                cache.set_meta("key", {"seconds_per_call": 1e-6}, self.func_file_path)
+                cache.set("key", "def f(): return", self.func_file_path, owner=owner)
+                self.assertEqual(
+                    cache.get_meta("key", self.func_file_path),
+                    {"owner": owner, "seconds_per_call": 1e-6},
+                )
+                cache.clear()
+
+    def test_sqlite_imports_json_cache_once(self):
+        """A new SQLite store picks up the entries of an existing vibe.cache.json."""
+        with open(os.path.join(self.tmp.name, "vibe.cache.json"), "w") as f:
+            json.dump({"old": "def old(): pass"}, f)
+
+        cache = VibeCache(backend="sqlite")
+        self.assertEqual(cache.get("old", self.func_file_path), "def old(): pass")
+        cache.delete("old", self.func_file_path)
+        cache.clear()
+
+        # The migration is one-shot, so the deleted entry does not come back
+        reopened = VibeCache(backend="sqlite")
+        self.assertIsNone(reopened.get("old", self.func_file_path))
+        reopened.clear()
+
+    @unittest.skipIf(sys.platform == "win32", "POSIX file modes")
+    def test_atomic_write_keeps_file_modes(self):
+        """New files get the umask's mode and rewritten files keep their own."""
+        path = os.path.join(self.tmp.name, "vibe.cache.json")
+        atomic_write(path, "{}")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o666 & ~cache_module._umask())
+
+        os.chmod(path, 0o640)
+        atomic_write(path, "{}")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+    def test_concurrent_processes_do_not_lose_entries(self):
+        """Many processes writing to the same cache file keep every entry."""
+        for backend in ("json", "sqlite"):
+            with self.subTest(backend=backend):
+                processes = [
+                    multiprocessing.Process(
+                        target=populate_cache,
+                        args=(backend, self.func_file_path, worker_id),
+                    )
+                    for worker_id in range(WORKERS)
+                ]
+                for process in processes:
+                    process.start()
+                for process in processes:
+                    process.join()
+                    self.assertEqual(process.exitcode, 0)
+
+                if backend == "json":
+                    with open(os.path.join(self.tmp.name, "vibe.cache.json")) as f:
+                        self.assertEqual(len(json.load(f)), WORKERS * KEYS_PER_WORKER)
+
+                cache = VibeCache(backend=backend)
+                for worker_id in range(WORKERS):
+                    for i in range(KEYS_PER_WORKER):
+                        self.assertEqual(
+                            cache.get(f"{worker_id}-{i}", self.func_file_path),
+                            f"def f_{worker_id}_{i}(): pass",
+                        )
+                self.assertEqual(
+                    cache.stats()["total_items"], WORKERS * KEYS_PER_WORKER
+                )
+                cache.clear()
+
+    def test_json_store_decodes_values_on_demand(self):
+        """The lazy JSON reader returns the same values as a full parse."""
+        entries = {
+            "plain": "def f():\n    return 1\n",
+            "quotes": 'def g():\n    return "a \\"quoted\\" \\\\ string"\n',
+            "trailing backslash \\": "\\",
+            "unicode": "def h():\n    return '\u00e9\u2603'\n",
+            "empty": "",
+        }
+        path = os.path.join(self.tmp.name, "vibe.cache.json")
+        for indent in (None, 4):
+            with self.subTest(indent=indent):
+                with open(path, "w") as f:
+                    json.dump(entries, f, indent=indent)
+                store = JSONCacheStore(path)
+                self.assertEqual(sorted(store.keys()), sorted(entries))
+                for key, value in entries.items():
+                    self.assertEqual(store.get(key), value)
+                self.assertIsNone(store.get("missing"))
+                store.close()
+
+        # Documents that are not a flat object of strings are still readable
+        with open(path, "w") as f:
+            json.dump({"key": "value", "meta": {"nested": True}}, f)
+        store = JSONCacheStore(path)
+        self.assertEqual(store.get("key"), "value")
+        self.assertEqual(len(store), 2)
+
+    def test_json_store_survives_in_place_truncation(self):
+        """An open snapshot stays readable when another writer truncates the file."""
+        path = os.path.join(self.tmp.name, "vibe.cache.json")
+        with open(path, "w") as f:
+            json.dump({"key": "def f(): pass" * 1000}, f)
+        store = JSONCacheStore(path)
+        self.assertEqual(store.keys(), ["key"])
+
+        with open(path, "r+") as f:
+            f.truncate(0)
+        self.assertEqual(store.get("key"), "def f(): pass" * 1000)
+
+    def test_unreadable_json_cache_is_moved_aside(self):
+        """A write never replaces a cache file that cannot be parsed."""
+        path = os.path.join(self.tmp.name, "vibe.cache.json")
+        document = '{"a": "def a(): pass"'
+        with open(path, "w") as f:
+            f.write(document)
+        store = JSONCacheStore(path)
+        with self.assertWarns(RuntimeWarning):
+            store.set("b", "def b(): pass")
+
+        self.assertEqual(store.keys(), ["b"])
+        (moved,) = [name for name in os.listdir(self.tmp.name) if ".corrupt-" in name]
+        with open(os.path.join(self.tmp.name, moved)) as f:
+            self.assertEqual(f.read(), document)
+
+    def test_compiled_code_is_reused(self):
+        """The bytecode cache serves code compiled from the same source."""
+        patcher = mock.patch.object(sys, "dont_write_bytecode", False)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        cache = VibeCache()
+        source = "def f():\n    return 42\n"
+        code = cache.load_code("key", source, self.func_file_path)
+        bytecode_path = cache._get_bytecode_path("key", self.func_file_path)
+        self.assertTrue(os.path.exists(bytecode_path))
+
+        with mock.patch("vibeflow.cache.compile", create=True) as compile_mock:
+            cached_code = VibeCache().load_code("key", source, self.func_file_path)
+        compile_mock.assert_not_called()
+        self.assertEqual(cached_code, code)
+
+        # A different source, or bytecode from another interpreter, is recompiled
+        other = VibeCache().load_code(
+            "key", "def f():\n    return 7\n", self.func_file_path
+        )
+        namespace = {}
+        exec(other, namespace)
+        self.assertEqual(namespace["f"](), 7)
+
+        with open(bytecode_path, "r+b") as f:
+            f.write(b"\0\0\0\0")
+        namespace = {}
+        exec(VibeCache().load_code("key", source, self.func_file_path), namespace)
+        self.assertEqual(namespace["f"](), 42)
+
+        cache.delete("key", self.func_file_path)
+        self.assertFalse(os.path.exists(bytecode_path))
+
+    def test_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            VibeCache(backend="redis")
+
+
+if __name__ == "__main__":
+    unittest.main()
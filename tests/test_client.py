@@ -0,0 +1,120 @@
+"""Tests for the generation client, run against a stub transport instead of the API."""
+
+import asyncio
+import json
+import unittest
+import httpx
+from vibeflow import client
+
+GENERATED_CODE = "def add(a, b):\n    return a + b\n"
+
+
+def stub_handler(request):
+    """
+    Answers chat completion requests with generated code, batched when asked for JSON.
+    """
+    body = json.loads(request.content)
+    stub_handler.requests.append(body)
+    content = GENERATED_CODE
+    if "response_format" in body:
+        prompt = body["messages"][-1]["content"]
+        names = [name for name in ("add", "sub") if f"Name: {name}" in prompt]
+        content = json.dumps(
+            {
+                "functions": [
+                    {"function_name": name, "code": GENERATED_CODE} for name in names
+                ]
+            }
+        )
+    return httpx.Response(
+        200,
+        json={
+            "id": "chatcmpl-stub",
+            "object": "chat.completion",
+            "created": 0,
+            "model": body["model"],
+            "choices": [
+                {
+                    "index": 0,
+                    "finish_reason": "stop",
+                    "message": {"role": "assistant", "content": content},
+                }
+            ],
+        },
+    )
+
+
+class TestClient(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.saved_config = dict(client._config)
+        stub_handler.requests = []
+        transport = httpx.MockTransport(stub_handler)
+        client.configure(
+            api_key="test-key",
+            base_url="http://stub.local/v1",
+            transport=transport,
+            async_transport=transport,
+            max_connections=4,
+        )
+
+    def tearDown(self):
+        client._config.update(self.saved_config)
+        client._client = client._async_client = None
+
+    def test_clients_are_created_lazily_and_shared(self):
+        client._client = None
+        self.assertIsNone(client._client)
+        self.assertIs(client.get_client(), client.get_client())
+
+    def test_configure_closes_the_replaced_clients(self):
+        sync_client = client.get_client()
+        async_client = client.get_async_client()
+        client.configure(max_connections=8)
+        self.assertTrue(sync_client._client.is_closed)
+        self.assertTrue(async_client._client.is_closed)
+
+    async def test_configure_closes_the_async_client_on_the_running_loop(self):
+        async_client = client.get_async_client()
+        await client.async_get_code(
+            "add", "(a: int, b: int) -> int", "Adds two integers.", is_async=False
+        )
+        client.configure(max_connections=8)
+        await asyncio.gather(*client._closing_tasks)
+        self.assertTrue(async_client._client.is_closed)
+
+    def test_get_code_uses_the_injected_transport(self):
+        code = client.get_code("add", "(a: int, b: int) -> int", "Adds two integers.")
+        self.assertEqual(code, GENERATED_CODE)
+        self.assertEqual(stub_handler.requests[0]["model"], "gpt-4.1")
+
+    async def test_async_get_code_uses_the_injected_transport(self):
+        code = await client.async_get_code(
+            "add", "(a: int, b: int) -> int", "Adds two integers.", is_async=False
+        )
+        self.assertEqual(code, GENERATED_CODE)
+        self.assertEqual(len(stub_handler.requests), 1)
+
+    def test_batch_generation_packs_functions_into_one_request(self):
+        specs = [
+            client.FunctionSpec("add", "(a: int, b: int) -> int", "Adds two integers."),
+            client.FunctionSpec(
+                "sub", "(a: int, b: int) -> int", "Subtracts b from a."
+            ),
+        ]
+        self.assertEqual(client.get_code_batch(specs), [GENERATED_CODE] * 2)
+        self.assertEqual(len(stub_handler.requests), 1)
+
+    async def test_async_batch_generation_splits_by_batch_size(self):
+        specs = [
+            client.FunctionSpec("add", "(a: int, b: int) -> int", "Adds two integers."),
+            client.FunctionSpec(
+                "sub", "(a: int, b: int) -> int", "Subtracts b from a."
+            ),
+        ]
+        codes = await client.async_get_code_batch(specs, batch_size=1)
+        self.assertEqual(codes, [GENERATED_CODE] * 2)
+        self.assertEqual(len(stub_handler.requests), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
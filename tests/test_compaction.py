@@ -0,0 +1,146 @@
+"""Tests for garbage collection of stale cache entries."""
+
+import contextlib
+import io
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+from vibeflow import clear_cache
+from vibeflow.__main__ import main
+from vibeflow.cache import BYTECODE_DIR, cache as global_cache
+from vibeflow.compaction import collect_garbage
+from vibeflow.warmup import discover, import_modules
+
+PACKAGE_SOURCE = {
+    "__init__.py": "",
+    "tools.py": '''
+        from vibeflow import vibe
+
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        class Counter:
+            def __init__(self):
+                self.value = 0
+
+            @vibe
+            def increment(self) -> int:
+                """Increments the counter and returns the new value."""
+                pass
+    ''',
+}
+
+STALE_KEY = "0" * 64
+SCRIPT_KEY = "1" * 64
+UNOWNED_KEY = "2" * 64
+
+
+class TestCompaction(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.package_dir = os.path.join(self.tmp.name, "gc_pkg")
+        os.mkdir(self.package_dir)
+        for filename, source in PACKAGE_SOURCE.items():
+            with open(os.path.join(self.package_dir, filename), "w") as f:
+                f.write(textwrap.dedent(source))
+        sys.path.insert(0, self.tmp.name)
+
+        self.modules = import_modules("gc_pkg")
+        self.tools_path = os.path.join(self.package_dir, "tools.py")
+        self.live = [target.key.cache_key for target in discover(self.modules)]
+
+    def tearDown(self):
+        global_cache.set_backend("json")
+        clear_cache()
+        sys.path.remove(self.tmp.name)
+        for name in [name for name in sys.modules if name.startswith("gc_pkg")]:
+            del sys.modules[name]
+        self.tmp.cleanup()
+
+    def fill_cache(self):
+        owner = {"module": "gc_pkg.tools", "qualname": "gc_pkg.tools.add"}
+        for key in self.live + [STALE_KEY]:
+            global_cache.set(key, f"# code of {key}\n", self.tools_path, owner=owner)
+        # Written by `python gc_pkg/tools.py`, and by an older version without owners
+        script_owner = {"module": "__main__", "qualname": "__main__.add"}
+        global_cache.set(SCRIPT_KEY, "# code\n", self.tools_path, owner=script_owner)
+        global_cache.set(UNOWNED_KEY, "# code\n", self.tools_path)
+        global_cache.set_meta(self.live[0], {"seconds_per_call": 1e-6}, self.tools_path)
+        global_cache.set_meta(STALE_KEY, {"seconds_per_call": 1e-6}, self.tools_path)
+        with mock.patch.object(sys, "dont_write_bytecode", False):
+            for key in (self.live[0], STALE_KEY):
+                global_cache.load_code(key, f"# code of {key}\n", self.tools_path)
+
+    def bytecode_files(self):
+        return sorted(os.listdir(os.path.join(self.package_dir, BYTECODE_DIR)))
+
+    def test_dry_run_reports_without_removing(self):
+        self.fill_cache()
+        cache_file = global_cache._get_cache_file_path(self.tools_path)
+        size = os.path.getsize(cache_file)
+
+        output, errors = io.StringIO(), io.StringIO()
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(errors):
+            self.assertEqual(main(["gc", "gc_pkg"]), 0)
+        self.assertIn("2 stale entries would be removed", output.getvalue())
+        self.assertIn("--apply", output.getvalue())
+        self.assertIn("1 entries record no owning module", errors.getvalue())
+        self.assertEqual(os.path.getsize(cache_file), size)
+        self.assertEqual(len(self.bytecode_files()), 2)
+
+    def test_stale_entries_are_removed(self):
+        self.fill_cache()
+        cache_file = global_cache._get_cache_file_path(self.tools_path)
+        json_size = os.path.getsize(cache_file)
+        bytecode_size = sum(
+            os.path.getsize(os.path.join(self.package_dir, BYTECODE_DIR, name))
+            for name in self.bytecode_files()
+            if name.startswith(STALE_KEY)
+        )
+
+        report = collect_garbage(self.modules, dry_run=False)
+        self.assertEqual(report.removed, 2)
+        self.assertEqual(report.unattributed, 1)
+        self.assertEqual(report.files[0][0], cache_file)
+        self.assertEqual(
+            report.reclaimed_bytes,
+            json_size - os.path.getsize(cache_file) + bytecode_size,
+        )
+
+        clear_cache()
+        self.assertIsNone(global_cache.get(STALE_KEY, self.tools_path))
+        self.assertIsNone(global_cache.get_meta(STALE_KEY, self.tools_path))
+        for key in self.live:
+            self.assertIsNotNone(global_cache.get(key, self.tools_path))
+        self.assertIsNotNone(global_cache.get_meta(self.live[0], self.tools_path))
+        self.assertTrue(
+            all(name.startswith(self.live[0]) for name in self.bytecode_files())
+        )
+        self.assertIsNotNone(global_cache.get(SCRIPT_KEY, self.tools_path))
+        self.assertIsNotNone(global_cache.get(UNOWNED_KEY, self.tools_path))
+
+        self.assertEqual(collect_garbage(self.modules, dry_run=False).removed, 0)
+        report = collect_garbage(self.modules, dry_run=False, include_unowned=True)
+        self.assertEqual(report.removed, 1)
+        self.assertIsNotNone(global_cache.get(SCRIPT_KEY, self.tools_path))
+
+    def test_sqlite_backend(self):
+        global_cache.set_backend("sqlite")
+        self.fill_cache()
+        self.assertEqual(collect_garbage(self.modules).removed, 2)
+        report = collect_garbage(self.modules, dry_run=False)
+        self.assertEqual(report.removed, 2)
+        self.assertGreater(report.reclaimed_bytes, 0)
+        self.assertIsNone(global_cache.get(STALE_KEY, self.tools_path))
+        for key in self.live:
+            self.assertIsNotNone(global_cache.get(key, self.tools_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
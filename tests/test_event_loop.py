@@ -0,0 +1,73 @@
+"""Tests for generating sync @vibe functions from async code."""
+
+import asyncio
+import time
+import unittest
+from unittest import mock
+from vibeflow import vibe
+from vibeflow import client
+from helpers import reset_cache, vibe_module
+
+
+def slow_get_code(function_name, *args, **kwargs):
+    time.sleep(0.2)
+    return f"def {function_name}(x):\n    return x + 1\n"
+
+
+class TestSyncGenerationInEventLoop(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        reset_cache()
+        patcher = mock.patch.object(vibe_module, "get_code", slow_get_code)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        reset_cache()
+
+    async def test_blocking_generation_warns(self):
+        @vibe
+        def increment(x: int) -> int:
+            """Adds one to x."""
+            pass
+
+        with self.assertWarns(RuntimeWarning):
+            self.assertEqual(increment(1), 2)
+
+    async def test_aprepare_does_not_block_the_loop(self):
+        @vibe
+        def increment(x: int) -> int:
+            """Adds one to x."""
+            pass
+
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        ticker_task = asyncio.ensure_future(ticker())
+        await increment.aprepare()
+        ticker_task.cancel()
+
+        self.assertGreater(ticks, 5)
+        self.assertEqual(increment(1), 2)
+
+
+class TestGenerationLimits(unittest.TestCase):
+    def tearDown(self):
+        client.configure(max_concurrency=0, timeout=0)
+
+    def test_waiting_for_a_generation_slot_times_out(self):
+        client.configure(max_concurrency=1, timeout=0.05)
+        with client._generation_slot():
+            with self.assertRaises(TimeoutError):
+                with client._generation_slot():
+                    pass
+        with client._generation_slot():
+            pass
+
+
+if __name__ == "__main__":
+    unittest.main()
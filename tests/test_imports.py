@@ -0,0 +1,121 @@
+"""
+Tests that importing vibeflow and running cached code only loads the standard library.
+"""
+
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import textwrap
+import unittest
+from importlib.util import module_from_spec, spec_from_file_location
+from vibeflow import clear_cache
+from vibeflow.cache import cache as global_cache
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Cumulative import time of `import vibeflow`, generous enough for slow CI machines
+IMPORT_BUDGET_SECONDS = 0.2
+
+LLM_STACK = ("openai", "pydantic", "httpx")
+
+NEW_MODULES_SCRIPT = """
+import sys
+before = set(sys.modules)
+{statements}
+new_modules = sorted(set(sys.modules) - before)
+import json
+print(json.dumps(new_modules))
+"""
+
+
+def run_python(args, cwd=None):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(
+        [cwd or ROOT, ROOT]
+        + [p for p in env.get("PYTHONPATH", "").split(os.pathsep) if p]
+    )
+    return subprocess.run(
+        [sys.executable, *args],
+        cwd=cwd or ROOT,
+        env=env,
+        check=True,
+        capture_output=True,
+        text=True,
+    )
+
+
+def new_modules(statements, cwd=None):
+    """Returns the modules a fresh interpreter imports while running `statements`."""
+    script = NEW_MODULES_SCRIPT.format(statements=statements)
+    return json.loads(run_python(["-c", script], cwd).stdout)
+
+
+@unittest.skipIf(
+    sys.version_info < (3, 10), "sys.stdlib_module_names needs Python 3.10"
+)
+class TestLazyImports(unittest.TestCase):
+    def assert_stdlib_only(self, modules, own=("vibeflow",)):
+        third_party = [
+            name
+            for name in modules
+            if name.split(".")[0] not in sys.stdlib_module_names
+            and name.split(".")[0] not in own
+        ]
+        self.assertEqual(third_party, [])
+
+    def test_import_loads_only_the_standard_library(self):
+        modules = new_modules("import vibeflow")
+        self.assert_stdlib_only(modules)
+        for name in ("asyncio", "concurrent.futures", "sqlite3"):
+            self.assertNotIn(name, modules)
+
+    def test_warm_cache_materializes_without_the_llm_stack(self):
+        clear_cache()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "warm_module.py")
+            with open(path, "w") as f:
+                f.write(
+                    textwrap.dedent(
+                        '''
+                        from vibeflow import vibe
+
+                        @vibe
+                        def add(a: int, b: int) -> int:
+                            """Adds two integers together."""
+                            pass
+                        '''
+                    )
+                )
+            spec = spec_from_file_location("warm_module", path)
+            module = module_from_spec(spec)
+            spec.loader.exec_module(module)
+            resolver = module.add.vibe_resolver
+            global_cache.set(
+                resolver.free_key.cache_key,
+                "def add(a, b):\n    return a + b\n",
+                resolver.func_file_path,
+            )
+            clear_cache()
+
+            modules = new_modules(
+                "import warm_module\nassert warm_module.add(1, 2) == 3", cwd=directory
+            )
+        self.assert_stdlib_only(modules, own=("vibeflow", "warm_module"))
+        for name in LLM_STACK:
+            self.assertNotIn(name, modules)
+
+    def test_import_time_budget(self):
+        stderr = run_python(["-X", "importtime", "-c", "import vibeflow"]).stderr
+        cumulative = [
+            int(line.split("|")[1])
+            for line in stderr.splitlines()
+            if line.rstrip().endswith("| vibeflow")
+        ]
+        self.assertEqual(len(cumulative), 1)
+        self.assertLess(cumulative[0] / 1e6, IMPORT_BUDGET_SECONDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,52 @@
+"""Tests for the cache keys resolved for calls of @vibe functions."""
+
+import unittest
+from vibeflow import vibe
+
+
+@vibe
+def describe(value) -> str:
+    """Returns a short description of value."""
+    pass
+
+
+class Shape:
+    @vibe
+    def area(self) -> float:
+        """Returns the area of the shape."""
+        pass
+
+
+class TestKeyResolver(unittest.TestCase):
+    def test_free_functions_resolve_without_class_lookups(self):
+        resolver = describe.vibe_resolver
+        self.assertTrue(resolver.is_free)
+        for value in (1, "text", Shape()):
+            self.assertIs(resolver.resolve((value,)), resolver.free_key)
+        self.assertEqual(len(resolver._class_keys), 0)
+
+    def test_methods_resolve_per_class(self):
+        resolver = Shape.__dict__["area"].vibe_resolver
+        self.assertFalse(resolver.is_free)
+        key = resolver.resolve((Shape(),))
+        self.assertEqual(key.class_name, "Shape")
+        self.assertIs(resolver.resolve((Shape(),)), key)
+
+    def test_nesting_decides_whether_a_function_is_free(self):
+        @vibe
+        def local(value) -> str:
+            """Returns value as text."""
+            pass
+
+        class Local:
+            @vibe
+            def method(self) -> str:
+                """Returns the name of the class."""
+                pass
+
+        self.assertTrue(local.vibe_resolver.is_free)
+        self.assertFalse(Local.__dict__["method"].vibe_resolver.is_free)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Tests for the bounded cache of materialized functions."""
+
+import unittest
+from unittest import mock
+from vibeflow import vibe, get_cache_stats, set_memory_cache_size
+from vibeflow.lru import LRUCache
+from helpers import CacheTestCase, vibe_module
+
+
+class TestLRUCache(unittest.TestCase):
+    def test_least_recently_used_item_is_evicted(self):
+        cache = LRUCache(maxsize=2)
+        cache["a"] = 1
+        cache["b"] = 2
+        self.assertEqual(cache.get("a"), 1)
+        cache["c"] = 3
+
+        self.assertNotIn("b", cache)
+        self.assertEqual(cache.get("b"), None)
+        self.assertEqual(
+            cache.stats(),
+            {"size": 2, "maxsize": 2, "hits": 1, "misses": 1, "evictions": 1},
+        )
+
+    def test_resize_evicts_down_to_the_new_limit(self):
+        cache = LRUCache()
+        for i in range(5):
+            cache[i] = i
+        cache.resize(2)
+        self.assertEqual(len(cache), 2)
+        self.assertEqual(cache.evictions, 3)
+
+
+class TestMaterializedFunctionCache(CacheTestCase):
+    def tearDown(self):
+        set_memory_cache_size(1024)
+        super().tearDown()
+
+    def test_evictions_are_reported_in_stats(self):
+        """Evicted functions are reloaded from disk and counted in get_cache_stats()."""
+        generated = []
+
+        def fake_get_code(function_name, *args, **kwargs):
+            generated.append(function_name)
+            return f"def {function_name}(x):\n    return x\n"
+
+        @vibe
+        def first(x: int) -> int:
+            """Returns x unchanged."""
+            pass
+
+        @vibe
+        def second(x: int) -> int:
+            """Returns x unchanged."""
+            pass
+
+        set_memory_cache_size(1)
+        with mock.patch.object(vibe_module, "get_code", fake_get_code):
+            first(1)
+            second(2)
+            first(3)
+
+        stats = get_cache_stats()
+        self.assertEqual(stats["in_memory_cache_size"], 1)
+        self.assertEqual(stats["in_memory_cache_maxsize"], 1)
+        self.assertEqual(stats["in_memory_cache_misses"], 3)
+        self.assertEqual(stats["in_memory_cache_evictions"], 2)
+        # The evicted function came back from the disk cache, not the LLM
+        self.assertEqual(generated, ["first", "second"])
+
+
+if __name__ == "__main__":
+    unittest.main()
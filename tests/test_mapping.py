@@ -0,0 +1,123 @@
+"""Tests for the batched map() and amap() of @vibe functions."""
+
+import asyncio
+import itertools
+import unittest
+from unittest import mock
+from vibeflow import LRU, vibe
+from helpers import CacheTestCase, vibe_module
+
+GENERATED_CODE = {
+    "add": "def add(a, b):\n    return a + b\n",
+    "scale": "def scale(self, x):\n    return x * self.factor\n",
+    # Records how many calls were running at the same time
+    "slow_square": (
+        "import asyncio\n\n"
+        "running = [0, 0]\n\n"
+        "async def slow_square(x):\n"
+        "    running[0] += 1\n"
+        "    running[1] = max(running)\n"
+        "    await asyncio.sleep(0.01)\n"
+        "    running[0] -= 1\n"
+        "    return x * x\n"
+    ),
+}
+
+
+async def fake_async_get_code(function_name, *args, **kwargs):
+    return GENERATED_CODE[function_name]
+
+
+class Scaler:
+    def __init__(self, factor: int):
+        self.factor = factor
+
+    @vibe
+    def scale(self, x: int) -> int:
+        """Multiplies x by the factor."""
+        pass
+
+
+async def numbers(count):
+    for number in range(count):
+        yield number
+
+
+class TestMapping(CacheTestCase):
+    generated_code = GENERATED_CODE
+
+    def setUp(self):
+        super().setUp()
+        self.patch_vibe("async_get_code", fake_async_get_code)
+
+    def test_map_resolves_the_implementation_once(self):
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        resolver = add.vibe_resolver
+        with mock.patch.object(resolver, "resolve", wraps=resolver.resolve) as resolve:
+            results = list(add.map(range(100), range(100), workers=4, chunksize=7))
+        self.assertEqual(results, [2 * x for x in range(100)])
+        self.assertEqual(resolve.call_count, 1)
+        self.assertEqual(list(add.map([], [])), [])
+
+    def test_map_consumes_its_input_lazily(self):
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        results = add.map(itertools.count(), itertools.repeat(1), workers=2)
+        self.assertEqual(list(itertools.islice(results, 5)), [1, 2, 3, 4, 5])
+        results.close()
+
+    def test_map_of_a_method(self):
+        scalers = [Scaler(2), Scaler(3), Scaler(4)]
+        self.assertEqual(list(Scaler.scale.map(scalers, [1, 1, 1])), [2, 3, 4])
+
+    def test_amap_bounds_concurrency(self):
+        @vibe
+        async def slow_square(x: int) -> int:
+            """Returns the square of x, slowly."""
+            pass
+
+        async def main():
+            return [
+                result async for result in slow_square.amap(numbers(20), concurrency=3)
+            ]
+
+        self.assertEqual(asyncio.run(main()), [x * x for x in range(20)])
+        live_function = vibe_module.materialized_functions.peek(
+            slow_square.vibe_resolver.free_key.cache_key
+        )
+        self.assertEqual(live_function.__globals__["running"][1], 3)
+
+        # From sync code, map() drives amap() on a private event loop
+        self.assertEqual(list(slow_square.map(range(5), workers=2)), [0, 1, 4, 9, 16])
+
+    def test_amap_of_a_sync_function(self):
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        async def main():
+            return [result async for result in add.amap(numbers(10), range(10, 20))]
+
+        self.assertEqual(asyncio.run(main()), [x + x + 10 for x in range(10)])
+
+    def test_memoized_batches_use_the_memoized_results(self):
+        @vibe(memoize=LRU())
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        self.assertEqual(list(add.map([1, 1, 2], [1, 1, 2], workers=1)), [2, 2, 4])
+        stats = add.vibe_resolver.result_cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()
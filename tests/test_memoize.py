@@ -0,0 +1,117 @@
+"""Tests for memoizing the results of @vibe functions."""
+
+import asyncio
+import time
+import unittest
+from vibeflow import LRU, vibe, get_cache_stats
+from vibeflow.memoize import argument_key
+from helpers import CacheTestCase, vibe_module
+
+# Each generated function records its executions in a module-level `calls`
+GENERATED_CODE = {
+    "total": (
+        "calls = []\n\n"
+        "def total(values):\n"
+        "    calls.append(values)\n"
+        "    return sum(values)\n"
+    ),
+    "slow_double": (
+        "import asyncio\n\n"
+        "calls = []\n\n"
+        "async def slow_double(x):\n"
+        "    calls.append(x)\n"
+        "    await asyncio.sleep(0.05)\n"
+        "    return x * 2\n"
+    ),
+}
+
+
+async def fake_async_get_code(function_name, *args, **kwargs):
+    return GENERATED_CODE[function_name]
+
+
+def executions(function):
+    """Returns the arguments of every execution of the generated code of `function`."""
+    key = function.vibe_resolver.free_key
+    return vibe_module.materialized_functions.peek(key.cache_key).__globals__["calls"]
+
+
+class TestArgumentKey(unittest.TestCase):
+    def test_unhashable_arguments_fall_back_to_frozen_keys(self):
+        self.assertEqual(argument_key(([1, 2],), {}), argument_key(([1, 2],), {}))
+        self.assertNotEqual(argument_key(([1, 2],), {}), argument_key(((1, 2),), {}))
+        self.assertEqual(
+            argument_key((), {"a": {"x": [1]}, "b": 2}),
+            argument_key((), {"b": 2, "a": {"x": [1]}}),
+        )
+        self.assertIsNone(argument_key(({1: object.__new__(Unhashable)},), {}))
+
+
+class Unhashable:
+    __hash__ = None
+
+
+class TestMemoize(CacheTestCase):
+    generated_code = GENERATED_CODE
+
+    def setUp(self):
+        super().setUp()
+        self.patch_vibe("async_get_code", fake_async_get_code)
+
+    def test_results_are_memoized_per_argument_tuple(self):
+        @vibe(memoize=LRU(maxsize=2))
+        def total(values: list) -> int:
+            """Returns the sum of the values."""
+            pass
+
+        self.assertEqual(total([1, 2]), 3)
+        self.assertEqual(total([1, 2]), 3)
+        self.assertEqual(total([3]), 3)
+        self.assertEqual(total([4]), 4)
+        self.assertEqual(total([1, 2]), 3)  # evicted by [4]
+        self.assertEqual(executions(total), [[1, 2], [3], [4], [1, 2]])
+
+        stats = get_cache_stats()
+        function_stats = stats["memoized"][total.vibe_resolver.qualname]
+        self.assertEqual(function_stats["hits"], 1)
+        self.assertEqual(function_stats["misses"], 4)
+        self.assertEqual(function_stats["evictions"], 2)
+        self.assertEqual(stats["memoized_hits"], 1)
+
+    def test_results_expire_after_the_ttl(self):
+        @vibe(memoize=LRU(ttl=0.05))
+        def total(values: list) -> int:
+            """Returns the sum of the values."""
+            pass
+
+        total((1,))
+        total((1,))
+        self.assertEqual(len(executions(total)), 1)
+        time.sleep(0.06)
+        total((1,))
+        self.assertEqual(len(executions(total)), 2)
+        self.assertEqual(total.vibe_resolver.result_cache.stats()["expirations"], 1)
+
+    def test_concurrent_async_calls_are_coalesced(self):
+        @vibe(memoize=LRU())
+        async def slow_double(x: int) -> int:
+            """Returns twice x, slowly."""
+            pass
+
+        async def main():
+            first = await asyncio.gather(*(slow_double(21) for _ in range(10)))
+            second = await slow_double(21)
+            return first, second
+
+        first, second = asyncio.run(main())
+        self.assertEqual(first, [42] * 10)
+        self.assertEqual(second, 42)
+        self.assertEqual(executions(slow_double), [21])
+
+    def test_memoize_and_hot_swap_are_exclusive(self):
+        with self.assertRaises(ValueError):
+            vibe(memoize=LRU(), hot_swap=True)(lambda x: x)
+
+
+if __name__ == "__main__":
+    unittest.main()
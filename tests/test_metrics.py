@@ -0,0 +1,95 @@
+"""Tests for the runtime metrics of @vibe functions."""
+
+import asyncio
+import unittest
+from unittest import mock
+from vibeflow import vibe, clear_cache, metrics
+from helpers import CacheTestCase, vibe_module
+
+
+def fake_get_code(function_name, *args, **kwargs):
+    return f"def {function_name}(a, b):\n    return a + b\n"
+
+
+async def fake_async_get_code(function_name, *args, **kwargs):
+    return f"async def {function_name}(a, b):\n    return a + b\n"
+
+
+class TestMetrics(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.reset()
+        metrics.enable()
+
+    def tearDown(self):
+        metrics.disable()
+        metrics.reset()
+        super().tearDown()
+
+    def test_calls_and_cache_outcomes_are_recorded(self):
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        with mock.patch.object(vibe_module, "get_code", fake_get_code):
+            for i in range(3):
+                add(i, i)
+        clear_cache()
+        add(1, 1)
+
+        (entry,) = metrics.snapshot()
+        self.assertTrue(entry["function"].endswith("add"))
+        self.assertEqual(entry["calls"], 4)
+        self.assertEqual(entry["memory_hits"], 2)
+        self.assertEqual(entry["disk_hits"], 1)
+        self.assertEqual(entry["generations"], 1)
+        self.assertEqual(entry["call_latency"]["count"], 4)
+        self.assertEqual(entry["call_latency"]["buckets"]["+Inf"], 4)
+        self.assertEqual(entry["generation_latency"]["count"], 1)
+
+        text = metrics.to_prometheus()
+        self.assertIn("# TYPE vibeflow_calls_total counter", text)
+        self.assertIn(f'cache_key="{entry["cache_key"]}"}} 4', text)
+        self.assertIn("vibeflow_call_duration_seconds_bucket{", text)
+
+    def test_batched_calls_are_recorded(self):
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        @vibe
+        async def async_add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        async def amap(function):
+            return [result async for result in function.amap(range(3), range(3))]
+
+        with mock.patch.object(vibe_module, "get_code", fake_get_code):
+            self.assertEqual(list(add.map(range(4), range(4))), [0, 2, 4, 6])
+            self.assertEqual(asyncio.run(amap(add)), [0, 2, 4])
+        with mock.patch.object(vibe_module, "async_get_code", fake_async_get_code):
+            self.assertEqual(asyncio.run(amap(async_add)), [0, 2, 4])
+
+        calls = {entry["function"]: entry["calls"] for entry in metrics.snapshot()}
+        self.assertEqual(calls[add.vibe_resolver.qualname], 7)
+        self.assertEqual(calls[async_add.vibe_resolver.qualname], 3)
+
+    def test_nothing_is_recorded_when_disabled(self):
+        metrics.disable()
+
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        with mock.patch.object(vibe_module, "get_code", fake_get_code):
+            add(1, 2)
+            add(3, 4)
+        self.assertEqual(metrics.snapshot(), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""Tests for the module namespace generated code runs in."""
+
+import unittest
+from vibeflow import vibe
+from helpers import CacheTestCase
+
+GENERATED_CODE = {
+    "hypotenuse": (
+        "import math\n"
+        "from functools import reduce\n"
+        "\n"
+        "def hypotenuse(a, b):\n"
+        "    return math.sqrt(reduce(lambda total, x: total + x * x, (a, b), 0))\n"
+    ),
+    "leaks": "def leaks():\n    return global_cache\n",
+    "sees_math": "def sees_math():\n    return math.pi\n",
+}
+
+
+@vibe
+def hypotenuse(a: float, b: float) -> float:
+    """Returns the length of the hypotenuse of a right triangle with legs a and b."""
+    pass
+
+
+@vibe
+def leaks():
+    """Returns the global cache of vibeflow."""
+    pass
+
+
+@vibe
+def sees_math():
+    """Returns pi from the math module."""
+    pass
+
+
+class TestGeneratedNamespace(CacheTestCase):
+    generated_code = GENERATED_CODE
+
+    def test_top_level_imports_are_visible_in_the_body(self):
+        self.assertEqual(hypotenuse(3, 4), 5.0)
+
+    def test_globals_of_vibeflow_are_not_visible(self):
+        with self.assertRaises(NameError):
+            leaks()
+
+    def test_each_function_has_its_own_namespace(self):
+        hypotenuse(3, 4)
+        # math was imported by the code of another function only
+        with self.assertRaises(NameError):
+            sees_math()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,145 @@
+"""Tests for offline mode and eager materialization of cached functions."""
+
+import asyncio
+import importlib
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+from vibeflow import (
+    CacheMissError,
+    clear_cache,
+    freeze,
+    get_cache_stats,
+    set_offline,
+    warm_state,
+)
+from vibeflow.cache import cache as global_cache
+from helpers import vibe_module
+
+PACKAGE_SOURCE = {
+    "__init__.py": "",
+    "handlers.py": '''
+        from vibeflow import vibe
+
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        class Counter:
+            def __init__(self):
+                self.value = 0
+
+            @vibe
+            async def increment(self) -> int:
+                """Increments the counter and returns the new value."""
+                pass
+    ''',
+}
+
+GENERATED_CODE = {
+    "add": "def add(a, b):\n    return a + b\n",
+    "increment": (
+        "async def increment(self):\n    self.value += 1\n    return self.value\n"
+    ),
+}
+
+
+def unexpected_generation(*args, **kwargs):
+    raise AssertionError("Code generation was attempted in offline mode.")
+
+
+class TestOfflineMode(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        package_dir = os.path.join(self.tmp.name, "offline_pkg")
+        os.mkdir(package_dir)
+        for filename, source in PACKAGE_SOURCE.items():
+            with open(os.path.join(package_dir, filename), "w") as f:
+                f.write(textwrap.dedent(source))
+        sys.path.insert(0, self.tmp.name)
+        self.handlers = importlib.import_module("offline_pkg.handlers")
+
+        set_offline(True)
+        for name in ("get_code", "async_get_code"):
+            patcher = mock.patch.object(vibe_module, name, unexpected_generation)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        set_offline(False)
+        vibe_module._frozen_modules.clear()
+        vibe_module._frozen_targets.clear()
+        clear_cache()
+        sys.path.remove(self.tmp.name)
+        for name in [name for name in sys.modules if name.startswith("offline_pkg")]:
+            del sys.modules[name]
+        self.tmp.cleanup()
+
+    def cache_code(self, function, cls=None):
+        resolver = function.vibe_resolver
+        key = resolver.for_owner(cls)
+        code = GENERATED_CODE[key.function_name]
+        global_cache.set(key.cache_key, code, resolver.func_file_path)
+
+    def test_miss_raises_a_precise_error(self):
+        with self.assertRaises(CacheMissError) as raised:
+            self.handlers.add(1, 2)
+        message = str(raised.exception)
+        self.assertIn("offline_pkg.handlers.add", message)
+        self.assertIn(self.handlers.add.vibe_resolver.free_key.cache_key, message)
+        self.assertIn("python -m vibeflow warm offline_pkg.handlers", message)
+
+        with self.assertRaises(CacheMissError) as raised:
+            asyncio.run(self.handlers.Counter().increment())
+        self.assertIn("offline_pkg.handlers.Counter.increment", str(raised.exception))
+
+    def test_cached_functions_are_served(self):
+        self.cache_code(self.handlers.add)
+        self.assertEqual(self.handlers.add(1, 2), 3)
+
+    def test_freeze_materializes_everything_up_front(self):
+        self.cache_code(self.handlers.add)
+        self.cache_code(self.handlers.Counter.increment, self.handlers.Counter)
+        # Nothing is frozen, so stats do not look for unmaterialized functions
+        self.assertIsNone(get_cache_stats()["fully_warm"])
+        self.assertEqual(len(warm_state("offline_pkg")), 2)
+
+        self.assertEqual(freeze("offline_pkg"), [])
+        stats = get_cache_stats()
+        self.assertTrue(stats["offline"])
+        self.assertTrue(stats["fully_warm"])
+        self.assertEqual(stats["in_memory_cache_size"], 2)
+        self.assertEqual(warm_state(self.handlers), [])
+
+        with mock.patch.object(global_cache, "get", unexpected_generation):
+            self.assertEqual(self.handlers.add(2, 3), 5)
+            self.assertEqual(asyncio.run(self.handlers.Counter().increment()), 1)
+
+    def test_freeze_reports_missing_functions(self):
+        self.cache_code(self.handlers.add)
+        with self.assertRaises(CacheMissError) as raised:
+            freeze(self.handlers)
+        self.assertIn("offline_pkg.handlers.Counter.increment", str(raised.exception))
+
+        set_offline(False)
+        self.assertEqual(
+            freeze(self.handlers), ["offline_pkg.handlers.Counter.increment"]
+        )
+        stats = get_cache_stats()
+        self.assertFalse(stats["fully_warm"])
+        self.assertEqual(
+            stats["not_materialized"], ["offline_pkg.handlers.Counter.increment"]
+        )
+
+        # The functions found by freeze() are reused rather than discovered again
+        with mock.patch.object(vibe_module, "discover", side_effect=AssertionError):
+            self.assertFalse(get_cache_stats()["fully_warm"])
+
+
+if __name__ == "__main__":
+    unittest.main()
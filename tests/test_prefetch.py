@@ -0,0 +1,109 @@
+"""Tests for speculative prefetching of sibling @vibe functions."""
+
+import asyncio
+import threading
+import time
+import unittest
+from vibeflow import vibe
+from helpers import CacheTestCase, vibe_module
+
+
+class Account:
+    def __init__(self, balance: int):
+        self.balance = balance
+
+    @vibe
+    def deposit(self, amount: int) -> int:
+        """Adds amount to the balance and returns the new balance."""
+        pass
+
+    @vibe
+    def withdraw(self, amount: int) -> int:
+        """Subtracts amount from the balance and returns the new balance."""
+        pass
+
+    @vibe
+    async def audit(self) -> int:
+        """Returns the current balance."""
+        pass
+
+
+GENERATED_CODE = {
+    "deposit": (
+        "def deposit(self, amount):\n"
+        "    self.balance += amount\n"
+        "    return self.balance\n"
+    ),
+    "withdraw": (
+        "def withdraw(self, amount):\n"
+        "    self.balance -= amount\n"
+        "    return self.balance\n"
+    ),
+    "audit": "async def audit(self):\n    return self.balance\n",
+}
+
+
+class TestPrefetch(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.generated = []
+        self.threads = []
+        self.lock = threading.Lock()
+
+        def fake_get_code(function_name, *args, **kwargs):
+            with self.lock:
+                self.generated.append(function_name)
+                self.threads.append(threading.current_thread().name)
+            return GENERATED_CODE[function_name]
+
+        async def fake_async_get_code(function_name, *args, **kwargs):
+            return fake_get_code(function_name)
+
+        self.patch_vibe("get_code", fake_get_code)
+        self.patch_vibe("async_get_code", fake_async_get_code)
+        vibe_module.set_prefetch(True)
+
+    def tearDown(self):
+        vibe_module.set_prefetch(False)
+        super().tearDown()
+
+    def wait_for_generations(self, count):
+        deadline = time.monotonic() + 5
+        while len(self.generated) < count and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Let the background materializations finish as well
+        vibe_module._get_prefetch_executor().submit(lambda: None).result()
+
+    def test_first_sync_miss_prefetches_the_class(self):
+        account = Account(10)
+        self.assertEqual(account.deposit(5), 15)
+        self.wait_for_generations(3)
+        self.assertEqual(sorted(self.generated), ["audit", "deposit", "withdraw"])
+        # The siblings are generated on the prefetch pool, not the shared one
+        self.assertEqual(self.threads[0], threading.current_thread().name)
+        self.assertTrue(
+            all(name.startswith("vibeflow-prefetch") for name in self.threads[1:])
+        )
+
+        # The siblings are served from the caches, not generated again
+        self.assertEqual(account.withdraw(3), 12)
+        self.assertEqual(asyncio.run(account.audit()), 12)
+        self.assertEqual(len(self.generated), 3)
+
+    def test_first_async_miss_prefetches_the_class(self):
+        async def scenario():
+            account = Account(10)
+            balance = await account.audit()
+            # Give the background tasks a chance to run
+            while len(self.generated) < 3:
+                await asyncio.sleep(0.01)
+            return balance
+
+        self.assertEqual(asyncio.run(scenario()), 10)
+        self.wait_for_generations(3)
+        self.assertEqual(Account(1).deposit(1), 2)
+        self.assertEqual(sorted(self.generated), ["audit", "deposit", "withdraw"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+"""Tests for running @vibe functions in the process pool."""
+
+import asyncio
+import os
+import unittest
+from vibeflow import vibe
+from vibeflow.process import configure_process_pool
+from helpers import CacheTestCase
+
+GENERATED_CODE = {
+    "square": "import os\n\ndef square(x):\n    return x * x, os.getpid()\n",
+    "power": "def power(self, x):\n    return x ** self.exponent\n",
+}
+
+
+class Power:
+    def __init__(self, exponent: int):
+        self.exponent = exponent
+
+    @vibe(executor="process")
+    def power(self, x: int) -> int:
+        """Raises x to the exponent."""
+        pass
+
+
+class TestProcessExecutor(CacheTestCase):
+    generated_code = GENERATED_CODE
+
+    @classmethod
+    def setUpClass(cls):
+        configure_process_pool(max_workers=2)
+
+    @classmethod
+    def tearDownClass(cls):
+        configure_process_pool()
+
+    def test_function_runs_in_a_worker_process(self):
+        @vibe(executor="process")
+        def square(x: int) -> int:
+            """Returns the square of x."""
+            pass
+
+        value, pid = square(7)
+        self.assertEqual(value, 49)
+        self.assertNotEqual(pid, os.getpid())
+
+    def test_map_and_acall(self):
+        @vibe(executor="process")
+        def square(x: int) -> int:
+            """Returns the square of x."""
+            pass
+
+        results = list(square.map(range(10), chunksize=3))
+        self.assertEqual([value for value, _ in results], [x * x for x in range(10)])
+        # Accepted like the thread-based map, capping the chunks in flight
+        results = list(square.map(range(10), workers=1, chunksize=3))
+        self.assertEqual([value for value, _ in results], [x * x for x in range(10)])
+        self.assertEqual(list(square.map([])), [])
+
+        value, _ = asyncio.run(square.acall(5))
+        self.assertEqual(value, 25)
+
+        async def amap():
+            return [value async for value, _ in square.amap(range(6), concurrency=2)]
+
+        self.assertEqual(asyncio.run(amap()), [x * x for x in range(6)])
+
+    def test_methods_receive_their_instance(self):
+        self.assertEqual(Power(3).power(2), 8)
+        self.assertEqual(list(Power.power.map([Power(2)] * 3, [1, 2, 3])), [1, 4, 9])
+
+    def test_invalid_options_are_rejected(self):
+        async def coroutine(x: int) -> int:
+            """Returns x."""
+
+        with self.assertRaises(ValueError):
+            vibe(executor="process")(coroutine)
+        with self.assertRaises(ValueError):
+            vibe(executor="thread")(lambda x: x)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+"""Tests for tracebacks, debug copies and profiles of generated code."""
+
+import io
+import linecache
+import os
+import tempfile
+import traceback
+import unittest
+from unittest import mock
+from vibeflow import vibe, clear_cache, profile, set_memory_cache_size
+from helpers import CacheTestCase, vibe_module
+
+GENERATED_CODE = {
+    "mean": (
+        "def _total(values):\n"
+        "    return sum(values)\n"
+        "\n"
+        "def mean(values):\n"
+        "    return _total(values) / len(values)\n"
+    ),
+    "total": "def total(values):\n    return sum(values)\n",
+}
+
+
+@vibe
+def mean(values: list) -> float:
+    """Returns the arithmetic mean of the values."""
+    pass
+
+
+@vibe
+def total(values: list) -> float:
+    """Returns the sum of the values."""
+    pass
+
+
+class TestGeneratedSource(CacheTestCase):
+    generated_code = GENERATED_CODE
+
+    def tearDown(self):
+        set_memory_cache_size(1024)
+        super().tearDown()
+
+    def live_function(self):
+        mean([1])
+        return vibe_module.materialized_functions.peek(
+            mean.vibe_resolver.free_key.cache_key
+        )
+
+    def test_tracebacks_show_the_generated_code(self):
+        try:
+            mean([])
+        except ZeroDivisionError as e:
+            frame = traceback.extract_tb(e.__traceback__)[-1]
+        else:
+            self.fail("ZeroDivisionError not raised")
+        self.assertTrue(frame.filename.startswith("<vibeflow:mean:"))
+        self.assertEqual(frame.line, "return _total(values) / len(values)")
+
+        info = self.live_function().vibe_info
+        self.assertEqual(info["filename"], frame.filename)
+        line = mean.__wrapped__.__code__.co_firstlineno
+        self.assertEqual(info["origin"], f"{__name__}.mean ({__file__}:{line})")
+        linecache.checkcache()
+        self.assertEqual(
+            linecache.getline(frame.filename, 2), "    return sum(values)\n"
+        )
+
+    def test_debug_dir_gets_a_copy_of_the_code(self):
+        with tempfile.TemporaryDirectory() as debug_dir:
+            with mock.patch.object(vibe_module, "DEBUG_DIR", debug_dir):
+                filename = self.live_function().vibe_info["filename"]
+            self.assertEqual(os.path.dirname(filename), os.path.abspath(debug_dir))
+            with open(filename) as f:
+                source = f.read()
+        self.assertTrue(source.startswith(GENERATED_CODE["mean"]))
+        self.assertIn(f"for {__name__}.mean (", source)
+
+    def test_sources_are_dropped_with_their_function(self):
+        set_memory_cache_size(1)
+        filename = self.live_function().vibe_info["filename"]
+        self.assertIn(filename, vibe_module.generated_files)
+        self.assertIn(filename, linecache.cache)
+
+        total([1])
+        self.assertNotIn(filename, vibe_module.generated_files)
+        self.assertNotIn(filename, linecache.cache)
+
+        clear_cache()
+        self.assertEqual(vibe_module.generated_files, {})
+        self.assertFalse(any(name.startswith("<vibeflow:") for name in linecache.cache))
+
+    def test_profile_reports_each_generated_function(self):
+        self.live_function()
+        output = io.StringIO()
+        with profile(output) as report:
+            for _ in range(50):
+                mean([1, 2, 3])
+
+        [stats] = report.functions
+        self.assertEqual(stats.name, "mean")
+        self.assertEqual(stats.calls, 50)
+        self.assertIn(f"{__name__}.mean", stats.origin)
+        self.assertGreaterEqual(stats.cumulative_time, 0)
+        self.assertIn(f"{__name__}.mean", output.getvalue())
+
+
+if __name__ == "__main__":
+    unittest.main()
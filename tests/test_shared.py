@@ -0,0 +1,170 @@
+"""Tests for the content-addressed shared cache store."""
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from vibeflow import vibe, clear_cache
+from vibeflow.cache import cache as global_cache
+from vibeflow.shared import DirectoryStore, HTTPStore, content_key
+from helpers import TEST_CACHE_FILE, CacheTestCase
+
+
+def add(a: int, b: int) -> int:
+    """Adds two integers together."""
+    pass
+
+
+def decorate_in_module(func, module):
+    """Decorates a copy of `func` that claims to be defined in `module`."""
+    copy = type(func)(func.__code__, func.__globals__, func.__name__)
+    copy.__doc__ = func.__doc__
+    copy.__annotations__ = func.__annotations__
+    copy.__module__ = module
+    return vibe(copy)
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """A minimal remote store that keeps entries in memory."""
+
+    entries = {}
+
+    def do_GET(self):
+        value = self.entries.get(self.path)
+        if value is None:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.end_headers()
+        self.wfile.write(value)
+
+    def do_PUT(self):
+        self.entries[self.path] = self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(204)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TruncatingHandler(BaseHTTPRequestHandler):
+    """A remote store whose responses end before their announced length."""
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "100")
+        self.end_headers()
+        self.wfile.write(b"def f():\n")
+
+    def log_message(self, *args):
+        pass
+
+
+class TestContentKey(unittest.TestCase):
+    def test_module_name_is_not_part_of_the_content_key(self):
+        first = decorate_in_module(add, "service_a.math").vibe_resolver.free_key
+        second = decorate_in_module(add, "service_b.utils").vibe_resolver.free_key
+        self.assertNotEqual(first.cache_key, second.cache_key)
+        self.assertEqual(first.content_key, second.content_key)
+
+    def test_spec_changes_the_content_key(self):
+        base = content_key("add", "(a, b)", "Adds a and b.")
+        self.assertEqual(base, content_key("add", "(a, b)", "  Adds a and b.\n"))
+        self.assertNotEqual(
+            base, content_key("add", "(a, b)", "Adds a and b.", is_async=True)
+        )
+        self.assertNotEqual(base, content_key("add", "(a, b, c)", "Adds a and b."))
+
+
+class TestSharedStore(CacheTestCase):
+    def setUp(self):
+        super().setUp()
+        self.shared_dir = tempfile.mkdtemp()
+        self.generated = []
+
+        def fake_get_code(function_name, *args, **kwargs):
+            self.generated.append(function_name)
+            return f"def {function_name}(a, b):\n    return a + b\n"
+
+        self.patch_vibe("get_code", fake_get_code)
+
+    def tearDown(self):
+        global_cache.set_shared_store(None)
+        global_cache.shared_hits = 0
+        super().tearDown()
+        shutil.rmtree(self.shared_dir)
+
+    def assert_generated_once_across_modules(self):
+        self.assertEqual(decorate_in_module(add, "service_a.math")(1, 2), 3)
+
+        # A fresh checkout elsewhere: empty directory cache, different module name
+        clear_cache()
+        os.remove(TEST_CACHE_FILE)
+        self.assertEqual(decorate_in_module(add, "service_b.utils")(2, 3), 5)
+
+        self.assertEqual(self.generated, ["add"])
+        self.assertEqual(global_cache.stats()["shared_hits"], 1)
+        # The shared entry was copied into the directory cache
+        clear_cache()
+        self.assertEqual(decorate_in_module(add, "service_b.utils")(3, 4), 7)
+        self.assertEqual(global_cache.stats()["shared_hits"], 1)
+
+    def test_directory_store(self):
+        global_cache.set_shared_store(self.shared_dir)
+        self.assertIsInstance(global_cache.shared, DirectoryStore)
+        self.assert_generated_once_across_modules()
+
+    def test_http_store(self):
+        StubHandler.entries = {}
+        server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        global_cache.set_shared_store(f"http://127.0.0.1:{server.server_port}/vibes")
+        self.assertIsInstance(global_cache.shared, HTTPStore)
+        self.assert_generated_once_across_modules()
+        self.assertEqual(len(StubHandler.entries), 1)
+
+    def test_invalid_shared_entries_are_a_miss(self):
+        global_cache.set_shared_store(self.shared_dir)
+        function = decorate_in_module(add, "service_a.math")
+        key = function.vibe_resolver.free_key
+        global_cache.shared.set(
+            key.content_key, "<html><body>502 Bad Gateway</body></html>"
+        )
+
+        self.assertEqual(function(1, 2), 3)
+        self.assertEqual(self.generated, ["add"])
+        self.assertEqual(global_cache.stats()["shared_hits"], 0)
+        self.assertEqual(
+            global_cache.get(key.cache_key, __file__),
+            "def add(a, b):\n    return a + b\n",
+        )
+
+    def test_unreachable_http_store_is_a_miss(self):
+        store = HTTPStore("http://127.0.0.1:9", timeout=0.5)
+        self.assertIsNone(store.get("0" * 64))
+        store.set("0" * 64, "def f():\n    pass\n")
+
+    def test_truncated_http_response_is_a_miss(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), TruncatingHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        store = HTTPStore(f"http://127.0.0.1:{server.server_port}/vibes")
+        self.assertIsNone(store.get("0" * 64))
+
+    def test_undecodable_directory_entry_is_a_miss(self):
+        store = DirectoryStore(self.shared_dir)
+        store.set("0" * 64, "def f():\n    pass\n")
+        with open(store._entry_path("0" * 64), "wb") as f:
+            f.write(b"def f():\n    return '\xff'\n")
+        self.assertIsNone(store.get("0" * 64))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,104 @@
+"""Tests for single-flight generation of cold @vibe functions."""
+
+import asyncio
+import threading
+import time
+import unittest
+from unittest import mock
+from vibeflow import vibe, get_cache_stats
+from vibeflow.singleflight import SingleFlight
+from helpers import reset_cache, vibe_module
+
+
+class TestSingleFlight(unittest.TestCase):
+    def test_concurrent_threads_share_one_run(self):
+        """
+        Threads asking for the same key while it is in flight get the leader's result.
+        """
+        flight = SingleFlight()
+        runs = []
+        started = threading.Event()
+
+        def work():
+            runs.append(1)
+            started.set()
+            time.sleep(0.1)
+            return "result"
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(flight.do("key", work)))
+            for _ in range(10)
+        ]
+        threads[0].start()
+        started.wait()
+        for thread in threads[1:]:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(results, ["result"] * 10)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_errors_are_shared_and_not_remembered(self):
+        """Waiters see the leader's exception, and the next call runs again."""
+        flight = SingleFlight()
+
+        def fail():
+            raise ValueError("boom")
+
+        with self.assertRaises(ValueError):
+            flight.do("key", fail)
+        self.assertEqual(flight.do("key", lambda: "ok"), "ok")
+
+
+class TestSingleFlightAsync(unittest.IsolatedAsyncioTestCase):
+    async def test_concurrent_tasks_share_one_run(self):
+        """Tasks awaiting the same key while it is in flight get the leader's result."""
+        flight = SingleFlight()
+        runs = []
+
+        async def work():
+            runs.append(1)
+            await asyncio.sleep(0.05)
+            return "result"
+
+        results = await asyncio.gather(
+            *(flight.do_async("key", work) for _ in range(50))
+        )
+        self.assertEqual(len(runs), 1)
+        self.assertEqual(results, ["result"] * 50)
+
+
+class TestColdStart(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        reset_cache()
+
+    def tearDown(self):
+        reset_cache()
+
+    async def test_cold_async_function_is_generated_once(self):
+        """Hundreds of concurrent first calls result in a single generation."""
+        generations = []
+
+        async def fake_async_get_code(function_name, *args, **kwargs):
+            generations.append(function_name)
+            await asyncio.sleep(0.05)
+            return "async def double(x):\n    return x * 2\n"
+
+        @vibe
+        async def double(x: int) -> int:
+            """Doubles the given integer."""
+            pass
+
+        with mock.patch.object(vibe_module, "async_get_code", fake_async_get_code):
+            results = await asyncio.gather(*(double(i) for i in range(200)))
+
+        self.assertEqual(results, [i * 2 for i in range(200)])
+        self.assertEqual(generations, ["double"])
+        self.assertEqual(get_cache_stats()["disk_cache_items"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Tests for tuned generation: several candidates, checked and timed, the fastest cached.
+"""
+
+import asyncio
+import importlib
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from vibeflow import vibe, client
+from vibeflow.cache import cache as global_cache
+from vibeflow.validation import InvalidCodeError
+from helpers import CacheTestCase, vibe_module
+
+tuning = importlib.import_module("vibeflow.tuning")
+
+SLOW = (
+    "def total(n):\n"
+    "    result = 0\n"
+    "    for i in range(n + 1):\n"
+    "        result += i\n"
+    "    return result\n"
+)
+FAST = "def total(n):\n    return n * (n + 1) // 2\n"
+WRONG = "def total(n):\n    return n * n\n"
+BROKEN = "def total(n):\n    return undefined_name\n"
+
+
+def candidates(*codes):
+    def fake_get_code_candidates(function_name, *args, **kwargs):
+        return list(codes)
+
+    return fake_get_code_candidates
+
+
+class TestTune(CacheTestCase):
+    def test_fastest_correct_candidate_is_cached(self):
+        @vibe
+        def total(n: int) -> int:
+            """Returns the sum of the integers from 0 to n."""
+            pass
+
+        fake = candidates(WRONG, SLOW, BROKEN, FAST)
+        with mock.patch.object(tuning, "get_code_candidates", fake):
+            result = tuning.tune(
+                total, [(100,), (1000,)], expected=[5050, 500500], repeat=1
+            )
+
+        self.assertEqual(result.code, FAST)
+        self.assertIsNone(result.timings[0])
+        self.assertIsNone(result.timings[2])
+        self.assertLess(result.timings[3], result.timings[1])
+
+        func_file_path = total.vibe_resolver.func_file_path
+        self.assertEqual(global_cache.get(result.cache_key, func_file_path), FAST)
+        meta = global_cache.get_meta(result.cache_key, func_file_path)
+        self.assertEqual((meta["candidates"], meta["correct"]), (4, 2))
+        self.assertEqual(meta["seconds_per_call"], result.seconds_per_call)
+
+        with mock.patch.object(vibe_module, "get_code", side_effect=AssertionError):
+            self.assertEqual(total(10), 55)
+
+        global_cache.delete(result.cache_key, func_file_path)
+        self.assertIsNone(global_cache.get_meta(result.cache_key, func_file_path))
+
+    def test_candidates_must_agree_without_expected_results(self):
+        @vibe
+        async def total(n: int) -> int:
+            """Returns the sum of the integers from 0 to n."""
+            pass
+
+        codes = [f"async {code}" for code in (SLOW, WRONG, FAST)]
+        with mock.patch.object(tuning, "get_code_candidates", candidates(*codes)):
+            result = tuning.tune(total, [(10,), (20,)], repeat=1)
+        self.assertIsNone(result.timings[1])
+        self.assertEqual(asyncio.run(total(10)), 55)
+
+    def test_candidates_that_change_their_arguments_are_rejected(self):
+        @vibe
+        def largest(values: list) -> int:
+            """Returns the largest of the values."""
+            pass
+
+        sorts = "def largest(values):\n    values.sort()\n    return values[-1]\n"
+        pops = (
+            "def largest(values):\n    return values.pop(values.index(max(values)))\n"
+        )
+        reads = "def largest(values):\n    return max(values)\n"
+        samples = [([3, 1, 2],), ([5, 4],)]
+        with mock.patch.object(
+            tuning, "get_code_candidates", candidates(sorts, pops, reads)
+        ):
+            result = tuning.tune(largest, samples, expected=[3, 5], repeat=1)
+
+        self.assertEqual(result.code, reads)
+        self.assertEqual(result.timings[:2], [None, None])
+        self.assertEqual(samples, [([3, 1, 2],), ([5, 4],)])
+
+    def test_no_correct_candidate_raises(self):
+        @vibe
+        def total(n: int) -> int:
+            """Returns the sum of the integers from 0 to n."""
+            pass
+
+        with mock.patch.object(
+            tuning, "get_code_candidates", candidates(WRONG, BROKEN)
+        ):
+            with self.assertRaises(tuning.TuningError):
+                tuning.tune(total, [(10,)], expected=[55])
+        resolver = total.vibe_resolver
+        self.assertIsNone(
+            global_cache.get(resolver.free_key.cache_key, resolver.func_file_path)
+        )
+
+
+class TestGetCodeCandidates(unittest.TestCase):
+    def setUp(self):
+        self.requests = []
+        self.responses = []
+
+        def create(**kwargs):
+            self.requests.append(kwargs)
+            contents = self.responses.pop(0)
+            return SimpleNamespace(
+                choices=[
+                    SimpleNamespace(message=SimpleNamespace(content=content))
+                    for content in contents
+                ]
+            )
+
+        fake_client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+        )
+        patcher = mock.patch.object(client, "get_client", lambda: fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_valid_distinct_candidates_are_returned(self):
+        self.responses = [[SLOW, "def plus(n):\n    return n\n", FAST, SLOW]]
+        codes = client.get_code_candidates("total", "(n: int) -> int", "Sums.", count=4)
+        self.assertEqual(codes, [SLOW, FAST])
+        self.assertEqual(self.requests[0]["n"], 4)
+
+    def test_all_invalid_candidates_are_requested_again(self):
+        invalid = "def plus(n):\n    return n\n"
+        self.responses = [[invalid], [invalid]] * 3
+        with self.assertRaises(InvalidCodeError):
+            client.get_code_candidates("total", "(n: int) -> int", "Sums.", count=1)
+        self.assertEqual(len(self.requests), client._config["validation_retries"] + 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
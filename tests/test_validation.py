@@ -0,0 +1,154 @@
+"""Tests for the validation of generated code and the retries of invalid responses."""
+
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+from vibeflow import vibe, client
+from vibeflow.cache import cache as global_cache
+from vibeflow.validation import InvalidCodeError, StreamValidator, validate_code
+from helpers import CacheTestCase, vibe_module
+
+SIGNATURE = "(a: int, b: int) -> int"
+
+
+class TestValidateCode(unittest.TestCase):
+    def test_markdown_fences_are_stripped(self):
+        text = "Here you go:\n```python\ndef add(a, b):\n    return a + b\n```\nEnjoy!"
+        self.assertEqual(
+            validate_code(text, "add", SIGNATURE), "def add(a, b):\n    return a + b\n"
+        )
+
+    def test_annotations_and_defaults_may_differ(self):
+        code = "def add(a: float, b=0):\n    return a + b\n"
+        self.assertEqual(validate_code(code, "add", SIGNATURE), code)
+
+    def test_invalid_code_is_rejected(self):
+        cases = {
+            "syntax error": "def add(a, b)\n    return a + b\n",
+            "wrong name": "def plus(a, b):\n    return a + b\n",
+            "nested definition": "if True:\n    def add(a, b):\n        return a + b\n",
+            "async mismatch": "async def add(a, b):\n    return a + b\n",
+            "signature mismatch": "def add(x, y):\n    return x + y\n",
+        }
+        for case, code in cases.items():
+            with self.subTest(case):
+                with self.assertRaises(InvalidCodeError):
+                    validate_code(code, "add", SIGNATURE)
+
+
+class TestStreamValidator(unittest.TestCase):
+    def test_stream_is_validated_as_it_arrives(self):
+        validator = StreamValidator("add", SIGNATURE)
+        for chunk in [
+            "```python\nimport math\n",
+            "def add(a, b):\n",
+            "    return a + b\n",
+            "```",
+        ]:
+            validator.feed(chunk)
+        self.assertTrue(validator.closed)
+        self.assertEqual(
+            validator.result(), "import math\ndef add(a, b):\n    return a + b\n"
+        )
+
+    def test_async_mismatch_fails_on_the_first_line(self):
+        validator = StreamValidator("add", SIGNATURE, is_async=True)
+        with self.assertRaises(InvalidCodeError):
+            validator.feed("def add(a, b):\n")
+
+    def test_broken_statement_fails_when_the_next_one_starts(self):
+        validator = StreamValidator("add", SIGNATURE)
+        validator.feed("import (\n")
+        with self.assertRaises(InvalidCodeError):
+            validator.feed("def add(a, b):\n")
+
+    def test_statement_keywords_inside_strings_are_not_boundaries(self):
+        validator = StreamValidator("add", SIGNATURE)
+        code = (
+            "def add(a, b):\n"
+            '    """\n'
+            "Adds a and b.\n"
+            "from the top, in order.\n"
+            "import nothing.\n"
+            '    """\n'
+            "    return a + b\n"
+        )
+        for line in code.splitlines(keepends=True):
+            validator.feed(line)
+        self.assertEqual(validator.result(), code)
+
+    def test_prose_before_the_fence_is_not_code(self):
+        validator = StreamValidator("add", SIGNATURE, is_async=True)
+        for chunk in [
+            "Here's how:\n",
+            "from the docstring, def add sums its arguments.\n",
+            "```python\nasync def add(a, b):\n",
+            "    return a + b\n",
+            "```",
+        ]:
+            validator.feed(chunk)
+        self.assertEqual(validator.result(), "async def add(a, b):\n    return a + b\n")
+
+
+def completion(content):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))]
+    )
+
+
+class TestRetries(unittest.TestCase):
+    def setUp(self):
+        self.saved_config = dict(client._config)
+        self.responses = []
+        self.requests = []
+
+        def create(**kwargs):
+            self.requests.append(kwargs["messages"])
+            return completion(self.responses.pop(0))
+
+        fake_client = SimpleNamespace(
+            chat=SimpleNamespace(completions=SimpleNamespace(create=create))
+        )
+        patcher = mock.patch.object(client, "get_client", lambda: fake_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        client._config.update(self.saved_config)
+
+    def test_invalid_code_is_requested_again(self):
+        self.responses = [
+            "def plus(a, b):\n    return a + b\n",
+            "def add(a, b):\n    return a + b\n",
+        ]
+        code = client.get_code("add", SIGNATURE, "Adds two integers.")
+        self.assertEqual(code, "def add(a, b):\n    return a + b\n")
+        self.assertEqual(len(self.requests), 2)
+        self.assertIn("rejected", self.requests[1][-1]["content"])
+
+    def test_retries_are_bounded(self):
+        client.configure(validation_retries=1)
+        self.responses = ["def plus(a, b):\n    return a + b\n"] * 3
+        with self.assertRaises(InvalidCodeError):
+            client.get_code("add", SIGNATURE, "Adds two integers.")
+        self.assertEqual(len(self.requests), 2)
+
+
+class TestInvalidCodeIsNotCached(CacheTestCase):
+    def test_invalid_code_is_not_cached(self):
+        def fake_get_code(function_name, *args, **kwargs):
+            return "def something_else(a, b):\n    return a + b\n"
+
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        with mock.patch.object(vibe_module, "get_code", fake_get_code):
+            with self.assertRaises(InvalidCodeError):
+                add(1, 2)
+        self.assertEqual(global_cache.stats()["total_items"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
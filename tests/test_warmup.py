@@ -0,0 +1,146 @@
+"""Tests for ahead-of-time warmup of @vibe functions."""
+
+import asyncio
+import os
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+from vibeflow import clear_cache
+from vibeflow import warmup
+from vibeflow.__main__ import main
+from vibeflow.cache import cache as global_cache
+
+PACKAGE_SOURCE = {
+    "__init__.py": "",
+    "tools.py": '''
+        from vibeflow import vibe
+
+        @vibe
+        def add(a: int, b: int) -> int:
+            """Adds two integers together."""
+            pass
+
+        class Counter:
+            def __init__(self):
+                self.value = 0
+
+            @vibe
+            async def increment(self) -> int:
+                """Increments the counter and returns the new value."""
+                pass
+    ''',
+}
+
+
+async def fake_async_get_code(
+    function_name,
+    signature,
+    docstring,
+    class_name=None,
+    init_source=None,
+    other_methods=None,
+    is_async=False,
+):
+    prefix = "async def" if is_async else "def"
+    return f"{prefix} {function_name}{signature}:\n    return None\n"
+
+
+async def fake_async_get_code_batch(specs, batch_size=None):
+    fake_async_get_code_batch.requests += 1
+    return [await fake_async_get_code(*spec) for spec in specs]
+
+
+class TestWarmup(unittest.TestCase):
+    def setUp(self):
+        clear_cache()
+        self.tmp = tempfile.TemporaryDirectory()
+        package_dir = os.path.join(self.tmp.name, "warm_pkg")
+        os.mkdir(package_dir)
+        for filename, source in PACKAGE_SOURCE.items():
+            with open(os.path.join(package_dir, filename), "w") as f:
+                f.write(textwrap.dedent(source))
+        sys.path.insert(0, self.tmp.name)
+
+    def tearDown(self):
+        clear_cache()
+        sys.path.remove(self.tmp.name)
+        for name in [name for name in sys.modules if name.startswith("warm_pkg")]:
+            del sys.modules[name]
+        self.tmp.cleanup()
+
+    def test_discover_finds_functions_and_methods(self):
+        modules = warmup.import_modules("warm_pkg")
+        names = sorted(target.qualname for target in warmup.discover(modules))
+        self.assertEqual(
+            names, ["warm_pkg.tools.Counter.increment", "warm_pkg.tools.add"]
+        )
+
+    def test_warm_generates_missing_entries(self):
+        with mock.patch.object(warmup, "async_get_code", fake_async_get_code):
+            self.assertEqual(main(["warm", "warm_pkg", "--batch-size", "1"]), 0)
+            self.assertEqual(global_cache.stats()["total_items"], 2)
+
+            # A second run finds everything in the cache
+            modules = warmup.import_modules("warm_pkg")
+            report = asyncio.run(warmup.warm(modules))
+            self.assertEqual(len(report.cached), 2)
+            self.assertEqual(report.generated, [])
+
+    def test_warmed_bytecode_is_used_by_the_first_call(self):
+        with mock.patch.object(sys, "dont_write_bytecode", False):
+            with mock.patch.object(warmup, "async_get_code", fake_async_get_code):
+                self.assertEqual(main(["warm", "warm_pkg", "--batch-size", "1"]), 0)
+            tools = sys.modules["warm_pkg.tools"]
+            # The bytecode written by warm matches, so the call compiles nothing
+            with mock.patch("vibeflow.cache.atomic_write", side_effect=AssertionError):
+                self.assertIsNone(tools.add(1, 2))
+
+    def test_warm_batches_missing_entries(self):
+        fake_async_get_code_batch.requests = 0
+        with mock.patch.object(
+            warmup, "async_get_code_batch", fake_async_get_code_batch
+        ):
+            self.assertEqual(main(["warm", "warm_pkg"]), 0)
+        self.assertEqual(fake_async_get_code_batch.requests, 1)
+        self.assertEqual(global_cache.stats()["total_items"], 2)
+
+    def test_malformed_batch_falls_back_to_single_requests(self):
+        async def malformed_batch(specs, batch_size=None):
+            raise ValueError("Expected code for 2 functions but the model returned 1.")
+
+        single = mock.Mock(side_effect=fake_async_get_code)
+        with mock.patch.object(warmup, "async_get_code_batch", malformed_batch):
+            with mock.patch.object(warmup, "async_get_code", single):
+                self.assertEqual(main(["warm", "warm_pkg"]), 0)
+        self.assertEqual(single.call_count, 2)
+        self.assertEqual(global_cache.stats()["total_items"], 2)
+
+    def test_invalid_batch_entries_are_requested_again(self):
+        async def batch_with_a_broken_entry(specs, batch_size=None):
+            results = await fake_async_get_code_batch(specs)
+            results[0] = "def broken(:"
+            return results
+
+        fake_async_get_code_batch.requests = 0
+        single = mock.Mock(side_effect=fake_async_get_code)
+        with mock.patch.object(
+            warmup, "async_get_code_batch", batch_with_a_broken_entry
+        ):
+            with mock.patch.object(warmup, "async_get_code", single):
+                self.assertEqual(main(["warm", "warm_pkg"]), 0)
+        self.assertEqual(single.call_count, 1)
+        self.assertEqual(global_cache.stats()["total_items"], 2)
+
+    def test_warm_fails_on_invalid_code(self):
+        async def broken_get_code(*args, **kwargs):
+            return "def broken(:"
+
+        with mock.patch.object(warmup, "async_get_code", broken_get_code):
+            self.assertEqual(main(["warm", "warm_pkg", "--batch-size", "1"]), 1)
+        self.assertEqual(global_cache.stats()["total_items"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,5 +1,33 @@
-from vibeflow.vibe import vibe, clear_cache, get_cache_stats
+from vibeflow.vibe import (
+    vibe,
+    clear_cache,
+    get_cache_stats,
+    set_memory_cache_size,
+    set_prefetch,
+    set_offline,
+    freeze,
+    warm_state,
+    CacheMissError,
+)
 from vibeflow.testing import vibe_test
 from vibeflow.cache import VibeCache
+from vibeflow.metrics import metrics
+from vibeflow.memoize import LRU
+from vibeflow.profiling import profile
 
-__all__ = ["vibe", "clear_cache", "get_cache_stats", "VibeCache", "vibe_test"]
\ No newline at end of file
+__all__ = [
+    "vibe",
+    "clear_cache",
+    "get_cache_stats",
+    "set_memory_cache_size",
+    "set_prefetch",
+    "set_offline",
+    "freeze",
+    "warm_state",
+    "CacheMissError",
+    "VibeCache",
+    "vibe_test",
+    "metrics",
+    "LRU",
+    "profile",
+]
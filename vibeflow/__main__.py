@@ -0,0 +1,114 @@
+"""Command line interface: python -m vibeflow <command> ..."""
+
+import argparse
+import asyncio
+import sys
+from vibeflow.warmup import import_modules, warm
+
+
+def _warm(args):
+    try:
+        modules = [module for name in args.packages for module in import_modules(name)]
+    except Exception as e:
+        print(f"Failed to import modules: {e!r}", file=sys.stderr)
+        return 1
+
+    report = asyncio.run(
+        warm(modules, concurrency=args.concurrency, batch_size=args.batch_size)
+    )
+    for name in report.generated:
+        print(f"generated  {name}")
+    for name in report.cached:
+        print(f"cached     {name}")
+    for name, error in report.failed:
+        print(f"FAILED     {name}: {error!r}", file=sys.stderr)
+    print(
+        f"\n{len(report.generated)} generated, {len(report.cached)} already cached, "
+        f"{len(report.failed)} failed."
+    )
+    return 0 if report.ok else 1
+
+
+def _gc(args):
+    from vibeflow.compaction import collect_garbage
+
+    try:
+        modules = [module for name in args.packages for module in import_modules(name)]
+    except Exception as e:
+        print(f"Failed to import modules: {e!r}", file=sys.stderr)
+        return 1
+
+    report = collect_garbage(
+        modules, dry_run=not args.apply, include_unowned=args.include_unowned
+    )
+    for cache_file, removed, reclaimed in report.files:
+        print(f"{len(removed):6d} stale  {reclaimed:10d} bytes  {cache_file}")
+    action = "would be removed" if report.dry_run else "removed"
+    print(
+        f"\n{report.removed} stale entries {action}, {report.reclaimed_bytes} bytes, "
+        f"{report.live_keys} live keys."
+    )
+    if report.unattributed:
+        print(
+            f"{report.unattributed} entries record no owning module and were kept. "
+            "Pass --include-unowned to remove them too, after checking that no script "
+            "run directly still uses them.",
+            file=sys.stderr,
+        )
+    if report.dry_run and report.removed:
+        print(
+            "Nothing was removed. Run again with --apply to remove the stale entries."
+        )
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m vibeflow")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    warm_parser = commands.add_parser(
+        "warm",
+        help="Generate and cache every @vibe function in the given packages.",
+    )
+    warm_parser.add_argument(
+        "packages", nargs="+", help="Packages or modules to import."
+    )
+    warm_parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=8,
+        help="Maximum number of generation requests running at once (default: 8).",
+    )
+    warm_parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=8,
+        help="Maximum number of functions generated per request (default: 8).",
+    )
+    warm_parser.set_defaults(handler=_warm)
+
+    gc_parser = commands.add_parser(
+        "gc",
+        help="Report, or remove with --apply, the stale cache entries of the given "
+        "packages.",
+    )
+    gc_parser.add_argument("packages", nargs="+", help="Packages or modules to import.")
+    gc_parser.add_argument(
+        "--apply",
+        action="store_true",
+        help="Remove the stale entries. Without it, only report what would be removed.",
+    )
+    gc_parser.add_argument(
+        "--include-unowned",
+        action="store_true",
+        help="Also remove entries that record no owning module (written by older "
+        "versions).",
+    )
+    gc_parser.set_defaults(handler=_gc)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
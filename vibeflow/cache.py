@@ -1,8 +1,458 @@
 """Global cache implementation for VIBE function decorator."""
 
+from contextlib import contextmanager
+from importlib.util import MAGIC_NUMBER
 from typing import Any, Dict
+import hashlib
 import json
+import marshal
 import os
+import re
+import sys
+import threading
+import time
+import warnings
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+try:
+    import msvcrt
+except ImportError:
+    msvcrt = None
+
+
+@contextmanager
+def file_lock(path: str):
+    """
+    Holds an exclusive advisory lock on a companion `.lock` file of `path` for
+    the duration of the block. Other processes using the same lock wait.
+    """
+    with open(path + ".lock", "a+b") as lock_file:
+        if fcntl is not None:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            lock_file.seek(0)
+            msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+_UMASK = None
+
+
+def _umask():
+    """Returns the process umask, which can only be read by setting it."""
+    global _UMASK
+    if _UMASK is None:
+        _UMASK = os.umask(0o022)
+        os.umask(_UMASK)
+    return _UMASK
+
+
+def atomic_write(path: str, data):
+    """
+    Writes `data` to a temporary file next to `path` and renames it into place,
+    so readers see either the old or the new content but never a partial file.
+    """
+    import tempfile
+
+    try:
+        mode = os.stat(path).st_mode & 0o7777
+    except OSError:
+        mode = 0o666 & ~_umask()
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".tmp"
+    )
+    try:
+        # mkstemp creates the file as 0600, keep the mode a plain open() would give
+        os.chmod(tmp_path, mode)
+        with os.fdopen(fd, "wb" if isinstance(data, bytes) else "w") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+# A JSON string, with the escape sequences matched in an unrolled loop
+_STRING = rb'"[^"\\]*(?:\\.[^"\\]*)*"'
+_OBJECT_START = re.compile(rb"\s*\{\s*(\})?")
+_ENTRY = re.compile(rb"(%s)\s*:\s*(%s)\s*([,}])\s*" % (_STRING, _STRING), re.DOTALL)
+
+
+def _index_json_object(buffer):
+    """
+    Maps each key of a JSON object whose values are all strings to the byte
+    span of its encoded value, without decoding any of the values. Raises
+    ValueError for any other document.
+    """
+    index = {}
+    match = _OBJECT_START.match(buffer)
+    if match is None:
+        raise ValueError("Expected an object")
+    if match.group(1):
+        return index
+
+    pos = match.end()
+    while True:
+        match = _ENTRY.match(buffer, pos)
+        if match is None:
+            raise ValueError("Expected a string entry")
+        index[json.loads(match.group(1))] = match.span(2)
+        if match.group(3) == b"}":
+            return index
+        pos = match.end()
+
+
+# Suffix of the entries that hold the metadata of a key
+META_SUFFIX = ".meta"
+
+
+def _merge_meta(current, meta):
+    """Returns the JSON metadata `current`, or None, with `meta` merged into it."""
+    return json.dumps({**(json.loads(current) if current is not None else {}), **meta})
+
+
+class _Snapshot:
+    """A read-only view of a JSON cache file, as it was when it was opened."""
+
+    def __init__(self, buffer, index=None, data=None):
+        self.buffer = buffer
+        self.index = index
+        self.data = data
+
+    def get(self, key):
+        if self.data is not None:
+            return self.data.get(key)
+        span = self.index.get(key)
+        if span is None:
+            return None
+        return json.loads(self.buffer[span[0] : span[1]])
+
+    def keys(self):
+        return list(self.data if self.data is not None else self.index)
+
+    def __len__(self):
+        return len(self.data if self.data is not None else self.index)
+
+
+class JSONCacheStore:
+    """
+    Stores the cache of a directory as a single JSON document.
+
+    Reads are lazy: the file is read into memory once and only the offsets of
+    its entries are indexed, so a lookup decodes just the requested value. The
+    whole document is rewritten on every change.
+
+    Writes are safe across processes: they hold a file lock and replace the
+    document atomically. With `merge_on_write` (the default) each write is
+    applied to the latest document on disk rather than to this process's
+    copy, so concurrent writers do not drop each other's entries.
+    """
+
+    filename = "vibe.cache.json"
+    merge_on_write = True
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def _read(self):
+        """
+        Returns the document on disk for a write to change. A file that is not
+        a JSON object is moved aside rather than written over, so its entries
+        can still be recovered.
+        """
+        try:
+            with open(self.path, "r") as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return {}
+        except ValueError:
+            data = None
+        if isinstance(data, dict):
+            return data
+
+        corrupt_path = f"{self.path}.corrupt-{time.strftime('%Y%m%d%H%M%S')}"
+        os.replace(self.path, corrupt_path)
+        warnings.warn(
+            f"{self.path} is not a valid cache file, moved it to {corrupt_path}",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return {}
+
+    def _open_snapshot(self):
+        try:
+            # A private copy, since a mapping of the file would fault if another
+            # writer truncated it in place
+            with open(self.path, "rb") as f:
+                buffer = f.read()
+        except FileNotFoundError:
+            buffer = b""
+
+        if not buffer:
+            return _Snapshot(buffer, data={})
+        try:
+            return _Snapshot(buffer, index=_index_json_object(buffer))
+        except ValueError:
+            # Not a flat object of strings, so fall back to decoding all of it
+            try:
+                data = json.loads(buffer)
+            except ValueError:
+                data = {}
+            return _Snapshot(None, data=data if isinstance(data, dict) else {})
+
+    def _get_snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None:
+            with self._lock:
+                if self._snapshot is None:
+                    self._snapshot = self._open_snapshot()
+                snapshot = self._snapshot
+        return snapshot
+
+    def _update(self, change):
+        """Applies `change` to the document and writes it back under the file lock."""
+        with self._lock, file_lock(self.path):
+            if self.merge_on_write:
+                data = self._read()
+            else:
+                snapshot = self._snapshot or self._open_snapshot()
+                data = {key: snapshot.get(key) for key in snapshot.keys()}
+            if change(data) is False:
+                return
+            atomic_write(self.path, json.dumps(data, indent=4))
+            # The next read loads the file that was just written
+            self._snapshot = None
+
+    def get(self, key: str):
+        return self._get_snapshot().get(key)
+
+    def set(self, key: str, value: str, meta: Dict[str, Any] = None):
+        """Sets a value and merges `meta` into its metadata, in a single write."""
+
+        def write(data):
+            data[key] = value
+            if meta is not None:
+                data[key + META_SUFFIX] = _merge_meta(data.get(key + META_SUFFIX), meta)
+
+        self._update(write)
+
+    def set_meta(self, key: str, meta: Dict[str, Any]):
+        """Merges `meta` into the metadata of a key."""
+
+        def write(data):
+            data[key + META_SUFFIX] = _merge_meta(data.get(key + META_SUFFIX), meta)
+
+        self._update(write)
+
+    def delete(self, key: str):
+        def remove(data):
+            if key not in data:
+                return False
+            del data[key]
+
+        self._update(remove)
+
+    def keys(self):
+        return self._get_snapshot().keys()
+
+    def compact(self, stale_keys, dry_run=False):
+        """
+        Rewrites the document without the entries of `stale_keys`. Returns the
+        removed keys and the number of bytes the file shrinks by, without
+        touching the file when `dry_run` is set.
+        """
+        with self._lock, file_lock(self.path):
+            data = self._read()
+            dead = [key for key in data if key in stale_keys]
+            if not dead:
+                return [], 0
+            for key in dead:
+                del data[key]
+            document = json.dumps(data, indent=4)
+            try:
+                reclaimed = os.path.getsize(self.path) - len(document.encode("utf-8"))
+            except OSError:
+                reclaimed = 0
+            if not dry_run:
+                atomic_write(self.path, document)
+                self._snapshot = None
+        return dead, max(reclaimed, 0)
+
+    def items(self):
+        snapshot = self._get_snapshot()
+        return [(key, snapshot.get(key)) for key in snapshot.keys()]
+
+    def __len__(self):
+        return len(self._get_snapshot())
+
+    def close(self):
+        self._snapshot = None
+
+
+class SQLiteCacheStore:
+    """
+    Stores the cache of a directory in a SQLite database, so reads and writes
+    touch a single row instead of the whole cache. Entries of an existing
+    vibe.cache.json in the same directory are imported when the database is
+    first created.
+    """
+
+    filename = "vibe.cache.db"
+
+    def __init__(self, path: str):
+        import sqlite3
+
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS vibe_cache "
+            "(key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+        )
+        self._migrate_json_cache()
+
+    def _migrate_json_cache(self):
+        """
+        Imports the JSON cache of the directory once, tracked by the user_version
+        pragma.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                (version,) = self._conn.execute("PRAGMA user_version").fetchone()
+                if version == 0:
+                    json_path = os.path.join(
+                        os.path.dirname(self.path), JSONCacheStore.filename
+                    )
+                    entries = JSONCacheStore(json_path).items()
+                    self._conn.executemany(
+                        "INSERT OR IGNORE INTO vibe_cache (key, value) VALUES (?, ?)",
+                        entries,
+                    )
+                    self._conn.execute("PRAGMA user_version = 1")
+                self._conn.execute("COMMIT")
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM vibe_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key: str, value: str, meta: Dict[str, Any] = None):
+        """
+        Sets a value and merges `meta` into its metadata, in a single
+        statement.
+        """
+        with self._lock:
+            if meta is None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO vibe_cache (key, value) VALUES (?, ?)",
+                    (key, value),
+                )
+                return
+            meta_key = key + META_SUFFIX
+            self._conn.execute(
+                "INSERT INTO vibe_cache (key, value) VALUES (?, ?), (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = CASE WHEN key = ? "
+                "THEN json_patch(value, excluded.value) ELSE excluded.value END",
+                (key, value, meta_key, json.dumps(meta), meta_key),
+            )
+
+    def set_meta(self, key: str, meta: Dict[str, Any]):
+        """Merges `meta` into the metadata of a key, in a single statement."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO vibe_cache (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET "
+                "value = json_patch(value, excluded.value)",
+                (key + META_SUFFIX, json.dumps(meta)),
+            )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM vibe_cache WHERE key = ?", (key,))
+
+    def keys(self):
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT key FROM vibe_cache")]
+
+    def compact(self, stale_keys, dry_run=False):
+        """
+        Deletes the entries of `stale_keys` and vacuums the database. Returns
+        the removed keys and the size of their entries in bytes, without
+        changing anything when `dry_run` is set.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT key, length(CAST(key AS BLOB)) + length(CAST(value AS BLOB)) "
+                "FROM vibe_cache"
+            ).fetchall()
+            dead = [(key, size) for key, size in rows if key in stale_keys]
+            if dead and not dry_run:
+                self._conn.executemany(
+                    "DELETE FROM vibe_cache WHERE key = ?", [(key,) for key, _ in dead]
+                )
+                self._conn.execute("VACUUM")
+        return [key for key, _ in dead], sum(size for _, size in dead)
+
+    def __len__(self):
+        with self._lock:
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM vibe_cache").fetchone()
+        return count
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+# Directory next to the cache file that holds compiled generated code
+BYTECODE_DIR = "__vibecache__"
+
+
+def _source_digest(source: str, filename: str):
+    return hashlib.sha256(f"{filename}\0{source}".encode("utf-8")).digest()[:16]
+
+
+# Cache storage backends that can be selected by name
+BACKENDS = {"json": JSONCacheStore, "sqlite": SQLiteCacheStore}
+
+
+def _resolve_backend(backend):
+    """Returns the store class for a backend name, or the given store class itself."""
+    if isinstance(backend, str):
+        try:
+            return BACKENDS[backend]
+        except KeyError:
+            raise ValueError(
+                f"Unknown cache backend '{backend}'. "
+                f"Available backends: {', '.join(BACKENDS)}"
+            ) from None
+    return backend
 
 
 class VibeCache:
@@ -10,56 +460,239 @@ class VibeCache:
     A cache that stores generated code on disk, organized by the file path
     of the function being decorated. This ensures that cache files are always
     co-located with the scripts that use them.
+
+    The storage format is pluggable: `backend` is either the name of one of the
+    built-in stores ("json" or "sqlite") or a store class with the same
+    interface. It defaults to the VIBEFLOW_CACHE_BACKEND environment variable,
+    falling back to "json".
+
+    An optional shared store (see `vibeflow.shared`) sits behind the
+    per-directory stores. Entries missing from a directory are looked up there
+    by content key and copied into the directory when found, and new entries
+    are written to both. It defaults to the VIBEFLOW_SHARED_CACHE environment
+    variable, a directory path or an HTTP(S) URL.
     """
 
-    def __init__(self):
+    def __init__(self, backend=None, shared=None):
+        self._backend = _resolve_backend(
+            backend or os.environ.get("VIBEFLOW_CACHE_BACKEND", "json")
+        )
         self._caches = {}
+        self._shared_location = (
+            shared or os.environ.get("VIBEFLOW_SHARED_CACHE") or None
+        )
+        self._shared = None
+        self.shared_hits = 0
+
+    def set_backend(self, backend):
+        """Switches the storage backend, dropping the stores opened so far."""
+        self.clear()
+        self._backend = _resolve_backend(backend)
+
+    def set_shared_store(self, location):
+        """
+        Sets the shared store: a directory path, an HTTP(S) URL, a store object
+        with get, set and close methods, or None to turn it off.
+        """
+        if self._shared is not None:
+            self._shared.close()
+        self._shared_location = location
+        self._shared = None
+
+    @property
+    def shared(self):
+        """The shared store, opened on first use, or None when there is none."""
+        if self._shared is None and self._shared_location is not None:
+            from vibeflow.shared import open_shared_store
+
+            self._shared = open_shared_store(self._shared_location)
+        return self._shared
 
     def _get_cache_file_path(self, func_file_path):
-        """Determines the correct path for the vibe.cache.json file."""
+        """Determines the correct path for the cache file of the backend."""
         directory = os.path.dirname(os.path.abspath(func_file_path))
-        return os.path.join(directory, "vibe.cache.json")
+        return os.path.join(directory, self._backend.filename)
 
     def _load_cache_if_needed(self, cache_file):
-        """Loads a specific cache file from disk if it's not already in memory."""
+        """Opens the store of a specific cache file if it's not already open."""
         if cache_file not in self._caches:
-            try:
-                with open(cache_file, "r") as f:
-                    self._caches[cache_file] = json.load(f)
-            except (FileNotFoundError, json.JSONDecodeError):
-                self._caches[cache_file] = {}
+            self._caches[cache_file] = self._backend(cache_file)
+        return self._caches[cache_file]
 
-    def get(self, key: str, func_file_path: str):
-        """Gets a value from the cache for a given function file."""
+    def get(
+        self,
+        key: str,
+        func_file_path: str,
+        content_key: str = None,
+        validate=None,
+        owner: Dict[str, str] = None,
+    ):
+        """
+        Gets a value from the cache for a given function file, falling back to
+        the shared store when a `content_key` is given. A value from the shared
+        store is passed through `validate` first, when given, and only copied
+        into the directory cache, recorded as written for `owner`, when it
+        returns instead of raising; a value that fails validation counts as a
+        miss.
+        """
         cache_file = self._get_cache_file_path(func_file_path)
-        self._load_cache_if_needed(cache_file)
-        return self._caches[cache_file].get(key)
+        store = self._load_cache_if_needed(cache_file)
+        value = store.get(key)
+        if value is None and content_key is not None and self.shared is not None:
+            value = self.shared.get(content_key)
+            if value is not None and validate is not None:
+                try:
+                    value = validate(value)
+                except ValueError:
+                    return None
+            if value is not None:
+                self.shared_hits += 1
+                store.set(key, value, None if owner is None else {"owner": owner})
+        return value
 
     def delete(self, key: str, func_file_path: str):
-        """Deletes a key from the cache and saves the change to disk."""
+        """
+        Deletes a key, and its metadata, from the cache and saves the change to disk.
+        """
         cache_file = self._get_cache_file_path(func_file_path)
-        self._load_cache_if_needed(cache_file)
-        if key in self._caches[cache_file]:
-            del self._caches[cache_file][key]
-            with open(cache_file, "w") as f:
-                json.dump(self._caches[cache_file], f, indent=4)
-
-    def set(self, key: str, value: str, func_file_path: str):
-        """Sets a value in the cache and saves it to disk."""
+        store = self._load_cache_if_needed(cache_file)
+        store.delete(key)
+        if store.get(key + META_SUFFIX) is not None:
+            store.delete(key + META_SUFFIX)
+        bytecode_path = self._get_bytecode_path(key, func_file_path)
+        if bytecode_path is not None:
+            try:
+                os.remove(bytecode_path)
+            except OSError:
+                pass
+
+    def set(
+        self,
+        key: str,
+        value: str,
+        func_file_path: str,
+        content_key: str = None,
+        owner: Dict[str, str] = None,
+    ):
+        """
+        Sets a value in the cache and saves it to disk, and to the shared store
+        when given a `content_key`. The `owner` of the entry, the module and
+        qualified name of the function it was generated for, is stored in its
+        metadata so that garbage collection can attribute it.
+        """
         cache_file = self._get_cache_file_path(func_file_path)
-        self._load_cache_if_needed(cache_file)
-        self._caches[cache_file][key] = value
-        with open(cache_file, "w") as f:
-            json.dump(self._caches[cache_file], f, indent=4)
+        self._load_cache_if_needed(cache_file).set(
+            key, value, None if owner is None else {"owner": owner}
+        )
+        if content_key is not None and self.shared is not None:
+            self.shared.set(content_key, value)
+
+    def get_meta(self, key: str, func_file_path: str):
+        """Returns the metadata stored with a key, such as tuning timings, or None."""
+        cache_file = self._get_cache_file_path(func_file_path)
+        value = self._load_cache_if_needed(cache_file).get(key + META_SUFFIX)
+        return None if value is None else json.loads(value)
+
+    def set_meta(self, key: str, meta: Dict[str, Any], func_file_path: str):
+        """
+        Merges JSON-serializable metadata into the metadata of a key, stored
+        in a `<key>.meta` entry.
+        """
+        cache_file = self._get_cache_file_path(func_file_path)
+        self._load_cache_if_needed(cache_file).set_meta(key, meta)
+
+    def compact(self, func_file_path: str, is_stale, dry_run=False):
+        """
+        Removes the entries of the cache file of `func_file_path` for which
+        `is_stale(key, meta)` is true, together with their metadata and
+        compiled code. Returns the removed keys and the number of bytes
+        reclaimed; with `dry_run` nothing is removed and the savings are only
+        reported.
+        """
+        cache_file = self._get_cache_file_path(func_file_path)
+        store = self._load_cache_if_needed(cache_file)
+        stale = set()
+        for key in store.keys():
+            if key.endswith(META_SUFFIX):
+                continue
+            if is_stale(key, self.get_meta(key, func_file_path)):
+                stale.add(key)
+        stale.update([key + META_SUFFIX for key in stale])
+        removed, reclaimed = store.compact(stale, dry_run)
+
+        bytecode_dir = os.path.join(os.path.dirname(cache_file), BYTECODE_DIR)
+        try:
+            names = os.listdir(bytecode_dir)
+        except OSError:
+            names = []
+        for name in names:
+            if name.split(".", 1)[0] not in stale:
+                continue
+            path = os.path.join(bytecode_dir, name)
+            try:
+                reclaimed += os.path.getsize(path)
+                if not dry_run:
+                    os.remove(path)
+            except OSError:
+                pass
+        return removed, reclaimed
+
+    def _get_bytecode_path(self, key, func_file_path):
+        """Determines the path of the compiled code of a key, like __pycache__ does."""
+        cache_tag = sys.implementation.cache_tag
+        if cache_tag is None:
+            return None
+        directory = os.path.dirname(os.path.abspath(func_file_path))
+        return os.path.join(directory, BYTECODE_DIR, f"{key}.{cache_tag}.pyc")
+
+    def load_code(
+        self, key: str, source: str, func_file_path: str, filename="<string>"
+    ):
+        """
+        Returns the compiled code object of the cached `source` of a key. The
+        code object is read from the bytecode cache when it was compiled from
+        the same source by an interpreter with the same magic number, and is
+        compiled and written back to the bytecode cache otherwise.
+        """
+        bytecode_path = self._get_bytecode_path(key, func_file_path)
+        if bytecode_path is None:
+            return compile(source, filename, "exec")
+
+        header = MAGIC_NUMBER + _source_digest(source, filename)
+        try:
+            with open(bytecode_path, "rb") as f:
+                data = f.read()
+            if data[: len(header)] == header:
+                return marshal.loads(data[len(header) :])
+        except (OSError, EOFError, ValueError, TypeError):
+            pass
+
+        code = compile(source, filename, "exec")
+        if not sys.dont_write_bytecode:
+            try:
+                os.makedirs(os.path.dirname(bytecode_path), exist_ok=True)
+                atomic_write(bytecode_path, header + marshal.dumps(code))
+            except OSError:
+                pass
+        return code
 
     def clear(self):
         """Clears all in-memory cache data."""
+        for store in self._caches.values():
+            store.close()
         self._caches = {}
 
     def stats(self):
         """Returns statistics about the on-disk cache."""
-        total_items = sum(len(cache) for cache in self._caches.values())
-        return {"total_items": total_items, "cached_files": len(self._caches)}
+        # Metadata entries are not items of their own
+        total_items = sum(
+            len(store) - sum(1 for key in store.keys() if key.endswith(META_SUFFIX))
+            for store in self._caches.values()
+        )
+        stats = {"total_items": total_items, "cached_files": len(self._caches)}
+        if self._shared_location is not None:
+            stats["shared_hits"] = self.shared_hits
+        return stats
 
 
 # Global cache instance used by all @vibe decorated functions
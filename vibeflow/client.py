@@ -1,13 +1,360 @@
-from openai import OpenAI, AsyncOpenAI
-from pydantic import BaseModel
-from vibeflow.prompts import get_system_prompt, get_function_prompt
+# openai, httpx and pydantic are imported on the first generation, so processes
+# that only run cached code never load them
+import os
+import threading
+import weakref
+from contextlib import asynccontextmanager, contextmanager
+from typing import List, NamedTuple, Optional
+from vibeflow.prompts import get_system_prompt, get_function_prompt, get_batch_prompt
+from vibeflow.validation import InvalidCodeError, StreamValidator, validate_code
 
-client = OpenAI()
-async_client = AsyncOpenAI()
+# Settings for code generation, changed with configure()
+_config = {
+    "model": "gpt-4.1",
+    "timeout": float(os.environ.get("VIBEFLOW_GENERATION_TIMEOUT", 0)) or None,
+    "max_concurrency": int(os.environ.get("VIBEFLOW_MAX_CONCURRENT_GENERATIONS", 0))
+    or None,
+    "batch_size": 8,
+    "stream": os.environ.get("VIBEFLOW_STREAM", "") not in ("", "0"),
+    "validation_retries": 2,
+    "api_key": None,
+    "base_url": None,
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 5.0,
+    "transport": None,
+    "async_transport": None,
+}
+_semaphore = None
+_async_semaphores = weakref.WeakKeyDictionary()
 
+# OpenAI clients, created on the first generation rather than at import time
+_client = None
+_async_client = None
+_clients_lock = threading.Lock()
+# Closes of replaced async clients still running on an event loop
+_closing_tasks = set()
 
-class FunctionCode(BaseModel):
-    code: str
+
+def configure(
+    model: str = None,
+    timeout: float = None,
+    max_concurrency: int = None,
+    batch_size: int = None,
+    stream: bool = None,
+    validation_retries: int = None,
+    api_key: str = None,
+    base_url: str = None,
+    max_connections: int = None,
+    max_keepalive_connections: int = None,
+    keepalive_expiry: float = None,
+    transport=None,
+    async_transport=None,
+):
+    """
+    Changes how code is generated. Arguments left as None are unchanged.
+
+    `timeout` bounds, in seconds, both the wait for a free generation slot and
+    the request itself. `max_concurrency` caps the number of generations
+    running at once, per process for sync callers and per event loop for async
+    callers. For both, 0 removes the limit. `batch_size` is the default number
+    of functions generated per request by the batch API.
+
+    With `stream`, responses are streamed and validated as they arrive, so a
+    response that is already known to be bad is abandoned early. Code that
+    does not parse or does not define the requested function is requested
+    again up to `validation_retries` times before InvalidCodeError is raised.
+
+    The remaining arguments set up the shared clients: the API key and base
+    URL, the limits of their HTTP connection pool, and the httpx transports
+    they send requests through (for example an `httpx.MockTransport` in
+    tests). Changing any of them replaces the clients on the next generation.
+    """
+    global _semaphore, _client, _async_client
+    if model is not None:
+        _config["model"] = model
+    if timeout is not None:
+        _config["timeout"] = timeout or None
+    if max_concurrency is not None:
+        _config["max_concurrency"] = max_concurrency or None
+        _semaphore = None
+        _async_semaphores.clear()
+    if batch_size is not None:
+        _config["batch_size"] = batch_size
+    if stream is not None:
+        _config["stream"] = stream
+    if validation_retries is not None:
+        _config["validation_retries"] = validation_retries
+
+    client_settings = {
+        "api_key": api_key,
+        "base_url": base_url,
+        "max_connections": max_connections,
+        "max_keepalive_connections": max_keepalive_connections,
+        "keepalive_expiry": keepalive_expiry,
+        "transport": transport,
+        "async_transport": async_transport,
+    }
+    client_settings = {k: v for k, v in client_settings.items() if v is not None}
+    if client_settings:
+        _config.update(client_settings)
+        with _clients_lock:
+            if _client is not None:
+                _client.close()
+            if _async_client is not None:
+                _close_async_client(_async_client)
+            _client = _async_client = None
+
+
+async def _aclose_quietly(async_client):
+    try:
+        await async_client.close()
+    except Exception:
+        # The connections may belong to an event loop that is already closed
+        pass
+
+
+def _close_async_client(async_client):
+    """
+    Closes a replaced async client, in the background on the running event loop
+    or, outside of one, right away on a loop of its own.
+    """
+    import asyncio
+
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        asyncio.run(_aclose_quietly(async_client))
+        return
+    task = loop.create_task(_aclose_quietly(async_client))
+    _closing_tasks.add(task)
+    task.add_done_callback(_closing_tasks.discard)
+
+
+def _client_options():
+    import httpx
+
+    limits = httpx.Limits(
+        max_connections=_config["max_connections"],
+        max_keepalive_connections=_config["max_keepalive_connections"],
+        keepalive_expiry=_config["keepalive_expiry"],
+    )
+    options = {}
+    if _config["api_key"] is not None:
+        options["api_key"] = _config["api_key"]
+    if _config["base_url"] is not None:
+        options["base_url"] = _config["base_url"]
+    return limits, options
+
+
+def get_client():
+    """Returns the shared OpenAI client, creating it on first use."""
+    global _client
+    if _client is None:
+        with _clients_lock:
+            if _client is None:
+                from openai import OpenAI, DefaultHttpxClient
+
+                limits, options = _client_options()
+                http_client = DefaultHttpxClient(
+                    limits=limits, transport=_config["transport"]
+                )
+                _client = OpenAI(http_client=http_client, **options)
+    return _client
+
+
+def get_async_client():
+    """Returns the shared async OpenAI client, creating it on first use."""
+    global _async_client
+    if _async_client is None:
+        with _clients_lock:
+            if _async_client is None:
+                from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+                limits, options = _client_options()
+                http_client = DefaultAsyncHttpxClient(
+                    limits=limits, transport=_config["async_transport"]
+                )
+                _async_client = AsyncOpenAI(http_client=http_client, **options)
+    return _async_client
+
+
+def __getattr__(name):
+    # Keeps `client`, `async_client` and the response models available as
+    # module attributes without importing them up front
+    if name == "client":
+        return get_client()
+    if name == "async_client":
+        return get_async_client()
+    if name in ("FunctionCode", "FunctionCodeBatch"):
+        from vibeflow import models
+
+        return getattr(models, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def _request_options():
+    """Returns the model and, when one is set, the timeout of a generation request."""
+    options = {"model": _config["model"]}
+    if _config["timeout"] is not None:
+        options["timeout"] = _config["timeout"]
+    return options
+
+
+@contextmanager
+def _generation_slot():
+    """Waits for one of the `max_concurrency` sync generation slots."""
+    global _semaphore
+    if _config["max_concurrency"] is None:
+        yield
+        return
+    if _semaphore is None:
+        _semaphore = threading.BoundedSemaphore(_config["max_concurrency"])
+    semaphore = _semaphore
+    if not semaphore.acquire(timeout=_config["timeout"]):
+        raise TimeoutError("Timed out waiting for a free code generation slot.")
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+@asynccontextmanager
+async def _async_generation_slot():
+    """Waits for one of the `max_concurrency` generation slots of the running loop."""
+    import asyncio
+
+    if _config["max_concurrency"] is None:
+        yield
+        return
+    loop = asyncio.get_running_loop()
+    semaphore = _async_semaphores.get(loop)
+    if semaphore is None:
+        semaphore = _async_semaphores[loop] = asyncio.Semaphore(
+            _config["max_concurrency"]
+        )
+    try:
+        await asyncio.wait_for(semaphore.acquire(), _config["timeout"])
+    except asyncio.TimeoutError:
+        raise TimeoutError(
+            "Timed out waiting for a free code generation slot."
+        ) from None
+    try:
+        yield
+    finally:
+        semaphore.release()
+
+
+class FunctionSpec(NamedTuple):
+    """The inputs of `get_function_prompt` for one function of a batch."""
+
+    function_name: str
+    signature: str
+    docstring: str
+    class_name: Optional[str] = None
+    init_source_code: Optional[str] = None
+    other_methods: Optional[dict] = None
+    is_async: bool = False
+
+
+def _batches(specs, batch_size):
+    batch_size = batch_size or _config["batch_size"]
+    return [specs[i : i + batch_size] for i in range(0, len(specs), batch_size)]
+
+
+def _batch_messages(specs):
+    return [
+        {"role": "system", "content": get_system_prompt()},
+        {"role": "user", "content": get_batch_prompt(specs)},
+    ]
+
+
+def _parse_batch(specs, content):
+    """
+    Extracts the code of each function from a batch response, in the order of `specs`.
+    """
+    from vibeflow.models import FunctionCodeBatch
+
+    functions = FunctionCodeBatch.model_validate_json(content).functions
+    if len(functions) != len(specs):
+        raise ValueError(
+            f"Expected code for {len(specs)} functions but the model returned "
+            f"{len(functions)}."
+        )
+    for spec, function in zip(specs, functions):
+        if function.function_name != spec.function_name:
+            raise ValueError(
+                f"Expected code for '{spec.function_name}' but the model returned "
+                f"'{function.function_name}'."
+            )
+    return [function.code for function in functions]
+
+
+def _function_messages(
+    function_name,
+    signature,
+    docstring,
+    class_name,
+    init_source_code,
+    other_methods,
+    is_async,
+):
+    return [
+        {"role": "system", "content": get_system_prompt()},
+        {
+            "role": "user",
+            "content": get_function_prompt(
+                function_name,
+                signature,
+                docstring,
+                class_name,
+                init_source_code,
+                other_methods,
+                is_async,
+            ),
+        },
+    ]
+
+
+def _retry_messages(messages, error):
+    """Adds the reason the previous attempt was rejected to the messages of a retry."""
+    return messages + [
+        {
+            "role": "user",
+            "content": f"A previous answer was rejected: {error} "
+            "Respond with only the corrected Python code.",
+        }
+    ]
+
+
+def _stream_code(messages, validator):
+    stream = get_client().chat.completions.create(
+        **_request_options(), messages=messages, stream=True
+    )
+    try:
+        for chunk in stream:
+            if chunk.choices:
+                validator.feed(chunk.choices[0].delta.content or "")
+            if validator.closed:
+                break
+    finally:
+        stream.close()
+    return validator.result()
+
+
+async def _async_stream_code(messages, validator):
+    stream = await get_async_client().chat.completions.create(
+        **_request_options(), messages=messages, stream=True
+    )
+    try:
+        async for chunk in stream:
+            if chunk.choices:
+                validator.feed(chunk.choices[0].delta.content or "")
+            if validator.closed:
+                break
+    finally:
+        await stream.close()
+    return validator.result()
 
 
 def get_code(
@@ -19,26 +366,40 @@ def get_code(
     other_methods: dict = None,
     is_async: bool = False,
 ) -> str:
-    """Calls the AI model to generate function code based on the provided context."""
-    completion = client.chat.completions.create(
-        model="gpt-4.1",
-        messages=[
-            {"role": "system", "content": get_system_prompt()},
-            {
-                "role": "user",
-                "content": get_function_prompt(
-                    function_name,
-                    signature,
-                    docstring,
-                    class_name,
-                    init_source_code,
-                    other_methods,
-                    is_async,
-                ),
-            },
-        ],
+    """
+    Calls the AI model to generate function code based on the provided context.
+    Returns code that defines the function, or raises InvalidCodeError once the
+    validation retries are used up.
+    """
+    messages = _function_messages(
+        function_name,
+        signature,
+        docstring,
+        class_name,
+        init_source_code,
+        other_methods,
+        is_async,
     )
-    return completion.choices[0].message.content
+    attempt_messages = messages
+    for _ in range(_config["validation_retries"] + 1):
+        try:
+            with _generation_slot():
+                if _config["stream"]:
+                    validator = StreamValidator(function_name, signature, is_async)
+                    return _stream_code(attempt_messages, validator)
+                completion = get_client().chat.completions.create(
+                    **_request_options(), messages=attempt_messages
+                )
+            return validate_code(
+                completion.choices[0].message.content,
+                function_name,
+                signature,
+                is_async,
+            )
+        except InvalidCodeError as e:
+            error = e
+            attempt_messages = _retry_messages(messages, e)
+    raise error
 
 
 async def async_get_code(
@@ -50,23 +411,126 @@ async def async_get_code(
     other_methods: dict = None,
     is_async: bool = False,
 ) -> str:
-    """Calls the AI model asynchronously to generate function code."""
-    completion = await async_client.chat.completions.create(
-        model="gpt-4.1",
-        messages=[
-            {"role": "system", "content": get_system_prompt()},
-            {
-                "role": "user",
-                "content": get_function_prompt(
-                    function_name,
-                    signature,
-                    docstring,
-                    class_name,
-                    init_source_code,
-                    other_methods,
-                    is_async,
-                ),
-            },
-        ],
+    """
+    Calls the AI model asynchronously to generate function code, validated as by
+    `get_code`.
+    """
+    messages = _function_messages(
+        function_name,
+        signature,
+        docstring,
+        class_name,
+        init_source_code,
+        other_methods,
+        is_async,
     )
-    return completion.choices[0].message.content
+    attempt_messages = messages
+    for _ in range(_config["validation_retries"] + 1):
+        try:
+            async with _async_generation_slot():
+                if _config["stream"]:
+                    validator = StreamValidator(function_name, signature, is_async)
+                    return await _async_stream_code(attempt_messages, validator)
+                completion = await get_async_client().chat.completions.create(
+                    **_request_options(), messages=attempt_messages
+                )
+            return validate_code(
+                completion.choices[0].message.content,
+                function_name,
+                signature,
+                is_async,
+            )
+        except InvalidCodeError as e:
+            error = e
+            attempt_messages = _retry_messages(messages, e)
+    raise error
+
+
+def get_code_candidates(
+    function_name: str,
+    signature: str,
+    docstring: str,
+    class_name: str = None,
+    init_source_code: str = None,
+    other_methods: dict = None,
+    is_async: bool = False,
+    count: int = 4,
+) -> List[str]:
+    """
+    Generates up to `count` alternative implementations of a function in one
+    request. Returns the distinct candidates that pass validation, asking
+    again as `get_code` does when none of them does.
+    """
+    messages = _function_messages(
+        function_name,
+        signature,
+        docstring,
+        class_name,
+        init_source_code,
+        other_methods,
+        is_async,
+    )
+    attempt_messages = messages
+    for _ in range(_config["validation_retries"] + 1):
+        with _generation_slot():
+            completion = get_client().chat.completions.create(
+                **_request_options(), messages=attempt_messages, n=count
+            )
+        candidates = []
+        error = InvalidCodeError("The response contained no candidates.")
+        for choice in completion.choices:
+            try:
+                code = validate_code(
+                    choice.message.content, function_name, signature, is_async
+                )
+            except InvalidCodeError as e:
+                error = e
+                continue
+            if code not in candidates:
+                candidates.append(code)
+        if candidates:
+            return candidates
+        attempt_messages = _retry_messages(messages, error)
+    raise error
+
+
+def get_code_batch(specs: List[FunctionSpec], batch_size: int = None) -> List[str]:
+    """
+    Generates the code of several functions, packing up to `batch_size` of them
+    into each request. Returns the code of each function in the order of `specs`.
+    """
+    results = []
+    for batch in _batches(list(specs), batch_size):
+        with _generation_slot():
+            completion = get_client().chat.completions.create(
+                **_request_options(),
+                response_format={"type": "json_object"},
+                messages=_batch_messages(batch),
+            )
+        results.extend(_parse_batch(batch, completion.choices[0].message.content))
+    return results
+
+
+async def async_get_code_batch(
+    specs: List[FunctionSpec], batch_size: int = None
+) -> List[str]:
+    """
+    Generates the code of several functions asynchronously, sending the
+    requests of all batches concurrently. Returns the code of each function
+    in the order of `specs`.
+    """
+
+    async def generate(batch):
+        async with _async_generation_slot():
+            completion = await get_async_client().chat.completions.create(
+                **_request_options(),
+                response_format={"type": "json_object"},
+                messages=_batch_messages(batch),
+            )
+        return _parse_batch(batch, completion.choices[0].message.content)
+
+    import asyncio
+
+    batches = _batches(list(specs), batch_size)
+    results = await asyncio.gather(*(generate(batch) for batch in batches))
+    return [code for batch_results in results for code in batch_results]
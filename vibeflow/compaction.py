@@ -0,0 +1,82 @@
+"""Garbage collection of the cache entries that no @vibe function uses anymore."""
+
+import os
+from typing import List, NamedTuple
+from vibeflow.cache import cache as global_cache
+from vibeflow.vibe import _resolvers
+from vibeflow.warmup import discover
+
+
+class CompactionReport(NamedTuple):
+    """The outcome of collecting the garbage of a set of modules."""
+
+    dry_run: bool
+    live_keys: int
+    # (cache file, removed keys, reclaimed bytes) for each cache file
+    files: List[tuple]
+    # Entries that are not live but record no owner, so they were kept
+    unattributed: int = 0
+
+    @property
+    def removed(self):
+        return sum(len(keys) for _, keys, _ in self.files)
+
+    @property
+    def reclaimed_bytes(self):
+        return sum(reclaimed for _, _, reclaimed in self.files)
+
+
+def live_keys(modules):
+    """
+    Returns the cache keys of every @vibe function and method of `modules`,
+    and of every function whose key this process has already resolved.
+    """
+    keys = {target.key.cache_key for target in discover(modules)}
+    for resolver in list(_resolvers):
+        keys.add(resolver.free_key.cache_key)
+        keys.update(key.cache_key for key in list(resolver._class_keys.values()))
+    return keys
+
+
+def collect_garbage(modules, dry_run=True, include_unowned=False):
+    """
+    Finds the stale entries of the cache files next to `modules`: entries
+    written for one of these modules whose function was since edited,
+    renamed or removed. Entries of other modules are never touched, including
+    those written by a script run directly, whose module is __main__. Entries
+    that record no owner (written before owners were recorded) are kept and
+    counted as unattributed, unless `include_unowned` is set.
+
+    Nothing is removed unless `dry_run` is False; the stale entries, their
+    metadata and their compiled code are then deleted.
+    """
+    keys = live_keys(modules)
+    module_names = {module.__name__ for module in modules}
+    unattributed = []
+
+    def is_stale(key, meta):
+        if key in keys:
+            return False
+        owner = (meta or {}).get("owner")
+        if owner is None:
+            if not include_unowned:
+                unattributed.append(key)
+            return include_unowned
+        return owner.get("module") in module_names
+
+    func_file_paths = {}
+    for module in modules:
+        path = getattr(module, "__file__", None)
+        if path is None:
+            continue
+        cache_file = global_cache._get_cache_file_path(path)
+        if os.path.exists(cache_file):
+            func_file_paths.setdefault(cache_file, path)
+
+    files = []
+    for cache_file, func_file_path in sorted(func_file_paths.items()):
+        removed, reclaimed = global_cache.compact(
+            func_file_path, is_stale, dry_run=dry_run
+        )
+        files.append((cache_file, removed, reclaimed))
+    return CompactionReport(dry_run, len(keys), files, len(unattributed))
@@ -0,0 +1,81 @@
+"""A bounded least-recently-used cache with hit, miss and eviction counters."""
+
+import threading
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A mapping that holds at most `maxsize` items (unbounded when `maxsize` is
+    None) and evicts the least recently used item to make room for a new one.
+    `on_evict(key, value)` is called for every evicted item.
+    """
+
+    def __init__(self, maxsize=None, on_evict=None):
+        self.maxsize = maxsize
+        self.on_evict = on_evict
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Returns the item for `key`, marking it as the most recently used."""
+        try:
+            value = self._data[key]
+            self._data.move_to_end(key)
+        except KeyError:
+            # Also covers an item evicted by another thread between the two steps
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def peek(self, key, default=None):
+        """Returns the item for `key` without touching its recency or the counters."""
+        return self._data.get(key, default)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            self._evict()
+
+    def __contains__(self, key):
+        return key in self._data
+
+    def __len__(self):
+        return len(self._data)
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._data.pop(key, default)
+
+    def _evict(self):
+        while self.maxsize is not None and len(self._data) > self.maxsize:
+            key, value = self._data.popitem(last=False)
+            self.evictions += 1
+            if self.on_evict is not None:
+                self.on_evict(key, value)
+
+    def resize(self, maxsize):
+        """Changes the capacity, evicting items if the cache is over the new limit."""
+        with self._lock:
+            self.maxsize = maxsize
+            self._evict()
+
+    def clear(self):
+        """Removes all items and resets the counters."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def stats(self):
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,278 @@
+"""
+Batched calls of @vibe functions: func.map() on a thread pool and func.amap() on the
+event loop.
+"""
+
+import itertools
+import os
+import threading
+from collections import deque
+from functools import partial
+from vibeflow.metrics import metrics
+from vibeflow.vibe import (
+    _aprepare,
+    _async_call_with_metrics,
+    _call_with_metrics,
+    _prepare,
+    get_executor,
+)
+
+# Calls of an amap() that run at the same time unless told otherwise
+DEFAULT_CONCURRENCY = 16
+
+
+def default_workers():
+    """The number of threads of a map(), the same default as ThreadPoolExecutor."""
+    return min(32, (os.cpu_count() or 1) + 4)
+
+
+def chunked(calls, size):
+    """Yields lists of at most `size` items of `calls`, consuming it lazily."""
+    iterator = iter(calls)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bounded_map(submit, chunks, window, timeout=None):
+    """
+    Submits each chunk with `submit`, which returns a future of the list of its
+    results, and yields the results in order. At most `window` chunks are in
+    flight at a time, so a large input is never held in memory all at once.
+    """
+    pending = deque()
+    try:
+        for chunk in chunks:
+            if len(pending) >= window:
+                yield from pending.popleft().result(timeout)
+            pending.append(submit(chunk))
+        while pending:
+            yield from pending.popleft().result(timeout)
+    finally:
+        for future in pending:
+            future.cancel()
+
+
+async def azip(*iterables):
+    """Like zip, for any mix of sync and async iterables."""
+    iterators = [
+        iterable.__aiter__() if hasattr(iterable, "__aiter__") else iter(iterable)
+        for iterable in iterables
+    ]
+    while True:
+        items = []
+        for iterator in iterators:
+            try:
+                if hasattr(iterator, "__anext__"):
+                    items.append(await iterator.__anext__())
+                else:
+                    items.append(next(iterator))
+            except (StopIteration, StopAsyncIteration):
+                return
+        yield tuple(items)
+
+
+async def bounded_amap(call, calls, concurrency):
+    """
+    Awaits `call(args)` for each tuple of arguments of the async iterable
+    `calls`, running at most `concurrency` of them at a time, and yields the
+    results in order.
+    """
+    import asyncio
+
+    pending = deque()
+    try:
+        async for args in calls:
+            if len(pending) >= concurrency:
+                yield await pending.popleft()
+            pending.append(asyncio.ensure_future(call(args)))
+        while pending:
+            yield await pending.popleft()
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+def _owner(key, args):
+    return args[0] if key.class_name is not None else None
+
+
+def implementations(resolver):
+    """
+    Returns a function that maps the arguments of a call to its cache key and
+    materialized implementation, resolved once per batch (once per class for
+    methods) instead of once per call.
+    """
+    resolved = {}
+    lock = threading.Lock()
+
+    def implementation(args):
+        cls = args[0].__class__ if args else None
+        found = resolved.get(cls)
+        if found is None:
+            # The threads of a map() all start with the same first lookup
+            with lock:
+                found = resolved.get(cls)
+                if found is None:
+                    key = resolver.resolve(args)
+                    live_function = _prepare(resolver, _owner(key, args))
+                    found = resolved[cls] = (key, live_function)
+        return found
+
+    return implementation
+
+
+def async_implementations(resolver):
+    """Like implementations(), without blocking the running event loop."""
+    resolved = {}
+
+    async def implementation(args):
+        cls = args[0].__class__ if args else None
+        found = resolved.get(cls)
+        if found is None:
+            key = resolver.resolve(args)
+            live_function = await _aprepare(resolver, _owner(key, args))
+            found = resolved[cls] = (key, live_function)
+        return found
+
+    return implementation
+
+
+def call_implementation(resolver, key, live_function, args):
+    """Calls a sync implementation, recording its latency when metrics are on."""
+    if metrics.enabled:
+        return _call_with_metrics(resolver, key, live_function, args, {})
+    return live_function(*args)
+
+
+def make_map(resolver, call=None):
+    """
+    Returns the map() of a sync @vibe function. Calls go straight to the
+    implementation, or through `call` (a memoizing wrapper) when given.
+    """
+
+    def map(*iterables, workers=None, chunksize=1):
+        """
+        Calls the function for each set of arguments taken from `iterables`,
+        like the builtin map, on a pool of `workers` threads in chunks of
+        `chunksize` calls. Results are yielded in order.
+        """
+        from concurrent.futures import ThreadPoolExecutor
+
+        if call is None:
+            implementation = implementations(resolver)
+
+            def run(chunk):
+                return [
+                    call_implementation(resolver, *implementation(args), args)
+                    for args in chunk
+                ]
+
+        else:
+
+            def run(chunk):
+                return [call(*args) for args in chunk]
+
+        workers = workers or default_workers()
+        pool = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="vibeflow-map"
+        )
+        try:
+            yield from bounded_map(
+                partial(pool.submit, run),
+                chunked(zip(*iterables), chunksize),
+                2 * workers,
+            )
+        finally:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    return map
+
+
+def make_amap(resolver, call=None):
+    """
+    Returns the amap() of a @vibe function. Sync functions run on the shared
+    thread pool. Calls go through `call` (a memoizing wrapper) when given.
+    """
+
+    async def amap(*iterables, concurrency=DEFAULT_CONCURRENCY):
+        """
+        Calls the function for each set of arguments taken from `iterables`,
+        which may be sync or async iterables, running at most `concurrency`
+        calls at a time. Results are yielded in order.
+        """
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        implementation = async_implementations(resolver)
+
+        if resolver.is_async:
+
+            async def run(args):
+                if call is not None:
+                    return await call(*args)
+                key, live_function = await implementation(args)
+                if metrics.enabled:
+                    return await _async_call_with_metrics(
+                        resolver, key, live_function, args, {}
+                    )
+                return await live_function(*args)
+
+        else:
+
+            async def run(args):
+                if call is not None:
+                    function = partial(call, *args)
+                else:
+                    key, live_function = await implementation(args)
+                    function = partial(
+                        call_implementation, resolver, key, live_function, args
+                    )
+                return await loop.run_in_executor(get_executor(), function)
+
+        async for result in bounded_amap(run, azip(*iterables), concurrency):
+            yield result
+
+    return amap
+
+
+def make_async_map(amap):
+    """
+    Returns the map() of an async @vibe function, which drives its amap() on a
+    private event loop, `workers` calls at a time. `chunksize` is accepted for
+    symmetry with sync functions and ignored.
+    """
+
+    def map(*iterables, workers=None, chunksize=1):
+        """
+        Calls the function for each set of arguments taken from `iterables`
+        from sync code, running `workers` calls at a time on a private event
+        loop. Results are yielded in order.
+        """
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+        results = amap(*iterables, concurrency=workers or DEFAULT_CONCURRENCY)
+        try:
+            while True:
+                try:
+                    yield loop.run_until_complete(results.__anext__())
+                except StopAsyncIteration:
+                    return
+        finally:
+            loop.run_until_complete(results.aclose())
+            loop.close()
+
+    return map
+
+
+def attach(wrapper, resolver, call=None):
+    """Gives a sync or async @vibe wrapper its map() and amap()."""
+    wrapper.amap = make_amap(resolver, call)
+    if resolver.is_async:
+        wrapper.map = make_async_map(wrapper.amap)
+    else:
+        wrapper.map = make_map(resolver, call)
+    return wrapper
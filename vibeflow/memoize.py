@@ -0,0 +1,147 @@
+"""Opt-in memoization of the results of pure @vibe functions."""
+
+import inspect
+import time
+from functools import wraps
+from typing import NamedTuple, Optional
+from vibeflow.lru import LRUCache
+from vibeflow.singleflight import SingleFlight
+
+_MISSING = object()
+
+
+class LRU(NamedTuple):
+    """
+    A memoization policy: keep the results of the `maxsize` most recently used
+    argument combinations (unbounded when None), each for at most `ttl`
+    seconds (forever when None).
+    """
+
+    maxsize: Optional[int] = 128
+    ttl: Optional[float] = None
+
+
+class ResultCache:
+    """The memoized results of one function, keyed by its arguments."""
+
+    def __init__(self, policy):
+        self.ttl = policy.ttl
+        self._entries = LRUCache(maxsize=policy.maxsize)
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.uncacheable = 0
+
+    def lookup(self, key):
+        """
+        Returns (True, result) for a fresh memoized result and (False, None) otherwise.
+        """
+        entry = self._entries.get(key, _MISSING)
+        if entry is not _MISSING:
+            expires_at, result = entry
+            if expires_at is None or time.monotonic() < expires_at:
+                self.hits += 1
+                return True, result
+            self._entries.pop(key)
+            self.expirations += 1
+        self.misses += 1
+        return False, None
+
+    def store(self, key, result):
+        expires_at = None if self.ttl is None else time.monotonic() + self.ttl
+        self._entries[key] = (expires_at, result)
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.expirations = self.uncacheable = 0
+
+    def stats(self):
+        return {
+            "size": len(self._entries),
+            "maxsize": self._entries.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self._entries.evictions,
+            "expirations": self.expirations,
+            "uncacheable": self.uncacheable,
+        }
+
+
+def _freeze(value):
+    """Turns lists, dicts and sets into hashable equivalents, tagged by their type."""
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(_freeze(item) for item in value))
+    if isinstance(value, dict):
+        return (
+            "dict",
+            tuple(sorted((_freeze(k), _freeze(v)) for k, v in value.items())),
+        )
+    if isinstance(value, (set, frozenset)):
+        return (type(value).__name__, frozenset(_freeze(item) for item in value))
+    hash(value)
+    return value
+
+
+def argument_key(args, kwargs):
+    """
+    Returns a hashable key for a set of call arguments. Unhashable lists,
+    dicts and sets are converted to hashable equivalents; None is returned
+    when the arguments still cannot be hashed.
+    """
+    key = (args, tuple(sorted(kwargs.items())) if kwargs else ())
+    try:
+        hash(key)
+        return key
+    except TypeError:
+        pass
+    try:
+        return ("frozen", _freeze(args), _freeze(kwargs))
+    except TypeError:
+        return None
+
+
+def memoized(wrapper, resolver, policy):
+    """
+    Wraps a @vibe wrapper so that its results are memoized according to
+    `policy`. Concurrent identical calls of an async function share a single
+    in-flight call.
+    """
+    cache = resolver.result_cache = ResultCache(policy)
+
+    if inspect.iscoroutinefunction(wrapper):
+        flight = SingleFlight()
+
+        @wraps(wrapper)
+        async def async_memoized(*args, **kwargs):
+            key = argument_key(args, kwargs)
+            if key is None:
+                cache.uncacheable += 1
+                return await wrapper(*args, **kwargs)
+            found, result = cache.lookup(key)
+            if found:
+                return result
+
+            async def call():
+                result = await wrapper(*args, **kwargs)
+                cache.store(key, result)
+                return result
+
+            return await flight.do_async(key, call)
+
+        return async_memoized
+
+    @wraps(wrapper)
+    def sync_memoized(*args, **kwargs):
+        key = argument_key(args, kwargs)
+        if key is None:
+            cache.uncacheable += 1
+            return wrapper(*args, **kwargs)
+        found, result = cache.lookup(key)
+        if found:
+            return result
+        result = wrapper(*args, **kwargs)
+        cache.store(key, result)
+        return result
+
+    return sync_memoized
@@ -0,0 +1,208 @@
+"""Opt-in runtime metrics for @vibe functions."""
+
+import os
+import threading
+from bisect import bisect_left
+
+# Upper bounds of the latency histogram buckets, in seconds
+DEFAULT_BUCKETS = (
+    0.00001,
+    0.0001,
+    0.001,
+    0.01,
+    0.1,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+
+class Histogram:
+    """A latency histogram with fixed bucket upper bounds, in the Prometheus style."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative_counts(self):
+        """
+        Returns (upper bound, count of observations <= bound) pairs, ending with +Inf.
+        """
+        bounds = [str(bound) for bound in self.buckets] + ["+Inf"]
+        result = []
+        total = 0
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+    def to_dict(self):
+        return {
+            "buckets": dict(self.cumulative_counts()),
+            "sum": self.sum,
+            "count": self.count,
+        }
+
+
+class FunctionMetrics:
+    """The metrics of a single @vibe function and cache key."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.errors = 0
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.generations = 0
+        self.generation_errors = 0
+        self.call_latency = Histogram()
+        self.generation_latency = Histogram()
+
+    def observe_call(self, seconds, failed=False):
+        with self._lock:
+            self.calls += 1
+            self.errors += failed
+            self.call_latency.observe(seconds)
+
+    def observe_generation(self, seconds, failed=False):
+        with self._lock:
+            self.generations += 1
+            self.generation_errors += failed
+            self.generation_latency.observe(seconds)
+
+    def to_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "memory_hits": self.memory_hits,
+            "disk_hits": self.disk_hits,
+            "generations": self.generations,
+            "generation_errors": self.generation_errors,
+            "call_latency": self.call_latency.to_dict(),
+            "generation_latency": self.generation_latency.to_dict(),
+        }
+
+
+class Metrics:
+    """
+    Collects call counts, cache outcomes and latency histograms per function
+    and cache key. Collection is off by default; the wrappers check `enabled`
+    before doing any work, so the disabled path costs a single attribute read.
+    It can be turned on with `enable()` or the VIBEFLOW_METRICS environment
+    variable.
+    """
+
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._functions = {}
+
+    def enable(self):
+        self.enabled = True
+
+    def disable(self):
+        self.enabled = False
+
+    def reset(self):
+        """Discards everything collected so far."""
+        with self._lock:
+            self._functions = {}
+
+    def function(self, name, cache_key):
+        """Returns the metrics of a function and cache key, creating them if needed."""
+        labels = (name, cache_key)
+        function_metrics = self._functions.get(labels)
+        if function_metrics is None:
+            with self._lock:
+                function_metrics = self._functions.setdefault(labels, FunctionMetrics())
+        return function_metrics
+
+    def snapshot(self):
+        """
+        Returns the collected metrics as a list of dicts, one per function and key.
+        """
+        return [
+            {"function": name, "cache_key": cache_key, **function_metrics.to_dict()}
+            for (name, cache_key), function_metrics in list(self._functions.items())
+        ]
+
+    def to_prometheus(self):
+        """Returns the collected metrics in the Prometheus text exposition format."""
+        counters = [
+            ("vibeflow_calls_total", "Calls to @vibe functions.", "calls"),
+            ("vibeflow_call_errors_total", "Calls that raised an exception.", "errors"),
+            (
+                "vibeflow_memory_hits_total",
+                "Calls served from the in-memory cache.",
+                "memory_hits",
+            ),
+            (
+                "vibeflow_disk_hits_total",
+                "Functions loaded from the disk cache.",
+                "disk_hits",
+            ),
+            (
+                "vibeflow_generations_total",
+                "Code generation requests to the LLM.",
+                "generations",
+            ),
+            (
+                "vibeflow_generation_errors_total",
+                "Code generation requests that failed.",
+                "generation_errors",
+            ),
+        ]
+        histograms = [
+            (
+                "vibeflow_call_duration_seconds",
+                "Duration of calls to generated functions.",
+                "call_latency",
+            ),
+            (
+                "vibeflow_generation_duration_seconds",
+                "Duration of code generation round trips.",
+                "generation_latency",
+            ),
+        ]
+        items = list(self._functions.items())
+        lines = []
+        for metric, help_text, attribute in counters:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            for labels, function_metrics in items:
+                value = getattr(function_metrics, attribute)
+                lines.append(f"{metric}{{{_format_labels(labels)}}} {value}")
+        for metric, help_text, attribute in histograms:
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for labels, function_metrics in items:
+                histogram = getattr(function_metrics, attribute)
+                label_text = _format_labels(labels)
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(
+                        f'{metric}_bucket{{{label_text},le="{bound}"}} {count}'
+                    )
+                lines.append(f"{metric}_sum{{{label_text}}} {histogram.sum}")
+                lines.append(f"{metric}_count{{{label_text}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    name, cache_key = labels
+    name = name.replace("\\", "\\\\").replace('"', '\\"')
+    return f'function="{name}",cache_key="{cache_key}"'
+
+
+# Global metrics registry used by all @vibe decorated functions
+metrics = Metrics(enabled=os.environ.get("VIBEFLOW_METRICS", "") not in ("", "0"))
@@ -0,0 +1,13 @@
+"""Pydantic models of structured generation responses."""
+
+from typing import List
+from pydantic import BaseModel
+
+
+class FunctionCode(BaseModel):
+    function_name: str
+    code: str
+
+
+class FunctionCodeBatch(BaseModel):
+    functions: List[FunctionCode]
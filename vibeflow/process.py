@@ -0,0 +1,221 @@
+"""Runs @vibe functions in a pool of worker processes, for CPU-bound generated code."""
+
+import itertools
+import os
+import threading
+from functools import partial, wraps
+from vibeflow.cache import cache as global_cache
+from vibeflow.mapping import azip, bounded_amap, bounded_map, chunked
+from vibeflow.vibe import (
+    CacheMissError,
+    VibeKey,
+    _aprepare,
+    _materialize_function,
+    _prepare,
+    materialized_functions,
+)
+
+# Settings of the shared process pool, changed with configure_process_pool()
+_pool_config = {
+    "max_workers": int(os.environ.get("VIBEFLOW_PROCESS_WORKERS", 0)) or None,
+    "mp_context": None,
+}
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def configure_process_pool(max_workers: int = None, mp_context=None):
+    """
+    Sets the number of worker processes (the number of CPUs by default, or
+    VIBEFLOW_PROCESS_WORKERS) and the multiprocessing context they are started
+    with. A running pool is shut down and replaced on its next use.
+    """
+    global _pool
+    _pool_config["max_workers"] = max_workers
+    _pool_config["mp_context"] = mp_context
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False)
+        _pool = None
+
+
+def get_process_pool():
+    """Returns the shared process pool, starting it on first use."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                from concurrent.futures import ProcessPoolExecutor
+
+                shared = global_cache._shared_location
+                _pool = ProcessPoolExecutor(
+                    max_workers=_pool_config["max_workers"],
+                    mp_context=_pool_config["mp_context"],
+                    initializer=_init_worker,
+                    initargs=(
+                        global_cache._backend,
+                        shared if isinstance(shared, str) else None,
+                    ),
+                )
+    return _pool
+
+
+def _init_worker(backend, shared_location):
+    """
+    Points the cache of a worker at the same backend and shared store as its parent.
+    """
+    global_cache.set_backend(backend)
+    if shared_location is not None:
+        global_cache.set_shared_store(shared_location)
+
+
+def _worker_function(cache_key, function_name, func_file_path):
+    """
+    Returns the materialized function of a key in a worker, loading it from the cache
+    once.
+    """
+    live_function = materialized_functions.get(cache_key)
+    if live_function is None:
+        python_code = global_cache.get(cache_key, func_file_path)
+        if python_code is None:
+            # The parent may have cached it after this worker read the cache
+            global_cache.clear()
+            python_code = global_cache.get(cache_key, func_file_path)
+        if python_code is None:
+            raise CacheMissError(
+                f"No cached code for '{function_name}' (cache key {cache_key}) "
+                "in a worker process."
+            )
+        key = VibeKey(cache_key, function_name, "", "")
+        live_function = _materialize_function(python_code, key, func_file_path)
+    return live_function
+
+
+def _call(cache_key, function_name, func_file_path, args, kwargs):
+    return _worker_function(cache_key, function_name, func_file_path)(*args, **kwargs)
+
+
+def _call_packed(cache_key, function_name, func_file_path, args):
+    return _worker_function(cache_key, function_name, func_file_path)(*args)
+
+
+def _call_chunk(cache_key, function_name, func_file_path, chunk):
+    function = _worker_function(cache_key, function_name, func_file_path)
+    return [function(*args) for args in chunk]
+
+
+def _workers():
+    return _pool_config["max_workers"] or os.cpu_count() or 1
+
+
+def make_process_wrapper(func, resolver):
+    """
+    Wraps a sync function so that its generated code runs in the process pool.
+    The code is generated and cached in the calling process first; workers
+    only receive the cache key and load the code from the cache themselves.
+    """
+
+    def prepare(args):
+        key = resolver.resolve(args)
+        owner = args[0] if key.class_name is not None else None
+        if materialized_functions.peek(key.cache_key) is None:
+            _prepare(resolver, owner)
+        return key
+
+    @wraps(func)
+    def process_wrapper(*args, **kwargs):
+        key = prepare(args)
+        future = get_process_pool().submit(
+            _call,
+            key.cache_key,
+            key.function_name,
+            resolver.func_file_path,
+            args,
+            kwargs,
+        )
+        return future.result()
+
+    async def acall(*args, **kwargs):
+        """
+        Calls the function in the process pool without blocking the running event loop.
+        """
+        import asyncio
+
+        key = resolver.resolve(args)
+        await _aprepare(resolver, args[0] if key.class_name is not None else None)
+        future = get_process_pool().submit(
+            _call,
+            key.cache_key,
+            key.function_name,
+            resolver.func_file_path,
+            args,
+            kwargs,
+        )
+        return await asyncio.wrap_future(future)
+
+    def map(*iterables, workers=None, chunksize=1, timeout=None):
+        """
+        Calls the function for each set of arguments taken from `iterables`, like
+        the builtin map, spreading the calls over the process pool in chunks of
+        `chunksize`. The implementation is resolved once, from the first call,
+        and results are yielded in order with at most `workers` chunks (by
+        default twice the number of pool workers) in flight, so large inputs
+        are consumed lazily. The pool itself is shared and keeps its size.
+        """
+        calls = iter(zip(*iterables))
+        first = next(calls, None)
+        if first is None:
+            return
+        key = prepare(first)
+        run = partial(
+            _call_chunk, key.cache_key, key.function_name, resolver.func_file_path
+        )
+        pool = get_process_pool()
+        yield from bounded_map(
+            partial(pool.submit, run),
+            chunked(itertools.chain([first], calls), chunksize),
+            workers or 2 * _workers(),
+            timeout,
+        )
+
+    async def amap(*iterables, concurrency=None):
+        """
+        Calls the function for each set of arguments taken from `iterables`,
+        which may be sync or async iterables, in the process pool without
+        blocking the running event loop. At most `concurrency` calls (by
+        default twice the number of workers) are in flight at a time.
+        """
+        import asyncio
+
+        pool = get_process_pool()
+        keys = {}
+
+        async def run(args):
+            cls = args[0].__class__ if args else None
+            key = keys.get(cls)
+            if key is None:
+                key = resolver.resolve(args)
+                await _aprepare(
+                    resolver, args[0] if key.class_name is not None else None
+                )
+                keys[cls] = key
+            future = pool.submit(
+                _call_packed,
+                key.cache_key,
+                key.function_name,
+                resolver.func_file_path,
+                args,
+            )
+            return await asyncio.wrap_future(future)
+
+        calls = azip(*iterables)
+        async for result in bounded_amap(run, calls, concurrency or 2 * _workers()):
+            yield result
+
+    process_wrapper.vibe_resolver = resolver
+    process_wrapper.prepare = partial(_prepare, resolver)
+    process_wrapper.aprepare = partial(_aprepare, resolver)
+    process_wrapper.acall = acall
+    process_wrapper.map = map
+    process_wrapper.amap = amap
+    return process_wrapper
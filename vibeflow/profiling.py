@@ -0,0 +1,90 @@
+"""Profiling of generated code: how much time each generated function takes."""
+
+from contextlib import contextmanager
+from typing import List, NamedTuple, Optional
+from vibeflow.vibe import generated_files
+
+
+class GeneratedFunctionStats(NamedTuple):
+    """The time spent in the generated code of one function while profiling."""
+
+    name: str
+    # The decorated function, as "qualname (path:line)", when known
+    origin: Optional[str]
+    filename: str
+    calls: int
+    # Seconds spent in the generated code itself, helpers defined there included
+    own_time: float
+    # Seconds spent in the calls of the function, including everything it calls
+    cumulative_time: float
+
+
+class ProfileReport:
+    """The results of a profile() block, filled in when the block exits."""
+
+    def __init__(self):
+        self.functions: List[GeneratedFunctionStats] = []
+        # The pstats.Stats of everything that ran in the block
+        self.stats = None
+
+    def _collect(self, profiler):
+        import pstats
+
+        self.stats = pstats.Stats(profiler)
+        by_file = {}
+        for (filename, _, name), entry in self.stats.stats.items():
+            if filename in generated_files:
+                by_file.setdefault(filename, []).append((name, entry))
+
+        for filename, entries in by_file.items():
+            function_name, origin = generated_files[filename]
+            # The function the code was generated for is the entry point; the
+            # other entries are helpers defined next to it
+            main = [entry for name, entry in entries if name == function_name]
+            _, calls, _, cumulative, _ = (
+                main[0]
+                if main
+                else max((entry for _, entry in entries), key=lambda entry: entry[3])
+            )
+            self.functions.append(
+                GeneratedFunctionStats(
+                    function_name,
+                    origin,
+                    filename,
+                    calls,
+                    sum(entry[2] for _, entry in entries),
+                    cumulative,
+                )
+            )
+        self.functions.sort(key=lambda stats: stats.cumulative_time, reverse=True)
+
+    def __str__(self):
+        lines = [f"{'calls':>10} {'own s':>10} {'cumul s':>10}  function"]
+        for stats in self.functions:
+            lines.append(
+                f"{stats.calls:>10} {stats.own_time:>10.6f} "
+                f"{stats.cumulative_time:>10.6f}  {stats.origin or stats.name}"
+            )
+        return "\n".join(lines)
+
+
+@contextmanager
+def profile(output=None):
+    """
+    Profiles the block with cProfile and reports the time spent in each
+    generated function, most expensive first. Yields a ProfileReport that is
+    filled in when the block exits, and printed to `output` (a file) when
+    given. Like cProfile, only the calling thread is profiled.
+    """
+    import cProfile
+
+    report = ProfileReport()
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield report
+    finally:
+        profiler.disable()
+        report._collect(profiler)
+        if output is not None:
+            print(report, file=output)
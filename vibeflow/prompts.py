@@ -48,3 +48,19 @@ def get_function_prompt(
             )
 
     return prompt
+
+
+def get_batch_prompt(specs) -> str:
+    """Generates the prompt for the AI to create several functions in one response."""
+    prompt = f"""
+    Generate the Python code for each of the following {len(specs)} functions.
+    Respond with a JSON object of the form
+    {{"functions": [{{"function_name": "...", "code": "..."}}]}}
+    with exactly one entry per function, in the same order as they are listed below.
+    Each "code" value must contain only the Python source code of that function.
+    """
+
+    for number, spec in enumerate(specs, start=1):
+        prompt += f"\n\nFunction {number}:\n" + get_function_prompt(*spec)
+
+    return prompt
@@ -0,0 +1,134 @@
+"""
+Content-addressed stores that share generated code across directories, repositories and
+machines.
+"""
+
+import hashlib
+import json
+import os
+import textwrap
+from vibeflow.cache import atomic_write
+
+# Bumped whenever the normalization below changes, so old entries stop matching
+CONTENT_KEY_VERSION = 1
+
+
+def content_key(
+    function_name,
+    signature,
+    docstring,
+    class_name=None,
+    init_source=None,
+    other_methods=None,
+    is_async=False,
+):
+    """
+    Returns the content address of a function spec: a digest of everything the
+    code is generated from and nothing else. Unlike the cache key it leaves out
+    the module and file the function is defined in, so the same spec anywhere
+    maps to the same entry.
+    """
+    spec = {
+        "version": CONTENT_KEY_VERSION,
+        "is_async": is_async,
+        "function_name": function_name,
+        "signature": signature,
+        "docstring": docstring.strip(),
+        "class_name": class_name,
+        # The source of a nested class's __init__ is indented further
+        "init_source": textwrap.dedent(init_source).strip() if init_source else None,
+        "other_methods": other_methods or None,
+    }
+    normalized = json.dumps(spec, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(normalized.encode("utf-8")).hexdigest()
+
+
+class DirectoryStore:
+    """
+    Stores each entry as a file named after its content key in a shared
+    directory, for example on a network drive or in a CI cache. Entries are
+    immutable, so concurrent writers need no locking; each write is atomic.
+    """
+
+    def __init__(self, path: str):
+        self.path = os.path.abspath(os.path.expanduser(path))
+
+    def _entry_path(self, key):
+        return os.path.join(self.path, key[:2], f"{key}.py")
+
+    def get(self, key: str):
+        try:
+            with open(self._entry_path(key), encoding="utf-8") as f:
+                return f.read()
+        except (FileNotFoundError, UnicodeDecodeError):
+            return None
+
+    def set(self, key: str, value: str):
+        path = self._entry_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        atomic_write(path, value.encode("utf-8"))
+
+    def close(self):
+        pass
+
+
+class HTTPStore:
+    """
+    Stores entries on an HTTP server, with a GET and a PUT of `<base_url>/<key>`
+    per entry. A 404 is a miss. Since the store only saves generations, a
+    server that cannot be reached is treated as a miss rather than an error.
+    """
+
+    def __init__(self, base_url: str, timeout: float = 5.0, headers: dict = None):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.headers = dict(headers or {})
+
+    def _url(self, key):
+        import urllib.parse
+
+        return f"{self.base_url}/{urllib.parse.quote(key)}"
+
+    def get(self, key: str):
+        import http.client
+        import urllib.request
+
+        request = urllib.request.Request(self._url(key), headers=self.headers)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                return response.read().decode("utf-8")
+        except (OSError, ValueError, http.client.HTTPException):
+            # urllib.error.HTTPError, including the 404 of a miss, is an OSError;
+            # a response cut short raises http.client.IncompleteRead
+            return None
+
+    def set(self, key: str, value: str):
+        import http.client
+        import urllib.request
+
+        request = urllib.request.Request(
+            self._url(key),
+            data=value.encode("utf-8"),
+            method="PUT",
+            headers={"Content-Type": "text/x-python; charset=utf-8", **self.headers},
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout):
+                pass
+        except (OSError, ValueError, http.client.HTTPException):
+            pass
+
+    def close(self):
+        pass
+
+
+def open_shared_store(location):
+    """
+    Returns the store for `location`: an HTTP(S) URL, a directory path, or an
+    object with the store interface (get, set, close), which is returned as is.
+    """
+    if location is None or not isinstance(location, str):
+        return location
+    if location.startswith(("http://", "https://")):
+        return HTTPStore(location)
+    return DirectoryStore(location)
@@ -0,0 +1,94 @@
+"""Single-flight coalescing of concurrent work on the same key."""
+
+import threading
+
+
+class _Call:
+    """A unit of work in flight, shared by the caller running it and its waiters."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Makes sure that only one piece of work runs per key at a time. Callers that
+    arrive while the work is in flight wait for it and receive the same result
+    (or exception) instead of running it again.
+
+    Sync callers are coalesced across threads with an event per key. Async
+    callers are coalesced per event loop with a future per key.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self._futures = {}
+
+    def do(self, key, fn):
+        """Runs `fn()` for `key`, or waits for the run that is already in flight."""
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = self._calls[key] = _Call()
+
+        if not is_leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+        return call.result
+
+    async def do_async(self, key, coro_fn):
+        """Awaits `coro_fn()` for `key`, or the run that is already in flight."""
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        flight_key = (loop, key)
+
+        while True:
+            future = self._futures.get(flight_key)
+            if future is None:
+                break
+            try:
+                # Shielded, so a cancelled waiter does not cancel the shared run
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                # The run was cancelled along with the caller that started it,
+                # so retry rather than fail a waiter that was not cancelled
+                if not future.cancelled():
+                    raise
+
+        future = self._futures[flight_key] = loop.create_future()
+        try:
+            result = await coro_fn()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            # Mark the exception as retrieved for the case where nobody waited
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+        finally:
+            del self._futures[flight_key]
+        return result
+
+    def in_flight(self):
+        """Returns the number of keys with work currently in flight."""
+        return len(self._calls) + len(self._futures)
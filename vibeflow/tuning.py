@@ -0,0 +1,221 @@
+"""
+Tuned generation: generate several candidates, check them, time them and cache the
+fastest.
+"""
+
+import copy
+import pickle
+import time
+import timeit
+from typing import Any, List, NamedTuple, Optional
+from vibeflow.cache import cache as global_cache
+from vibeflow.client import get_code_candidates
+from vibeflow.vibe import _materialize_function, _method_class, materialized_functions
+from vibeflow.warmup import VibeTarget
+
+
+class TuningError(RuntimeError):
+    """Raised when no candidate implementation gives the expected results."""
+
+
+class TuningResult(NamedTuple):
+    """The outcome of tuning one function."""
+
+    qualname: str
+    cache_key: str
+    code: str
+    # Seconds per call of the chosen candidate
+    seconds_per_call: float
+    # Seconds per call of each candidate, None for the rejected ones
+    timings: List[Optional[float]]
+
+
+def _compile_candidate(code, function_name, index):
+    namespace = {
+        "__name__": f"vibeflow.tuning.{function_name}",
+        "__builtins__": __builtins__,
+    }
+    exec(compile(code, f"<vibeflow tuning candidate {index}>", "exec"), namespace)
+    return namespace[function_name]
+
+
+def _runner(code, function_name, index, is_async, loop):
+    """
+    Returns a sync callable running a candidate, on `loop` when it is async,
+    or None when its code fails to run.
+    """
+    try:
+        function = _compile_candidate(code, function_name, index)
+    except Exception:
+        return None
+    if is_async:
+        return lambda *args: loop.run_until_complete(function(*args))
+    return function
+
+
+def _unchanged(original, copied):
+    """Whether `copied`, a deep copy of `original`, still holds the same values."""
+    if type(original) is not type(copied):
+        return False
+    if isinstance(original, (list, tuple)):
+        return len(original) == len(copied) and all(map(_unchanged, original, copied))
+    if isinstance(original, dict):
+        return original.keys() == copied.keys() and all(
+            _unchanged(value, copied[key]) for key, value in original.items()
+        )
+    try:
+        if original == copied:
+            return True
+    except Exception:
+        pass
+    # Instances without __eq__ compare by identity, so compare their state
+    if hasattr(original, "__dict__"):
+        return _unchanged(vars(original), vars(copied))
+    try:
+        return pickle.dumps(original) == pickle.dumps(copied)
+    except Exception:
+        return False
+
+
+def _outcomes(run, samples):
+    """
+    Returns the results of `run` on copies of the samples, or None when it
+    raises or changes its arguments.
+    """
+    if run is None:
+        return None
+    results = []
+    for args in samples:
+        copied = copy.deepcopy(args)
+        try:
+            results.append(run(*copied))
+        except Exception:
+            return None
+        if not _unchanged(args, copied):
+            return None
+    return results
+
+
+def _accepted(outcomes, expected):
+    """
+    Returns the indexes of the candidates that give the expected results or,
+    without expected results, that agree with the largest group of candidates.
+    """
+    if expected is None:
+        groups = []
+        for index, results in enumerate(outcomes):
+            if results is None:
+                continue
+            for group in groups:
+                if outcomes[group[0]] == results:
+                    group.append(index)
+                    break
+            else:
+                groups.append([index])
+        return max(groups, key=len, default=[])
+    return [index for index, results in enumerate(outcomes) if results == expected]
+
+
+def _time(run, samples, repeat):
+    """
+    Returns the best time of one call over the samples, in seconds. Every pass
+    over the samples gets its own copies, made before the clock starts.
+    """
+    number, _ = timeit.Timer(
+        lambda: [run(*args) for args in copy.deepcopy(samples)]
+    ).autorange()
+    best = None
+    for _ in range(repeat):
+        copies = iter([copy.deepcopy(samples) for _ in range(number)])
+        timer = timeit.Timer(lambda: [run(*args) for args in next(copies)])
+        seconds = timer.timeit(number)
+        best = seconds if best is None else min(best, seconds)
+    return best / (number * len(samples))
+
+
+def tune(
+    function,
+    samples,
+    expected: List[Any] = None,
+    candidates: int = 4,
+    repeat: int = 3,
+) -> TuningResult:
+    """
+    Generates `candidates` implementations of a @vibe function, runs each on
+    copies of `samples` (a list of positional argument tuples, with the
+    instance first for methods) and keeps those that return `expected`, or
+    that agree with the largest group of candidates when no results are
+    expected, and that leave their arguments unchanged. The correct
+    candidates are timed with timeit, and the fastest is cached for the
+    function, along with its timings, and materialized for the calls to come.
+    Raises TuningError when no candidate is correct.
+    """
+    samples = [tuple(args) for args in samples]
+    if not samples:
+        raise ValueError("Tuning needs at least one sample.")
+    try:
+        copy.deepcopy(samples)
+    except Exception as e:
+        raise ValueError("Tuning needs samples that copy.deepcopy can copy.") from e
+    if expected is not None and len(expected) != len(samples):
+        raise ValueError("Give one expected result per sample.")
+
+    resolver = function.vibe_resolver
+    key = resolver.resolve(samples[0])
+    codes = get_code_candidates(
+        key.function_name,
+        key.signature,
+        key.docstring,
+        key.class_name,
+        key.init_source,
+        key.other_methods,
+        is_async=resolver.is_async,
+        count=candidates,
+    )
+
+    loop = None
+    if resolver.is_async:
+        import asyncio
+
+        loop = asyncio.new_event_loop()
+    try:
+        runs = [
+            _runner(code, key.function_name, index, resolver.is_async, loop)
+            for index, code in enumerate(codes)
+        ]
+        accepted = _accepted([_outcomes(run, samples) for run in runs], expected)
+        if not accepted:
+            raise TuningError(
+                f"None of the {len(codes)} candidates of '{resolver.qualname}' "
+                "gave the expected results on the samples."
+            )
+        timings = [None] * len(codes)
+        for index in accepted:
+            timings[index] = _time(runs[index], samples, repeat)
+    finally:
+        if loop is not None:
+            loop.close()
+
+    best = min(accepted, key=lambda index: timings[index])
+    func_file_path = resolver.func_file_path
+    owner = VibeTarget(resolver, _method_class(key, samples[0])).owner
+    global_cache.set(key.cache_key, codes[best], func_file_path, key.content_key, owner)
+    global_cache.set_meta(
+        key.cache_key,
+        {
+            "tuned_at": time.time(),
+            "samples": len(samples),
+            "candidates": len(codes),
+            "correct": len(accepted),
+            "seconds_per_call": timings[best],
+            "timings": timings,
+        },
+        func_file_path,
+    )
+    materialized_functions.pop(key.cache_key)
+    if resolver.result_cache is not None:
+        resolver.result_cache.clear()
+    _materialize_function(codes[best], key, func_file_path, resolver)
+    return TuningResult(
+        resolver.qualname, key.cache_key, codes[best], timings[best], timings
+    )
@@ -0,0 +1,211 @@
+"""
+Checks that generated code defines the requested function before it is used or cached.
+"""
+
+import ast
+import re
+
+_FENCE = re.compile(r"^[ \t]*```[\w+-]*[ \t]*$", re.MULTILINE)
+
+# Lines at column 0 that start a new top-level statement, as opposed to
+# continuing the previous one (`else:`, a closing bracket, ...)
+_STATEMENT_START = re.compile(r"(?:async[ \t]+def|def|class|import|from)\b|@")
+_DEF = re.compile(r"(async[ \t]+)?def[ \t]+(\w+)")
+
+
+class InvalidCodeError(ValueError):
+    """Raised when generated code does not define the requested function."""
+
+
+def strip_fences(text):
+    """
+    Returns the code inside the first markdown code fence of `text`, or `text`
+    itself when it has no fence. An unclosed fence, as seen mid-stream, runs
+    to the end of the text.
+    """
+    match = _FENCE.search(text)
+    if match is None:
+        return text
+    start = match.end() + 1
+    end = _FENCE.search(text, start)
+    return text[start : end.start() if end else len(text)]
+
+
+def _parameters(arguments):
+    """
+    Returns the names and kinds of a function's parameters, ignoring annotations and
+    defaults.
+    """
+    return (
+        [arg.arg for arg in arguments.posonlyargs],
+        [arg.arg for arg in arguments.args],
+        arguments.vararg is not None,
+        [arg.arg for arg in arguments.kwonlyargs],
+        arguments.kwarg is not None,
+    )
+
+
+def _declared_parameters(signature):
+    """Parses a signature string such as "(a: int, b: int) -> int", or returns None."""
+    try:
+        tree = ast.parse(f"def _{signature}:\n    pass")
+    except SyntaxError:
+        # Defaults whose repr is not valid Python, such as `<object object at ...>`
+        return None
+    return _parameters(tree.body[0].args)
+
+
+def _find_function(tree, function_name):
+    """
+    Returns the last top-level definition of `function_name`, which is the one exec
+    binds.
+    """
+    found = None
+    for node in tree.body:
+        if (
+            isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            and node.name == function_name
+        ):
+            found = node
+    return found
+
+
+def _async_mismatch(function_name, is_async):
+    expected = "async def" if is_async else "def"
+    return InvalidCodeError(
+        f"Expected '{function_name}' to be defined with `{expected}`."
+    )
+
+
+def _check_function(node, function_name, signature, is_async):
+    if node is None:
+        raise InvalidCodeError(f"Generated code does not define '{function_name}'.")
+    if isinstance(node, ast.AsyncFunctionDef) != is_async:
+        raise _async_mismatch(function_name, is_async)
+    if signature is not None:
+        declared = _declared_parameters(signature)
+        if declared is not None and _parameters(node.args) != declared:
+            raise InvalidCodeError(
+                f"Generated '{function_name}' does not match the signature {signature}."
+            )
+
+
+def validate_code(code, function_name, signature=None, is_async=False):
+    """
+    Checks that `code` parses and defines `function_name` at the top level,
+    with the right async-ness and the parameters of `signature` (names and
+    kinds; annotations and defaults may differ). Returns the code with any
+    markdown fence stripped, or raises InvalidCodeError.
+    """
+    code = strip_fences(code)
+    try:
+        tree = ast.parse(code)
+    except SyntaxError as e:
+        raise InvalidCodeError(
+            f"Generated code for '{function_name}' does not parse: {e}"
+        ) from e
+    _check_function(
+        _find_function(tree, function_name), function_name, signature, is_async
+    )
+    return code
+
+
+class StreamValidator:
+    """
+    Validates code as it streams in, so a bad response can be abandoned
+    before it completes. Every time a new top-level statement starts, the
+    statements before it must parse, and once the requested function is
+    complete its definition is checked as by `validate_code`.
+    """
+
+    def __init__(self, function_name, signature=None, is_async=False):
+        self.function_name = function_name
+        self.signature = signature
+        self.is_async = is_async
+        self.text = ""
+        self._checked_lines = 0
+        self._checked_function = False
+        self._has_fence = False
+        # Whether the response starts with code rather than prose, once known
+        self._starts_with_code = None
+
+    @property
+    def closed(self):
+        """
+        Whether the code fence has been closed, so the rest of the response can be
+        skipped.
+        """
+        opening = _FENCE.search(self.text)
+        return (
+            opening is not None
+            and _FENCE.search(self.text, opening.end() + 1) is not None
+        )
+
+    def feed(self, chunk):
+        """
+        Adds a chunk of the response, raising InvalidCodeError as soon as it is known to
+        be bad.
+        """
+        self.text += chunk
+        if "\n" not in chunk:
+            return
+        if not self._has_fence and _FENCE.search(self.text):
+            # Anything before the opening fence is not code, so start over after it
+            self._has_fence = True
+            self._checked_lines = 0
+        if not self._has_fence and not self._starts_with_code:
+            # Prose may precede the opening fence, so wait for it unless the
+            # response clearly opens with code
+            if self._starts_with_code is None:
+                first = next(
+                    (line for line in self.text.split("\n")[:-1] if line.strip()), None
+                )
+                if first is not None:
+                    self._starts_with_code = bool(
+                        _STATEMENT_START.match(first) or first.startswith("#")
+                    )
+            if not self._starts_with_code:
+                return
+        lines = strip_fences(self.text).split("\n")
+        # The last line may still be incomplete
+        complete = lines[:-1]
+        boundary = None
+        for index in range(self._checked_lines, len(complete)):
+            line = complete[index]
+            header = _DEF.match(line)
+            if header and header.group(2) == self.function_name:
+                # The async-ness is known from the first line of the definition
+                if bool(header.group(1)) != self.is_async:
+                    raise _async_mismatch(self.function_name, self.is_async)
+            if (
+                index
+                and _STATEMENT_START.match(line)
+                and not complete[index - 1].startswith("@")
+            ):
+                boundary = index
+        self._checked_lines = len(complete)
+        if boundary is None:
+            return
+
+        prefix = "\n".join(complete[:boundary])
+        try:
+            tree = ast.parse(prefix)
+        except SyntaxError as e:
+            if "string literal" in (e.msg or ""):
+                # The boundary line is inside a string that is still open, so it
+                # does not start a statement and result() has the final say
+                return
+            raise InvalidCodeError(
+                f"Generated code for '{self.function_name}' does not parse: {e}"
+            ) from e
+        if not self._checked_function:
+            node = _find_function(tree, self.function_name)
+            if node is not None:
+                _check_function(node, self.function_name, self.signature, self.is_async)
+                self._checked_function = True
+
+    def result(self):
+        """Validates the complete response and returns its code."""
+        return validate_code(
+            self.text, self.function_name, self.signature, self.is_async
+        )
@@ -1,178 +1,909 @@
+# asyncio, concurrent.futures and the LLM client stack are imported where they
+# are first needed, so importing vibeflow and running cached code stays cheap
 import inspect
 import hashlib
-from functools import wraps
+import os
+import sys
+import threading
+import time
+import warnings
+import weakref
+from functools import partial, wraps
+from typing import NamedTuple, Optional
 from vibeflow.client import get_code, async_get_code
-from vibeflow.cache import cache as global_cache
+from vibeflow.cache import atomic_write, cache as global_cache
+from vibeflow.lru import LRUCache
+from vibeflow.metrics import metrics
+from vibeflow.shared import content_key
+from vibeflow.singleflight import SingleFlight
+from vibeflow.validation import validate_code
+from vibeflow.warmup import VibeTarget, class_targets, discover, import_modules
 
-# In-memory cache for materialized functions to avoid re-executing code
-materialized_functions = {}
+# In-memory cache for materialized functions to avoid re-executing code. It is
+# bounded (VIBEFLOW_MAX_MATERIALIZED, 1024 by default) because method keys
+# change with every edit to a class, which long-running processes accumulate.
+materialized_functions = LRUCache(
+    maxsize=int(os.environ.get("VIBEFLOW_MAX_MATERIALIZED", 1024)) or None,
+    on_evict=lambda cache_key, live_function: _forget_source(
+        live_function.vibe_info["filename"]
+    ),
+)
 
+# Key resolvers of every decorated function, so their memoized keys can be reset
+_resolvers = weakref.WeakSet()
 
-def vibe(func):
+# Coalesces concurrent cache misses, so each key is generated only once
+_flight = SingleFlight()
+
+# What a sync function does when it has to generate code while an event loop is
+# running in the same thread: "warn" (the default), "error" or "allow"
+SYNC_IN_EVENT_LOOP = os.environ.get("VIBEFLOW_SYNC_IN_LOOP", "warn")
+
+# Shared thread pool that runs sync generations off the event loop
+_executor = None
+_executor_lock = threading.Lock()
+
+# Whether the first generation in a class or module also generates, in the
+# background, the other @vibe functions of that class or module
+PREFETCH = os.environ.get("VIBEFLOW_PREFETCH", "") not in ("", "0")
+_prefetched = set()
+_prefetch_lock = threading.Lock()
+_background_tasks = set()
+
+# Prefetches run on their own small thread pool, so a burst of them never
+# holds up the generations callers are waiting for on the shared one
+PREFETCH_WORKERS = int(os.environ.get("VIBEFLOW_PREFETCH_WORKERS", 2))
+_prefetch_executor = None
+
+# Bindings replaced by hot-swap mode, as (namespace, name, wrapper, had_own) tuples
+_hot_swaps = []
+
+# In offline mode a cache miss raises CacheMissError instead of calling the LLM
+OFFLINE = os.environ.get("VIBEFLOW_OFFLINE", "") not in ("", "0")
+
+# Modules passed to freeze(), and their functions, which are expected to be
+# materialized
+_frozen_modules = []
+_frozen_targets = []
+
+# When set, the code of every materialized function is also written to this
+# directory, so profilers, debuggers and coverage tools can open it
+DEBUG_DIR = os.environ.get("VIBEFLOW_DEBUG_DIR") or None
+
+# The function name and origin, the decorated function as "qualname (path:line)",
+# of each filename generated code is compiled with
+generated_files = {}
+
+
+class CacheMissError(LookupError):
+    """Raised in offline mode when a function has to be generated."""
+
+
+class VibeKey(NamedTuple):
+    """The cache key of a decorated function together with its generation context."""
+
+    cache_key: str
+    function_name: str
+    signature: str
+    docstring: str
+    class_name: Optional[str] = None
+    init_source: Optional[str] = None
+    other_methods: Optional[dict] = None
+    content_key: Optional[str] = None
+
+
+def get_common_context(function_name, cls):
     """
-    A decorator that inspects a function to determine if it's sync or async,
-    then uses a corresponding wrapper to generate and cache its implementation.
+    Collects the context of a method: the source of its class's __init__ and
+    the signatures and docstrings of the other methods of the class.
     """
+    class_name = cls.__name__
+    key_source_parts = []
 
-    def get_common_context(function_name, args):
-        is_method = (
-            args and hasattr(args[0], "__class__") and function_name in dir(args[0])
-        )
-        if not is_method:
-            return "", None, None, None
-
-        instance = args[0]
-        cls = instance.__class__
-        class_name = cls.__name__
-        key_source_parts = []
+    try:
+        init_source = inspect.getsource(cls.__init__)
+        key_source_parts.append(f"__init__:{init_source}:")
+    except (AttributeError, TypeError, OSError):
+        init_source = None
 
-        try:
-            init_source = inspect.getsource(cls.__init__)
-            key_source_parts.append(f"__init__:{init_source}:")
-        except (AttributeError, TypeError, OSError):
-            init_source = None
-
-        other_methods = {
-            name: {
-                "signature": str(inspect.signature(meth)),
-                "docstring": inspect.getdoc(meth) or "",
-            }
-            for name, meth in inspect.getmembers(cls, predicate=inspect.isfunction)
-            if name not in (function_name, "__init__")
+    other_methods = {
+        name: {
+            "signature": str(inspect.signature(meth)),
+            "docstring": inspect.getdoc(meth) or "",
         }
+        for name, meth in inspect.getmembers(cls, predicate=inspect.isfunction)
+        if name not in (function_name, "__init__")
+    }
 
-        if other_methods:
-            sorted_methods = sorted(other_methods.items())
-            key_source_parts.append(f"methods:{str(sorted_methods)}")
+    if other_methods:
+        sorted_methods = sorted(other_methods.items())
+        key_source_parts.append(f"methods:{str(sorted_methods)}")
 
-        return "".join(key_source_parts), class_name, init_source, other_methods
+    return "".join(key_source_parts), class_name, init_source, other_methods
 
-    def _get_cache_key(args, is_async):
-        function_name = func.__name__
-        docstring = inspect.getdoc(func) or ""
-        signature = str(inspect.signature(func))
-        key_source_prefix, class_name, init_source, other_methods = get_common_context(
-            function_name, args
-        )
 
-        prefix = "async:" if is_async else "sync:"
+def _defined_outside_class(func):
+    """Whether a function is defined at module level or inside another function."""
+    scope, _, _ = func.__qualname__.rpartition(".")
+    return not scope or scope.endswith("<locals>")
+
+
+class KeyResolver:
+    """
+    Resolves the cache key of a decorated function. The free-function key is
+    computed once at decoration time and method keys are memoized per class,
+    so resolving the key of a warm call is a single mapping lookup. Functions
+    not defined in a class body always resolve to the free-function key
+    without any lookup.
+    """
+
+    def __init__(self, func, is_async):
+        self.func = func
+        self.is_async = is_async
+        self.function_name = func.__name__
+        self.qualname = f"{func.__module__}.{func.__qualname__}"
+        self.docstring = inspect.getdoc(func) or ""
+        self.signature = str(inspect.signature(func))
+        self.func_file_path = inspect.getfile(func)
+        self.free_key = self._build_key("", None, None, None)
+        self.is_free = _defined_outside_class(func)
+        # Memoized results, when the function was decorated with `memoize`
+        self.result_cache = None
+        # Keyed by the class object itself, so a redefined class gets a fresh key
+        self._class_keys = weakref.WeakKeyDictionary()
+
+    def _build_key(self, key_source_prefix, class_name, init_source, other_methods):
+        prefix = "async:" if self.is_async else "sync:"
         source_components = [
             prefix,
             key_source_prefix,
-            f"{func.__module__}.{func.__qualname__}:",
-            f"{signature}:{docstring}",
+            f"{self.func.__module__}.{self.func.__qualname__}:",
+            f"{self.signature}:{self.docstring}",
         ]
         key_source = "".join(source_components)
         cache_key = hashlib.sha256(key_source.encode("utf-8")).hexdigest()
-        return (
+        return VibeKey(
             cache_key,
-            function_name,
-            signature,
-            docstring,
+            self.function_name,
+            self.signature,
+            self.docstring,
             class_name,
             init_source,
             other_methods,
+            content_key(
+                self.function_name,
+                self.signature,
+                self.docstring,
+                class_name,
+                init_source,
+                other_methods,
+                self.is_async,
+            ),
+        )
+
+    def for_class(self, cls):
+        """Returns the key used when the function is called as a method of `cls`."""
+        key = self._class_keys.get(cls)
+        if key is None:
+            key = self._build_key(*get_common_context(self.function_name, cls))
+            self._class_keys[cls] = key
+        return key
+
+    def resolve(self, args):
+        """Returns the key for a call with the given positional arguments."""
+        if self.is_free or not args:
+            return self.free_key
+        cls = args[0].__class__
+        key = self._class_keys.get(cls)
+        if key is None:
+            is_method = self.function_name in dir(args[0])
+            key = self.for_class(cls) if is_method else self.free_key
+            self._class_keys[cls] = key
+        return key
+
+    def for_owner(self, owner=None):
+        """
+        Returns the key for a free function, or for a method of a class or instance.
+        """
+        cls = _owner_class(owner)
+        return self.free_key if cls is None else self.for_class(cls)
+
+    def invalidate(self):
+        """Forgets all memoized method keys."""
+        self._class_keys.clear()
+
+
+def _method_class(key, args):
+    """Returns the class a call is made on when the function is called as a method."""
+    return args[0].__class__ if key.class_name is not None else None
+
+
+def _owner_class(owner):
+    if owner is None or inspect.isclass(owner):
+        return owner
+    return owner.__class__
+
+
+def _generated_filename(key):
+    """
+    Returns the filename the code of a key is compiled with, the same in every process.
+    """
+    if DEBUG_DIR is not None:
+        return os.path.join(
+            os.path.abspath(DEBUG_DIR), f"{key.function_name}-{key.cache_key[:16]}.py"
+        )
+    return f"<vibeflow:{key.function_name}:{key.cache_key[:16]}>"
+
+
+def _origin(resolver):
+    code = resolver.func.__code__
+    return f"{resolver.qualname} ({code.co_filename}:{code.co_firstlineno})"
+
+
+def _register_source(filename, python_code, key, origin):
+    """
+    Makes the generated code of a key visible to tracebacks, pdb and profilers
+    through linecache, and writes it to DEBUG_DIR when set.
+    """
+    import linecache
+
+    # No modification time, so linecache.checkcache() keeps the entry
+    linecache.cache[filename] = (
+        len(python_code),
+        None,
+        python_code.splitlines(True),
+        filename,
+    )
+    if origin is not None or filename not in generated_files:
+        generated_files[filename] = (key.function_name, origin)
+    if DEBUG_DIR is not None:
+        # A trailing comment keeps the line numbers of the code unchanged
+        trailer = f"\n# Generated by vibeflow (cache key {key.cache_key})"
+        if origin is not None:
+            trailer += f" for {origin}"
+        try:
+            os.makedirs(os.path.dirname(filename), exist_ok=True)
+            atomic_write(filename, python_code + trailer + "\n")
+        except OSError:
+            pass
+
+
+def _forget_source(filename):
+    """Drops the source of generated code that is no longer materialized."""
+    generated_files.pop(filename, None)
+    linecache = sys.modules.get("linecache")
+    if linecache is not None:
+        linecache.cache.pop(filename, None)
+
+
+def _materialize_function(python_code, key, func_file_path, resolver=None):
+    filename = _generated_filename(key)
+    origin = _origin(resolver) if resolver is not None else None
+    _register_source(filename, python_code, key, origin)
+    code = global_cache.load_code(key.cache_key, python_code, func_file_path, filename)
+    # Each function gets its own module namespace, so the names its code
+    # imports at the top level are visible inside the function body
+    namespace = {
+        "__name__": f"vibeflow.generated.{key.function_name}",
+        "__file__": filename,
+        "__builtins__": __builtins__,
+    }
+    exec(code, namespace)
+    live_function = namespace[key.function_name]
+    live_function.vibe_info = {
+        "cache_key": key.cache_key,
+        "func_file_path": func_file_path,
+        "filename": filename,
+        "origin": generated_files[filename][1],
+    }
+    materialized_functions[key.cache_key] = live_function
+    return live_function
+
+
+def _validator(resolver, key):
+    """
+    Returns the check that code read from the shared store must pass before it is used.
+    """
+    return partial(
+        validate_code,
+        function_name=key.function_name,
+        signature=key.signature,
+        is_async=resolver.is_async,
+    )
+
+
+def _load_function(resolver, key, cls=None):
+    """
+    Loads a function from the disk cache, generating it on a miss. Sync
+    functions always come through here; async ones only when prefetched or
+    prepared from a thread.
+    """
+    func_file_path = resolver.func_file_path
+    live_function = materialized_functions.peek(key.cache_key)
+    if live_function is not None:
+        return live_function
+
+    owner = VibeTarget(resolver, cls).owner
+    python_code = global_cache.get(
+        key.cache_key, func_file_path, key.content_key, _validator(resolver, key), owner
+    )
+
+    if python_code is None:
+        if OFFLINE:
+            raise _cache_miss_error(resolver, key, cls)
+        _check_event_loop(resolver)
+        if PREFETCH:
+            _prefetch_siblings(resolver, cls)
+        start = time.perf_counter()
+        try:
+            python_code = get_code(
+                key.function_name,
+                key.signature,
+                key.docstring,
+                key.class_name,
+                key.init_source,
+                key.other_methods,
+                is_async=resolver.is_async,
+            )
+            # Never cache code that does not define the function
+            python_code = validate_code(
+                python_code, key.function_name, key.signature, resolver.is_async
+            )
+        except Exception:
+            if metrics.enabled:
+                metrics.function(resolver.qualname, key.cache_key).observe_generation(
+                    time.perf_counter() - start, failed=True
+                )
+            raise
+        if metrics.enabled:
+            metrics.function(resolver.qualname, key.cache_key).observe_generation(
+                time.perf_counter() - start
+            )
+        global_cache.set(
+            key.cache_key, python_code, func_file_path, key.content_key, owner
+        )
+    elif metrics.enabled:
+        metrics.function(resolver.qualname, key.cache_key).disk_hits += 1
+
+    return _materialize_function(python_code, key, func_file_path, resolver)
+
+
+async def _async_load_function(resolver, key, cls=None):
+    """Loads an async function from the disk cache, generating it on a miss."""
+    func_file_path = resolver.func_file_path
+    live_function = materialized_functions.peek(key.cache_key)
+    if live_function is not None:
+        return live_function
+
+    owner = VibeTarget(resolver, cls).owner
+    python_code = global_cache.get(key.cache_key, func_file_path)
+    if python_code is None and global_cache.shared is not None:
+        import asyncio
+
+        # The shared store may be remote, so it is read off the event loop
+        python_code = await asyncio.get_running_loop().run_in_executor(
+            get_executor(),
+            global_cache.get,
+            key.cache_key,
+            func_file_path,
+            key.content_key,
+            _validator(resolver, key),
+            owner,
+        )
+
+    if python_code is None:
+        if OFFLINE:
+            raise _cache_miss_error(resolver, key, cls)
+        if PREFETCH:
+            _async_prefetch_siblings(resolver, cls)
+        start = time.perf_counter()
+        try:
+            python_code = await async_get_code(
+                key.function_name,
+                key.signature,
+                key.docstring,
+                key.class_name,
+                key.init_source,
+                key.other_methods,
+                is_async=True,
+            )
+            python_code = validate_code(
+                python_code, key.function_name, key.signature, True
+            )
+        except Exception:
+            if metrics.enabled:
+                metrics.function(resolver.qualname, key.cache_key).observe_generation(
+                    time.perf_counter() - start, failed=True
+                )
+            raise
+        if metrics.enabled:
+            metrics.function(resolver.qualname, key.cache_key).observe_generation(
+                time.perf_counter() - start
+            )
+        if global_cache.shared is not None:
+            import asyncio
+
+            await asyncio.get_running_loop().run_in_executor(
+                get_executor(),
+                global_cache.set,
+                key.cache_key,
+                python_code,
+                func_file_path,
+                key.content_key,
+                owner,
+            )
+        else:
+            global_cache.set(key.cache_key, python_code, func_file_path, owner=owner)
+    elif metrics.enabled:
+        metrics.function(resolver.qualname, key.cache_key).disk_hits += 1
+
+    return _materialize_function(python_code, key, func_file_path, resolver)
+
+
+def _cache_miss_error(resolver, key, cls=None):
+    target = VibeTarget(resolver, cls)
+    return CacheMissError(
+        f"No cached code for '{target.qualname}' (cache key {key.cache_key}) in "
+        f"{global_cache._get_cache_file_path(resolver.func_file_path)}, and code "
+        "generation is disabled in offline mode. Generate it ahead of time with "
+        f"'python -m vibeflow warm {(cls or resolver.func).__module__}'."
+    )
+
+
+def set_offline(enabled):
+    """
+    Turns offline mode on or off. In offline mode cached code is served as
+    usual, but a function without cached code raises CacheMissError instead of
+    being generated.
+    """
+    global OFFLINE
+    OFFLINE = enabled
+
+
+def freeze(*modules):
+    """
+    Materializes the cached code of every @vibe function in the given modules
+    and packages (module objects or names, imported if needed) right away, so
+    no call has to read the cache later. Returns the qualified names of the
+    functions that have no cached code. In offline mode those are reported by
+    raising CacheMissError instead.
+    """
+    loaded = []
+    for module in modules:
+        loaded.extend(import_modules(module) if isinstance(module, str) else [module])
+    new_modules = [module for module in loaded if module not in _frozen_modules]
+    _frozen_modules.extend(new_modules)
+    _frozen_targets.extend(discover(new_modules))
+
+    missing = []
+    for target in discover(loaded):
+        key = target.key
+        if materialized_functions.peek(key.cache_key) is not None:
+            continue
+        func_file_path = target.resolver.func_file_path
+        python_code = global_cache.get(
+            key.cache_key,
+            func_file_path,
+            key.content_key,
+            _validator(target.resolver, key),
+            target.owner,
         )
+        if python_code is None:
+            missing.append(target.qualname)
+            continue
+        _materialize_function(python_code, key, func_file_path, target.resolver)
+
+    if missing and OFFLINE:
+        raise CacheMissError(
+            f"{len(missing)} @vibe function(s) have no cached code and code generation "
+            f"is disabled in offline mode: {', '.join(missing)}"
+        )
+    return missing
+
+
+def _not_materialized(targets):
+    return [
+        target.qualname
+        for target in targets
+        if materialized_functions.peek(target.key.cache_key) is None
+    ]
+
+
+def warm_state(*modules):
+    """
+    Returns the qualified names of the @vibe functions in the given modules
+    and packages (module objects or names, imported if needed) that are not
+    materialized in memory. Without arguments, every module with @vibe
+    functions is checked. This discovers the functions of every module on each
+    call; get_cache_stats() reports the same for the frozen modules cheaply.
+    """
+    if modules:
+        loaded = []
+        for module in modules:
+            loaded.extend(
+                import_modules(module) if isinstance(module, str) else [module]
+            )
+    else:
+        loaded = {
+            sys.modules.get(resolver.func.__module__) for resolver in list(_resolvers)
+        }
+    return _not_materialized(
+        discover([module for module in loaded if module is not None])
+    )
+
+
+def get_executor():
+    """
+    Returns the shared thread pool used to run sync generations off the event loop.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                _executor = ThreadPoolExecutor(thread_name_prefix="vibeflow")
+    return _executor
+
+
+def _get_prefetch_executor():
+    """Returns the thread pool that runs prefetches of sync functions."""
+    global _prefetch_executor
+    if _prefetch_executor is None:
+        with _executor_lock:
+            if _prefetch_executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+
+                _prefetch_executor = ThreadPoolExecutor(
+                    max_workers=PREFETCH_WORKERS, thread_name_prefix="vibeflow-prefetch"
+                )
+    return _prefetch_executor
+
+
+def _check_event_loop(resolver):
+    """
+    Warns about, or refuses, a sync generation that would block a running event loop.
+    """
+    asyncio = sys.modules.get("asyncio")
+    if asyncio is None:
+        # No event loop can be running before asyncio has been imported
+        return
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    message = (
+        f"Generating the code of '{resolver.qualname}' blocks the running event loop "
+        f"for a full LLM round trip. Await '{resolver.func.__qualname__}.aprepare()' "
+        "at startup or warm the cache with 'python -m vibeflow warm' instead."
+    )
+    if SYNC_IN_EVENT_LOOP == "error":
+        raise RuntimeError(message)
+    if SYNC_IN_EVENT_LOOP == "warn":
+        warnings.warn(message, RuntimeWarning, stacklevel=2)
+
+
+def _prepare(resolver, owner=None):
+    """Loads or generates the implementation of a decorated function and returns it."""
+    key = resolver.for_owner(owner)
+    live_function = materialized_functions.peek(key.cache_key)
+    if live_function is not None:
+        return live_function
+    return _flight.do(
+        key.cache_key, partial(_load_function, resolver, key, _owner_class(owner))
+    )
+
+
+async def _aprepare(resolver, owner=None, executor=None):
+    """
+    Loads or generates the implementation of a decorated function without
+    blocking the running event loop. Sync functions are generated on
+    `executor`, the shared thread pool by default, coalesced with any sync
+    callers of the same key.
+    """
+    key = resolver.for_owner(owner)
+    live_function = materialized_functions.peek(key.cache_key)
+    if live_function is not None:
+        return live_function
+    if resolver.is_async:
+        return await _flight.do_async(
+            key.cache_key,
+            partial(_async_load_function, resolver, key, _owner_class(owner)),
+        )
+    import asyncio
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        executor or get_executor(), _prepare, resolver, owner
+    )
+
+
+def set_prefetch(enabled):
+    """
+    Turns speculative prefetching on or off. When on, the first generation in
+    a class or module also generates the other @vibe functions of that class
+    (or the other module-level @vibe functions) in the background.
+    """
+    global PREFETCH
+    PREFETCH = enabled
+
+
+def _siblings(resolver, cls):
+    """
+    Returns the other @vibe functions of a class or module, once per class or module.
+    """
+    if cls is not None:
+        scope = f"{cls.__module__}.{cls.__qualname__}"
+    else:
+        scope = resolver.func.__module__
+    with _prefetch_lock:
+        if scope in _prefetched:
+            return []
+        _prefetched.add(scope)
+
+    if cls is not None:
+        targets = class_targets(cls)
+    else:
+        module = sys.modules.get(scope)
+        targets = [t for t in discover([module]) if t.cls is None] if module else []
+    return [target for target in targets if target.resolver is not resolver]
+
+
+def _prefetch_siblings(resolver, cls):
+    """Generates the siblings of a function on the prefetch thread pool."""
+    for target in _siblings(resolver, cls):
+        _get_prefetch_executor().submit(_prepare, target.resolver, target.cls)
+
+
+def _async_prefetch_siblings(resolver, cls):
+    """Generates the siblings of a function in background tasks of the running loop."""
+    import asyncio
+
+    for target in _siblings(resolver, cls):
+        task = asyncio.ensure_future(
+            _aprepare(target.resolver, target.cls, _get_prefetch_executor())
+        )
+        _background_tasks.add(task)
+        task.add_done_callback(_finish_background_task)
 
-    def _materialize_function(python_code, function_name):
-        local_scope = {}
-        exec(python_code, globals(), local_scope)
-        return local_scope[function_name]
 
-    if inspect.iscoroutinefunction(func):
+def _finish_background_task(task):
+    _background_tasks.discard(task)
+    if not task.cancelled():
+        # A failed prefetch is retried by the first real call, so drop the error
+        task.exception()
+
+
+def _call_with_metrics(resolver, key, live_function, args, kwargs):
+    """Calls a materialized sync function, recording its latency."""
+    function_metrics = metrics.function(resolver.qualname, key.cache_key)
+    start = time.perf_counter()
+    try:
+        result = live_function(*args, **kwargs)
+    except BaseException:
+        function_metrics.observe_call(time.perf_counter() - start, failed=True)
+        raise
+    function_metrics.observe_call(time.perf_counter() - start)
+    return result
+
+
+async def _async_call_with_metrics(resolver, key, live_function, args, kwargs):
+    """Awaits a materialized async function, recording its latency."""
+    function_metrics = metrics.function(resolver.qualname, key.cache_key)
+    start = time.perf_counter()
+    try:
+        result = await live_function(*args, **kwargs)
+    except BaseException:
+        function_metrics.observe_call(time.perf_counter() - start, failed=True)
+        raise
+    function_metrics.observe_call(time.perf_counter() - start)
+    return result
+
+
+# Attributes of a @vibe wrapper that a hot-swapped function keeps, so warm_state,
+# freeze, tune and map() still find it
+_WRAPPER_ATTRIBUTES = ("vibe_resolver", "prepare", "aprepare", "map", "amap")
+
+
+def _hot_swap(wrapper, live_function, key, args):
+    """
+    Rebinds the decorated name to the materialized function, so later calls
+    through the module or class skip the wrapper altogether.
+    """
+    if key.class_name is not None:
+        cls = args[0].__class__
+        if getattr(cls, key.function_name, None) is not wrapper:
+            return
+        target, had_own = cls, key.function_name in cls.__dict__
+    else:
+        target, had_own = wrapper.__wrapped__.__globals__, True
+        if target.get(key.function_name) is not wrapper:
+            return
+    for name in _WRAPPER_ATTRIBUTES:
+        setattr(live_function, name, getattr(wrapper, name))
+    if isinstance(target, dict):
+        target[key.function_name] = live_function
+    else:
+        setattr(target, key.function_name, live_function)
+    _hot_swaps.append((target, key.function_name, wrapper, had_own))
+
+
+def _restore_hot_swaps():
+    """Puts the wrappers replaced by hot-swap mode back in place."""
+    while _hot_swaps:
+        target, name, wrapper, had_own = _hot_swaps.pop()
+        if isinstance(target, dict):
+            target[name] = wrapper
+        elif had_own:
+            setattr(target, name, wrapper)
+        else:
+            delattr(target, name)
+
+
+def vibe(func=None, *, hot_swap=False, executor=None, memoize=None):
+    """
+    A decorator that inspects a function to determine if it's sync or async,
+    then uses a corresponding wrapper to generate and cache its implementation.
+
+    Generating code takes a full LLM round trip. From async code, use
+    `await func.aprepare()` (or `await Cls.method.aprepare(Cls)` for a method)
+    to materialize a function without blocking the event loop.
+
+    With `hot_swap=True` the decorated name in its module (or the class of the
+    first instance it is called on) is rebound to the materialized function
+    after the first call, so steady-state calls cost the same as a plain call.
+    Subclasses of that class inherit the swapped implementation.
+
+    With `executor="process"` a sync function runs in a shared pool of worker
+    processes (see `vibeflow.process`), so CPU-bound generated code can use
+    more than one core. Such functions also get `acall()` for async callers,
+    and their `map()` and `amap()` spread batches of calls over the pool.
+
+    With `memoize=LRU(maxsize, ttl)` the results of a pure function are cached
+    per argument tuple (see `vibeflow.memoize`), and concurrent identical
+    calls of an async function share one in-flight call.
+
+    Every decorated function also gets `map()` and `amap()` for batches of
+    calls (see `vibeflow.mapping`): the implementation is resolved once per
+    batch and results stream back in order with a bounded number in flight.
+    """
+    if func is None:
+        return lambda f: vibe(f, hot_swap=hot_swap, executor=executor, memoize=memoize)
+    if executor not in (None, "process"):
+        raise ValueError(f"Unknown executor '{executor}'. Use None or 'process'.")
+    if memoize is not None and hot_swap:
+        raise ValueError("memoize cannot be combined with hot_swap.")
+
+    resolver = KeyResolver(func, is_async=inspect.iscoroutinefunction(func))
+    _resolvers.add(resolver)
+
+    if executor == "process":
+        if resolver.is_async or hot_swap:
+            raise ValueError(
+                "executor='process' only supports sync functions without hot_swap."
+            )
+        from vibeflow.process import make_process_wrapper
+
+        return _with_memoization(
+            make_process_wrapper(func, resolver), resolver, memoize
+        )
+
+    from vibeflow.mapping import attach as attach_map
+
+    if resolver.is_async:
 
         @wraps(func)
         async def async_wrapper(*args, **kwargs):
-            (
-                cache_key,
-                function_name,
-                signature,
-                docstring,
-                class_name,
-                init_source,
-                other_methods,
-            ) = _get_cache_key(args, is_async=True)
-
-            if cache_key in materialized_functions:
-                return await materialized_functions[cache_key](*args, **kwargs)
-
-            func_file_path = inspect.getfile(func)
-            python_code = global_cache.get(cache_key, func_file_path)
-
-            if python_code is None:
-                python_code = await async_get_code(
-                    function_name,
-                    signature,
-                    docstring,
-                    class_name,
-                    init_source,
-                    other_methods,
-                    is_async=True,
+            key = resolver.resolve(args)
+            live_function = materialized_functions.get(key.cache_key)
+            if live_function is not None:
+                if not metrics.enabled:
+                    return await live_function(*args, **kwargs)
+                metrics.function(resolver.qualname, key.cache_key).memory_hits += 1
+            else:
+                live_function = await _flight.do_async(
+                    key.cache_key,
+                    partial(
+                        _async_load_function, resolver, key, _method_class(key, args)
+                    ),
                 )
-                global_cache.set(cache_key, python_code, func_file_path)
-
-            live_function = _materialize_function(python_code, function_name)
-            live_function.vibe_info = {
-                "cache_key": cache_key,
-                "func_file_path": func_file_path,
-            }
-            materialized_functions[cache_key] = live_function
-            return await live_function(*args, **kwargs)
+                if hot_swap:
+                    _hot_swap(async_wrapper, live_function, key, args)
+                if not metrics.enabled:
+                    return await live_function(*args, **kwargs)
+            return await _async_call_with_metrics(
+                resolver, key, live_function, args, kwargs
+            )
 
-        return async_wrapper
+        async_wrapper.vibe_resolver = resolver
+        async_wrapper.prepare = partial(_prepare, resolver)
+        async_wrapper.aprepare = partial(_aprepare, resolver)
+        attach_map(async_wrapper, resolver)
+        return _with_memoization(async_wrapper, resolver, memoize)
     else:
 
         @wraps(func)
         def sync_wrapper(*args, **kwargs):
-            (
-                cache_key,
-                function_name,
-                signature,
-                docstring,
-                class_name,
-                init_source,
-                other_methods,
-            ) = _get_cache_key(args, is_async=False)
-
-            if cache_key in materialized_functions:
-                return materialized_functions[cache_key](*args, **kwargs)
-
-            func_file_path = inspect.getfile(func)
-            python_code = global_cache.get(cache_key, func_file_path)
-
-            if python_code is None:
-                python_code = get_code(
-                    function_name,
-                    signature,
-                    docstring,
-                    class_name,
-                    init_source,
-                    other_methods,
-                    is_async=False,
+            key = resolver.resolve(args)
+            live_function = materialized_functions.get(key.cache_key)
+            if live_function is not None:
+                if not metrics.enabled:
+                    return live_function(*args, **kwargs)
+                metrics.function(resolver.qualname, key.cache_key).memory_hits += 1
+            else:
+                live_function = _flight.do(
+                    key.cache_key,
+                    partial(_load_function, resolver, key, _method_class(key, args)),
                 )
-                global_cache.set(cache_key, python_code, func_file_path)
+                if hot_swap:
+                    _hot_swap(sync_wrapper, live_function, key, args)
+                if not metrics.enabled:
+                    return live_function(*args, **kwargs)
+            return _call_with_metrics(resolver, key, live_function, args, kwargs)
+
+        sync_wrapper.vibe_resolver = resolver
+        sync_wrapper.prepare = partial(_prepare, resolver)
+        sync_wrapper.aprepare = partial(_aprepare, resolver)
+        attach_map(sync_wrapper, resolver)
+        return _with_memoization(sync_wrapper, resolver, memoize)
 
-            live_function = _materialize_function(python_code, function_name)
-            live_function.vibe_info = {
-                "cache_key": cache_key,
-                "func_file_path": func_file_path,
-            }
-            materialized_functions[cache_key] = live_function
-            return live_function(*args, **kwargs)
 
-        return sync_wrapper
+def _with_memoization(wrapper, resolver, policy):
+    if policy is None:
+        return wrapper
+    from vibeflow.mapping import attach as attach_map
+    from vibeflow.memoize import memoized
+
+    memoized_wrapper = memoized(wrapper, resolver, policy)
+    # Batched calls go through the memoized results too
+    return attach_map(memoized_wrapper, resolver, call=memoized_wrapper)
+
+
+def set_memory_cache_size(maxsize):
+    """
+    Sets how many materialized functions are kept in memory. The least recently
+    used ones are evicted beyond that, and None removes the limit.
+    """
+    materialized_functions.resize(maxsize)
+
 
 def clear_cache():
     """Clears all VIBE caches, including on-disk and in-memory."""
-    global materialized_functions
-    materialized_functions = {}
+    materialized_functions.clear()
+    for filename in list(generated_files):
+        _forget_source(filename)
+    _prefetched.clear()
+    _restore_hot_swaps()
+    for resolver in list(_resolvers):
+        resolver.invalidate()
+        if resolver.result_cache is not None:
+            resolver.result_cache.clear()
     global_cache.clear()
 
+
 def get_cache_stats():
     """Returns statistics about the current state of the caches."""
     disk_stats = global_cache.stats()
+    memory_stats = materialized_functions.stats()
+    # Only the frozen functions, found once by freeze(), are checked here
+    not_materialized = _not_materialized(_frozen_targets) if _frozen_modules else None
+    memoized = {
+        resolver.qualname: resolver.result_cache.stats()
+        for resolver in list(_resolvers)
+        if resolver.result_cache is not None
+    }
     return {
-        "in_memory_cache_size": len(materialized_functions),
+        "in_memory_cache_size": memory_stats["size"],
+        "in_memory_cache_maxsize": memory_stats["maxsize"],
+        "in_memory_cache_hits": memory_stats["hits"],
+        "in_memory_cache_misses": memory_stats["misses"],
+        "in_memory_cache_evictions": memory_stats["evictions"],
         "disk_cache_files": disk_stats["cached_files"],
         "disk_cache_items": disk_stats["total_items"],
+        "offline": OFFLINE,
+        "not_materialized": not_materialized,
+        "fully_warm": None if not_materialized is None else not not_materialized,
+        "memoized_hits": sum(stats["hits"] for stats in memoized.values()),
+        "memoized_misses": sum(stats["misses"] for stats in memoized.values()),
+        "memoized": memoized,
     }
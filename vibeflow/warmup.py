@@ -0,0 +1,246 @@
+"""Ahead-of-time generation of @vibe functions, so no request pays for a cold start."""
+
+import importlib
+import inspect
+import pkgutil
+from functools import partial
+from typing import List, NamedTuple, Optional
+from vibeflow.cache import cache as global_cache
+from vibeflow.client import FunctionSpec, async_get_code, async_get_code_batch
+from vibeflow.validation import InvalidCodeError, validate_code
+
+
+class VibeTarget(NamedTuple):
+    """A decorated function, with the class it is called on when it's a method."""
+
+    resolver: object
+    cls: Optional[type] = None
+
+    @property
+    def key(self):
+        if self.cls is None:
+            return self.resolver.free_key
+        return self.resolver.for_class(self.cls)
+
+    @property
+    def qualname(self):
+        if self.cls is None:
+            return f"{self.resolver.func.__module__}.{self.resolver.func.__qualname__}"
+        cls = self.cls
+        return f"{cls.__module__}.{cls.__qualname__}.{self.resolver.function_name}"
+
+    @property
+    def owner(self):
+        """
+        The module and qualified name recorded with the cache entries of the target.
+        """
+        return {
+            "module": (self.cls or self.resolver.func).__module__,
+            "qualname": self.qualname,
+        }
+
+
+class WarmupReport(NamedTuple):
+    """The outcome of warming up a set of modules."""
+
+    cached: List[str]
+    generated: List[str]
+    failed: List[tuple]
+
+    @property
+    def ok(self):
+        return not self.failed
+
+
+def import_modules(name):
+    """Imports a module or a package together with all of its submodules."""
+    module = importlib.import_module(name)
+    modules = [module]
+    if hasattr(module, "__path__"):
+        for info in pkgutil.walk_packages(module.__path__, prefix=f"{name}."):
+            modules.append(importlib.import_module(info.name))
+    return modules
+
+
+def _get_resolver(obj):
+    return getattr(obj, "vibe_resolver", None)
+
+
+def class_targets(cls, seen=None):
+    """Finds every @vibe method of a class, including inherited and nested ones."""
+    if seen is None:
+        seen = set()
+    for name in dir(cls):
+        try:
+            attr = inspect.getattr_static(cls, name)
+        except AttributeError:
+            continue
+        resolver = _get_resolver(attr)
+        if resolver is not None and (id(resolver), cls) not in seen:
+            seen.add((id(resolver), cls))
+            yield VibeTarget(resolver, cls)
+        elif inspect.isclass(attr) and attr.__qualname__.startswith(
+            f"{cls.__qualname__}."
+        ):
+            yield from class_targets(attr, seen)
+
+
+def discover(modules):
+    """
+    Finds every @vibe function defined in the given modules. Methods are
+    reported once for each class defined in the modules that has them,
+    including inherited ones, since each class gets its own cache key.
+    """
+    targets = []
+    seen = set()
+    for module in modules:
+        for obj in list(vars(module).values()):
+            resolver = _get_resolver(obj)
+            # A hot-swapped function belongs to the module of its generated code
+            owner = resolver.func if resolver is not None else obj
+            if getattr(owner, "__module__", None) != module.__name__:
+                continue
+            if resolver is not None and (id(resolver), None) not in seen:
+                seen.add((id(resolver), None))
+                targets.append(VibeTarget(resolver))
+            elif inspect.isclass(obj):
+                targets.extend(class_targets(obj, seen))
+    return targets
+
+
+def _spec(target, key):
+    return FunctionSpec(
+        key.function_name,
+        key.signature,
+        key.docstring,
+        key.class_name,
+        key.init_source,
+        key.other_methods,
+        is_async=target.resolver.is_async,
+    )
+
+
+async def _generate_batch(batch, semaphore):
+    """
+    Generates a batch of (target, key) pairs, with a single request when
+    possible. Functions the batch response does not deliver valid code for
+    are requested on their own, and the exception of any that still fail is
+    returned in place of their code.
+    """
+    import asyncio
+
+    async def generate(target, key):
+        try:
+            return await async_get_code(*_spec(target, key))
+        except Exception as e:
+            return e
+
+    async with semaphore:
+        if len(batch) == 1:
+            return [await generate(*batch[0])]
+        try:
+            results = await async_get_code_batch(
+                [_spec(target, key) for target, key in batch], batch_size=len(batch)
+            )
+        except ValueError:
+            # A malformed batch response, so none of its entries can be trusted
+            return await asyncio.gather(
+                *(generate(target, key) for target, key in batch)
+            )
+        retry = []
+        for index, ((target, key), python_code) in enumerate(zip(batch, results)):
+            try:
+                validate_code(
+                    python_code,
+                    key.function_name,
+                    key.signature,
+                    target.resolver.is_async,
+                )
+            except (InvalidCodeError, SyntaxError):
+                retry.append(index)
+        retried = await asyncio.gather(*(generate(*batch[index]) for index in retry))
+        for index, python_code in zip(retry, retried):
+            results[index] = python_code
+        return results
+
+
+async def warm(modules, concurrency=8, batch_size=8):
+    """
+    Generates the missing cache entries of every @vibe function in `modules`,
+    packing up to `batch_size` functions into each request and running up to
+    `concurrency` requests at a time.
+    """
+    import asyncio
+
+    # Imported here since vibeflow.vibe imports this module
+    from vibeflow.vibe import _generated_filename
+
+    report = WarmupReport(cached=[], generated=[], failed=[])
+    missing = []
+    for target in discover(modules):
+        try:
+            key = target.key
+            func_file_path = target.resolver.func_file_path
+            python_code = global_cache.get(
+                key.cache_key,
+                func_file_path,
+                key.content_key,
+                partial(
+                    validate_code,
+                    function_name=key.function_name,
+                    signature=key.signature,
+                    is_async=target.resolver.is_async,
+                ),
+                target.owner,
+            )
+            if python_code is None:
+                missing.append((target, key))
+                continue
+            global_cache.load_code(
+                key.cache_key, python_code, func_file_path, _generated_filename(key)
+            )
+            report.cached.append(target.qualname)
+        except Exception as e:
+            report.failed.append((target.qualname, e))
+
+    semaphore = asyncio.Semaphore(concurrency)
+    batches = [missing[i : i + batch_size] for i in range(0, len(missing), batch_size)]
+    results = await asyncio.gather(
+        *(_generate_batch(batch, semaphore) for batch in batches),
+        return_exceptions=True,
+    )
+
+    for batch, batch_results in zip(batches, results):
+        if isinstance(batch_results, BaseException):
+            report.failed.extend(
+                (target.qualname, batch_results) for target, _ in batch
+            )
+            continue
+        for (target, key), python_code in zip(batch, batch_results):
+            if isinstance(python_code, BaseException):
+                report.failed.append((target.qualname, python_code))
+                continue
+            func_file_path = target.resolver.func_file_path
+            try:
+                # Fail on code that does not define the function rather than cache it
+                python_code = validate_code(
+                    python_code,
+                    key.function_name,
+                    key.signature,
+                    target.resolver.is_async,
+                )
+                global_cache.load_code(
+                    key.cache_key, python_code, func_file_path, _generated_filename(key)
+                )
+            except (InvalidCodeError, SyntaxError) as e:
+                report.failed.append((target.qualname, e))
+                continue
+            global_cache.set(
+                key.cache_key,
+                python_code,
+                func_file_path,
+                key.content_key,
+                target.owner,
+            )
+            report.generated.append(target.qualname)
+    return report